@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Compara os backends de treino multi-label (ver model_trainer.BACKENDS)
+
+Para cada backend mede tempo de treino, tempo de inferência, pico de memória
+(RSS do processo) e micro-F1 em um hold-out temporal. Usa as planilhas de
+data/raw ou, com --synthetic-rows, uma matriz sintética de tamanho controlado
+(útil para ver como o custo cresce com o número de empresas).
+
+Uso:
+    python benchmark_backends.py
+    python benchmark_backends.py --synthetic-rows 2000 --synthetic-companies 100
+"""
+
+import sys
+sys.path.insert(0, '/app/src')
+
+import argparse
+import gc
+import json
+import time
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from sklearn.metrics import f1_score
+
+from agrofuture.benchmarks.profiling import PeakRSS
+from agrofuture.model_trainer import BACKENDS, build_model, temporal_train_test_split
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+REPORTS_DIR = BASE_DIR / "outputs" / "reports"
+
+
+def real_dataset():
+    from agrofuture.data_loader import load_data, market_join_from_env, merge_data
+    from agrofuture.feature_engineer import prepare_target
+    from agrofuture.feature_store import sync_feature_store
+    from agrofuture.fx_rates import FX_DB_FILE, default_rate_source
+
+    transacoes, mercado = load_data(BASE_DIR / "data" / "raw" / "transações-desafio.xlsx",
+                                    BASE_DIR / "data" / "raw" / "mercado-desafio.xlsx",
+                                    cache_dir=BASE_DIR / "data" / "processed" / "cache")
+    merged_df = merge_data(transacoes, mercado, rate_source=default_rate_source(BASE_DIR / "data" / "processed" / FX_DB_FILE),
+                           **market_join_from_env())
+    _, df_features = sync_feature_store(merged_df, BASE_DIR / "data" / "processed" / "feature_store")
+    y, _ = prepare_target(df_features)
+    return df_features.drop(columns=['empresas_vendedoras']), y
+
+
+def synthetic_dataset(n_rows: int, n_companies: int, n_features: int, seed: int):
+    """Features diárias correlacionadas com a atividade latente de cada empresa"""
+    rng = np.random.default_rng(seed)
+    latente = rng.normal(size=(n_rows, n_companies))
+    ruido = rng.normal(size=(n_rows, n_features))
+    pesos = rng.normal(size=(n_companies, n_features)) / np.sqrt(n_companies)
+    X = pd.DataFrame(latente @ pesos + ruido, columns=[f"f{i}" for i in range(n_features)])
+    X.insert(0, "date", pd.date_range("2020-01-01", periods=n_rows, freq="D"))
+    limiar = rng.uniform(0.5, 1.5, size=n_companies)
+    y = (latente > limiar).astype(int)
+    return X, y
+
+
+def run_backend(backend, X_train, y_train, X_test, y_test, n_estimators=None):
+    overrides = {} if n_estimators is None else {"n_estimators": n_estimators}
+    model = build_model(backend, **overrides)
+    gc.collect()
+
+    with PeakRSS() as mem:
+        inicio = time.perf_counter()
+        model.fit(X_train, y_train)
+        tempo_treino = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    probabilities = model.predict_proba(X_test)
+    tempo_inferencia = time.perf_counter() - inicio
+
+    y_pred = np.column_stack([p[:, 1] for p in probabilities]) > 0.5
+    return {
+        "backend": backend,
+        "tempo_treino_s": round(tempo_treino, 3),
+        "tempo_inferencia_ms": round(tempo_inferencia * 1000, 2),
+        "pico_memoria_mb": round(mem.delta_mb, 1),
+        "micro_f1": round(f1_score(y_test, y_pred, average='micro', zero_division=0), 4),
+    }
+
+
+def main(args):
+    if args.synthetic_rows:
+        X, y = synthetic_dataset(args.synthetic_rows, args.synthetic_companies, args.synthetic_features, args.seed)
+        origem = f"sintético ({args.synthetic_rows} linhas, {args.synthetic_companies} empresas)"
+    else:
+        X, y = real_dataset()
+        origem = "data/raw"
+
+    X_train, y_train, X_test, y_test = temporal_train_test_split(X, y, test_size=0.2)
+    X_train, X_test = X_train.drop(columns=['date']), X_test.drop(columns=['date'])
+    print(f"Dados: {origem} | treino {X_train.shape} | teste {X_test.shape} | {y.shape[1]} empresas\n")
+
+    resultados = []
+    for backend in args.backends:
+        resultado = run_backend(backend, X_train, y_train, X_test, y_test, args.n_estimators)
+        resultados.append(resultado)
+        print(f"{backend:<20} treino {resultado['tempo_treino_s']:>8.2f}s | "
+              f"inferência {resultado['tempo_inferencia_ms']:>8.1f}ms | "
+              f"memória +{resultado['pico_memoria_mb']:>7.1f}MB | micro-F1 {resultado['micro_f1']:.4f}")
+
+    REPORTS_DIR.mkdir(parents=True, exist_ok=True)
+    saida = REPORTS_DIR / f"benchmark_backends_{datetime.now().strftime('%Y%m%d%H%M%S')}.json"
+    with open(saida, "w", encoding="utf-8") as f:
+        json.dump({"dados": origem, "resultados": resultados}, f, indent=2, ensure_ascii=False)
+    print(f"\nResultados salvos em: {saida}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark dos backends de treino multi-label")
+    parser.add_argument("--backends", nargs="+", default=list(BACKENDS), choices=BACKENDS)
+    parser.add_argument("--n-estimators", type=int, help="Sobrescreve o número de árvores")
+    parser.add_argument("--synthetic-rows", type=int, default=0)
+    parser.add_argument("--synthetic-companies", type=int, default=50)
+    parser.add_argument("--synthetic-features", type=int, default=40)
+    parser.add_argument("--seed", type=int, default=0)
+    main(parser.parse_args())
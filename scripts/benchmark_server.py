@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Benchmark de latência e vazão do servidor de previsões
+
+Dispara requisições concorrentes (conexões keep-alive) contra um servidor já
+em execução e reporta latência p50/p95/p99 e requisições por segundo.
+
+Uso:
+    python benchmark_server.py --url http://127.0.0.1:8000 --requests 2000 --concurrency 32
+"""
+
+import argparse
+import http.client
+import json
+import random
+import statistics
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+import pandas as pd
+
+
+def percentile(valores, p):
+    if not valores:
+        return float("nan")
+    ordenados = sorted(valores)
+    k = min(len(ordenados) - 1, max(0, int(round(p / 100 * (len(ordenados) - 1)))))
+    return ordenados[k]
+
+
+def fetch_health(host, port):
+    conn = http.client.HTTPConnection(host, port, timeout=30)
+    conn.request("GET", "/health")
+    resposta = json.loads(conn.getresponse().read())
+    conn.close()
+    return resposta
+
+
+def make_paths(args, health):
+    """Sequência de requisições: datas históricas e futuras sorteadas"""
+    fim = pd.Timestamp(health["ultima_data_conhecida"])
+    historicas = pd.date_range(fim - pd.Timedelta(days=args.history_days), fim, freq="D")
+    futuras = pd.date_range(fim + pd.Timedelta(days=1), periods=args.future_days, freq="D")
+    datas = list(historicas) + list(futuras)
+    rng = random.Random(args.seed)
+    return [f"/predict?date={rng.choice(datas).date()}" for _ in range(args.requests)]
+
+
+def main(args):
+    url = urlsplit(args.url)
+    host, port = url.hostname, url.port or 80
+    try:
+        health = fetch_health(host, port)
+    except OSError as e:
+        print(f"Servidor indisponível em {args.url}: {e}")
+        sys.exit(1)
+    print(f"Servidor: {args.url} | modelo: {health['modelo']}")
+
+    paths = make_paths(args, health)
+    local = threading.local()
+    latencias, erros = [], []
+    lock = threading.Lock()
+
+    def worker(path):
+        conn = getattr(local, "conn", None)
+        if conn is None:
+            conn = local.conn = http.client.HTTPConnection(host, port, timeout=60)
+        inicio = time.perf_counter()
+        try:
+            conn.request("GET", path)
+            resposta = conn.getresponse()
+            resposta.read()
+            status = resposta.status
+        except (OSError, http.client.HTTPException) as e:
+            local.conn = None
+            status = str(e)
+        decorrido = time.perf_counter() - inicio
+        with lock:
+            if status == 200:
+                latencias.append(decorrido)
+            else:
+                erros.append(status)
+
+    # Aquecimento: calcula as linhas futuras antes de medir
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        list(pool.map(worker, sorted(set(paths))))
+    latencias.clear()
+    erros.clear()
+
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        list(pool.map(worker, paths))
+    total = time.perf_counter() - inicio
+
+    health = fetch_health(host, port)
+    ms = [l * 1000 for l in latencias]
+    resultado = {
+        "requisicoes": len(paths),
+        "concorrencia": args.concurrency,
+        "erros": len(erros),
+        "vazao_rps": round(len(latencias) / total, 1),
+        "latencia_ms": {
+            "media": round(statistics.fmean(ms), 2) if ms else None,
+            "p50": round(percentile(ms, 50), 2),
+            "p95": round(percentile(ms, 95), 2),
+            "p99": round(percentile(ms, 99), 2),
+            "max": round(max(ms), 2) if ms else None,
+        },
+        "micro_lotes_servidor": health["micro_lotes"],
+        "requisicoes_servidor": health["requisicoes"],
+    }
+    print(json.dumps(resultado, indent=2, ensure_ascii=False))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(resultado, f, indent=2, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark do servidor de previsões")
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--history-days", type=int, default=60)
+    parser.add_argument("--future-days", type=int, default=7)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Grava o resultado em JSON")
+    main(parser.parse_args())
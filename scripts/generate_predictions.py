@@ -1,140 +1,69 @@
 #!/usr/bin/env python3
 """
 Gera previsões para datas futuras usando modelo treinado
+
+Uso:
+    python generate_predictions.py YYYY-MM-DD
+    python generate_predictions.py --start YYYY-MM-DD --end YYYY-MM-DD
+    python generate_predictions.py --dates-file datas.txt
+    python generate_predictions.py --horizon 14 [--feedback]
+    python generate_predictions.py YYYY-MM-DD --model production
+
+No modo em lote o modelo e os dados são carregados uma única vez, todas as
+datas são previstas em uma só chamada ao modelo. Os resultados vão para o
+store Parquet de previsões; com --csv também para um CSV da execução. Com --horizon, os N dias seguintes ao histórico são
+previstos avançando o feature store dia a dia. O fluxo fica em `agrofuture.pipeline` (também usado
+por `agrofuture predict` e `agrofuture batch-predict`).
 """
 
 import sys
 sys.path.insert(0, '/app/src')
 
-import pandas as pd
+import argparse
 from pathlib import Path
-import joblib
 
-from agrofuture.data_loader import load_data, merge_data
-from agrofuture.feature_engineer import create_features, prepare_target
+from agrofuture.pipeline import forecast_pipeline, predict_pipeline, project_paths, resolve_target_dates
 
 # Configuração de paths
 BASE_DIR = Path(__file__).resolve().parent.parent
 MODELS_DIR = BASE_DIR / "outputs" / "models"
 PREDICTIONS_DIR = BASE_DIR / "outputs" / "predictions"
 
-def prepare_future_date(df, target_date):
-    """
-    Prepara dados para uma data futura não presente no dataset
-    
-    Args:
-        df: DataFrame completo com dados históricos
-        target_date: Data futura para previsão (datetime)
-    
-    Returns:
-        DataFrame estendido com a data futura
-    """
-    # Pega o último registro conhecido
-    last_row = df.sort_values("date").iloc[-1].copy()
-    # Atualiza a data para a data futura desejada
-    last_row["date"] = target_date
-    # Adiciona o novo registro ao início do DataFrame
-    extended_df = pd.concat([pd.DataFrame([last_row]), df], ignore_index=True)
-    return extended_df
 
-def main(date_str):
-    # Converter para datetime
+def parse_target_dates(args):
+    """Converte os argumentos de linha de comando em uma lista ordenada de datas"""
     try:
-        target_date = pd.to_datetime(date_str)
-    except ValueError:
-        print("Formato de data inválido. Use YYYY-MM-DD")
-        sys.exit(1)
-        
-    print(f"\nGerando previsões para {date_str}...")
-    
-
-    # Carregar modelo mais recente
-    model_files = sorted(MODELS_DIR.glob("xgboost_model_*.joblib"), reverse=True)
-    if not model_files:
-        print("Nenhum modelo encontrado em:", MODELS_DIR)
-        sys.exit(1)
-        
-    model_file = model_files[0]
-    print(f"Usando modelo: {model_file.name}")
-    model = joblib.load(model_file)
-
-    # Carregar dados
-    transactions_path = BASE_DIR / "data" / "raw" / "transações-desafio.xlsx"
-    commodities_path = BASE_DIR / "data" / "raw" / "mercado-desafio.xlsx"
-    transacoes, mercado = load_data(transactions_path, commodities_path)
-    merged_df = merge_data(transacoes, mercado)
-
-    # Verificar se a data é futura
-    last_known_date = merged_df["date"].max()
-    is_future_date = target_date > last_known_date
-    
-    if is_future_date:
-        print(f"AVISO: {target_date.date()} é uma data futura (após {last_known_date.date()})")
-        print("Gerando dados sintéticos baseados no último dia conhecido...")
-        
-        # Estender dataset com dados sintéticos
-        extended_df = prepare_future_date(merged_df, target_date)
-        
-        # Criar features com dados estendidos
-        df_features = create_features(extended_df)
-        
-        # Mensagem sobre premissas
-        print("\nPremissas para previsão futura:")
-        print("- Valores de commodities mantidos constantes")
-        print("- Features calculadas com base no histórico recente")
-        print("- Tendências mantidas do último período conhecido")
-    else:
-        # Criar features normalmente
-        df_features = create_features(merged_df)
-
-    # Verificar se a data existe no índice
-    if target_date not in df_features["date"].unique():
-        print(f"\nERRO: Data {target_date.date()} não disponível após processamento")
-        print(f"Datas disponíveis: {df_features['date'].min().date()} a {df_features['date'].max().date()}")
+        return resolve_target_dates(args.date, args.start, args.end, args.dates_file)
+    except (ValueError, OSError) as e:
+        print(f"Datas inválidas ({e}). Use YYYY-MM-DD")
         sys.exit(1)
-        
-    _, company_classes = prepare_target(df_features)    
-    # Isolar linha para a data desejada
-    X_target = df_features[df_features["date"] == target_date].drop(columns=['empresas_vendedoras'], errors='ignore')
-
-    # Remover coluna 'date' antes de prever
-    X_target = X_target.drop(columns=['date'], errors='ignore')
 
-    # Reordenar colunas para coincidir com o modelo
-    if hasattr(model, 'feature_names_in_'):
-        X_target = X_target[model.feature_names_in_]
-    elif hasattr(model, 'estimators_') and hasattr(model.estimators_[0], 'feature_names_in_'):
-        X_target = X_target[model.estimators_[0].feature_names_in_]
 
-    # Fazer previsões
-    probabilities = model.predict_proba(X_target)
-    
-    # Formatando resultados
-    print(f"\nProbabilidades para {target_date.date()}:")
-    # threshold = 0.95
-    results = []
-    for i, company in enumerate(company_classes):
-        # if probabilities[i][0][1] < threshold:
-        #     continue
+def main(target_dates, batch=False, model_ref=None, csv=None):
+    codigo = predict_pipeline(project_paths(BASE_DIR), target_dates, batch=batch, model_ref=model_ref, csv=csv)
+    if codigo:
+        sys.exit(codigo)
 
-        prob = probabilities[i][0][1] * 100  # Probabilidade em porcentagem
-        
-        results.append({
-            'Empresa': company,
-            'Probabilidade (%)': prob,
-            'Data': target_date.date(),
-            'Tipo': 'Futura' if is_future_date else 'Histórica'
-        })
-        print(f"- {company}: {prob:.2f}%")
-
-    # Salvar resultados em CSV
-    predictions_path = PREDICTIONS_DIR / f"predictions_{target_date.date()}.csv"
-    pd.DataFrame(results).to_csv(predictions_path, index=False)
-    print(f"\nResultados salvos em: {predictions_path}")
 
 if __name__ == "__main__":
-    if len(sys.argv) != 2:
-        print("Uso: python generate_predictions.py YYYY-MM-DD")
-        sys.exit(1)
-    
-    main(sys.argv[1])
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Gera previsões de vendas por empresa")
+    parser.add_argument("date", nargs="?", help="Data única (YYYY-MM-DD)")
+    parser.add_argument("--start", help="Início do intervalo de datas (YYYY-MM-DD)")
+    parser.add_argument("--end", help="Fim do intervalo de datas (YYYY-MM-DD, inclusivo)")
+    parser.add_argument("--dates-file", help="Arquivo com uma data por linha")
+    parser.add_argument("--horizon", type=int, help="Prevê os N dias seguintes ao histórico")
+    parser.add_argument("--feedback", action="store_true",
+                        help="Com --horizon: usa as vendas previstas de cada dia no estado do dia seguinte")
+    parser.add_argument("--model", help="Id ou apelido do modelo (padrão: AGROFUTURE_MODEL ou latest)")
+    parser.add_argument("--csv", action="store_true",
+                        help="Grava também um CSV da execução (padrão: AGROFUTURE_PREDICTIONS_CSV=1)")
+    args = parser.parse_args()
+
+    modos = [bool(args.date), bool(args.start or args.end), bool(args.dates_file), args.horizon is not None]
+    if sum(modos) != 1 or (modos[1] and not (args.start and args.end)):
+        parser.error("informe uma data, --start e --end, --dates-file ou --horizon")
+
+    if args.horizon is not None:
+        sys.exit(forecast_pipeline(project_paths(BASE_DIR), args.horizon, feedback=args.feedback,
+                                   model_ref=args.model, csv=args.csv or None))
+    main(parse_target_dates(args), batch=not args.date, model_ref=args.model, csv=args.csv or None)
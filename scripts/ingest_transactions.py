@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Ingestão em streaming de um histórico de transações para o feature store
+
+Para exportações que não cabem em memória: as transações são lidas em lotes
+(CSV, Parquet ou xlsx), juntadas ao mercado indexado e reduzidas direto às
+features diárias do store em data/processed/feature_store.
+
+Uso:
+    python ingest_transactions.py transacoes.csv
+    python ingest_transactions.py transacoes.parquet --chunk-rows 200000 --partition W
+    python ingest_transactions.py novas.csv --append
+"""
+
+import sys
+sys.path.insert(0, '/app/src')
+
+import argparse
+from pathlib import Path
+
+import pandas as pd
+
+from agrofuture.benchmarks.profiling import PeakRSS
+from agrofuture.data_loader import market_join_from_env
+from agrofuture.streaming import DEFAULT_CHUNK_ROWS, stream_to_feature_store
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+MERCADO_PATH = BASE_DIR / "data" / "raw" / "mercado-desafio.xlsx"
+STORE_PATH = BASE_DIR / "data" / "processed" / "feature_store"
+
+
+def read_market(path: Path) -> pd.DataFrame:
+    if path.suffix.lower() == ".csv":
+        return pd.read_csv(path, parse_dates=["Date"])
+    if path.suffix.lower() == ".parquet":
+        return pd.read_parquet(path)
+    return pd.read_excel(path)
+
+
+def main(args):
+    print(f"\nIngerindo {args.transactions} em lotes de {args.chunk_rows} linhas...")
+    with PeakRSS() as mem:
+        store, relatorio = stream_to_feature_store(
+            args.transactions, read_market(args.mercado), args.store,
+            chunk_rows=args.chunk_rows, partition_freq=args.partition,
+            spill_dir=args.spill_dir, append=args.append, **market_join_from_env(),
+        )
+    relatorio["peak_rss_delta_mb"] = round(mem.delta_mb, 1)
+
+    print(f"✅ {relatorio['rows']} transações em {relatorio['chunks']} lote(s) e "
+          f"{relatorio['partitions']} partição(ões) ({relatorio['days']} dias, {relatorio['companies']} empresas)")
+    if relatorio["rows_without_date"]:
+        print(f"AVISO: {relatorio['rows_without_date']} transação(ões) sem data ignorada(s)")
+    print(f"💾 Pico de memória da ingestão: +{relatorio['peak_rss_delta_mb']:.1f} MB "
+          f"(maior partição: {relatorio['max_partition_rows']} linhas)")
+    print(f"Feature store salvo em: {store.path}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Ingestão em streaming de transações para o feature store")
+    parser.add_argument("transactions", type=Path, help="Arquivo de transações (.csv, .parquet ou .xlsx)")
+    parser.add_argument("--mercado", type=Path, default=MERCADO_PATH, help="Planilha de mercado")
+    parser.add_argument("--store", type=Path, default=STORE_PATH, help="Diretório do feature store")
+    parser.add_argument("--chunk-rows", type=int, default=DEFAULT_CHUNK_ROWS)
+    parser.add_argument("--partition", default="M", help="Período das partições temporárias (M, W, D)")
+    parser.add_argument("--spill-dir", type=Path, help="Diretório para as partições temporárias")
+    parser.add_argument("--append", action="store_true", help="Acrescenta ao store existente")
+    main(parser.parse_args())
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Servidor de previsões residente
+
+Carrega dados, feature store e o modelo (o mais recente, ou o id/apelido
+de --model) uma única vez e atende requisições HTTP (ver agrofuture.server).
+Novos modelos gravados em outputs/models, ou um apelido movido para outro
+modelo, são carregados automaticamente.
+
+Uso:
+    python serve_predictions.py [--host 0.0.0.0] [--port 8000] [--model production]
+"""
+
+import sys
+sys.path.insert(0, '/app/src')
+
+import argparse
+import os
+from pathlib import Path
+
+from agrofuture.data_loader import load_data, market_join_from_env, merge_data
+from agrofuture.feature_store import sync_feature_store
+from agrofuture.fx_rates import FX_DB_FILE, default_rate_source
+from agrofuture.server import PredictionService, run_server
+
+# Configuração de paths
+BASE_DIR = Path(__file__).resolve().parent.parent
+MODELS_DIR = BASE_DIR / "outputs" / "models"
+PROCESSED_DATA_DIR = BASE_DIR / "data" / "processed"
+
+
+def main(args):
+    print("\nCarregando dados...")
+    transactions_path = BASE_DIR / "data" / "raw" / "transações-desafio.xlsx"
+    commodities_path = BASE_DIR / "data" / "raw" / "mercado-desafio.xlsx"
+    transacoes, mercado = load_data(transactions_path, commodities_path, cache_dir=PROCESSED_DATA_DIR / "cache")
+    merged_df = merge_data(transacoes, mercado, rate_source=default_rate_source(PROCESSED_DATA_DIR / FX_DB_FILE),
+                           **market_join_from_env())
+    store, _ = sync_feature_store(merged_df, PROCESSED_DATA_DIR / "feature_store")
+
+    try:
+        service = PredictionService(MODELS_DIR, merged_df, store, model_ref=args.model)
+    except FileNotFoundError as e:
+        print(e)
+        sys.exit(1)
+
+    run_server(service, host=args.host, port=args.port, poll_interval=args.poll_interval,
+               max_batch=args.max_batch, max_wait=args.max_wait_ms / 1000)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Servidor HTTP de previsões")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--model", default=os.environ.get("AGROFUTURE_MODEL", "latest"),
+                        help="Id ou apelido do modelo servido (padrão: AGROFUTURE_MODEL ou latest)")
+    parser.add_argument("--poll-interval", type=float, default=5.0,
+                        help="Intervalo (s) entre verificações de novos modelos")
+    parser.add_argument("--max-batch", type=int, default=512,
+                        help="Máximo de datas por micro-lote")
+    parser.add_argument("--max-wait-ms", type=float, default=5.0,
+                        help="Espera máxima (ms) para agrupar requisições concorrentes")
+    main(parser.parse_args())
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Busca de hiperparâmetros do XGBoost (ver agrofuture.tuning)
+
+Usa o feature store de data/processed e grava a melhor configuração em
+outputs/models/tuned_params.json; o run_pipeline.py seguinte treina com ela
+(quando o backend é o mesmo).
+
+Uso:
+    python tune_hyperparameters.py
+    python tune_hyperparameters.py --trials 40 --reduction 3 --backend native
+"""
+
+import sys
+sys.path.insert(0, '/app/src')
+
+import argparse
+import os
+from pathlib import Path
+
+from agrofuture.data_loader import load_data, market_join_from_env, merge_data
+from agrofuture.feature_store import sync_feature_store
+from agrofuture.fx_rates import FX_DB_FILE, default_rate_source
+from agrofuture.instrumentation import enable_tracing, format_trace
+from agrofuture.model_trainer import BACKENDS
+from agrofuture.tuning import TUNED_PARAMS_FILE, save_tuning_result, tune_hyperparameters
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+RAW_DATA_DIR = BASE_DIR / "data" / "raw"
+PROCESSED_DATA_DIR = BASE_DIR / "data" / "processed"
+MODELS_DIR = BASE_DIR / "outputs" / "models"
+
+
+def main(args):
+    if os.environ.get("AGROFUTURE_TRACE", "0") == "1":
+        enable_tracing()
+
+    print("Carregando dados...")
+    transacoes, mercado = load_data(RAW_DATA_DIR / "transações-desafio.xlsx", RAW_DATA_DIR / "mercado-desafio.xlsx",
+                                    cache_dir=PROCESSED_DATA_DIR / "cache")
+    merged_df = merge_data(transacoes, mercado, rate_source=default_rate_source(PROCESSED_DATA_DIR / FX_DB_FILE),
+                           **market_join_from_env())
+    _, df_features = sync_feature_store(merged_df, PROCESSED_DATA_DIR / "feature_store")
+
+    print(f"Avaliando {args.trials} configuração(ões) (backend: {args.backend})...")
+    result = tune_hyperparameters(
+        df_features, n_trials=args.trials, n_splits=args.splits, backend=args.backend,
+        max_rounds=args.max_rounds, early_stopping_rounds=args.early_stopping,
+        reduction=args.reduction, seed=args.seed,
+    )
+
+    treinados = sum(len(t["scores"]) for t in result["trials"])
+    print(f"✅ {treinados} treino(s) de fold em {result['timings']['search_s']:.2f}s "
+          f"(matrizes quantizadas: {result['timings']['matrices_s']:.2f}s)")
+    base = result["baseline"]
+    print(f"📉 {result['metric']} nos {base['folds']} primeiro(s) fold(s): {base['score']:.4f} (XGB_PARAMS) -> "
+          f"{base['best_score']:.4f} (configuração {result['best_trial']})")
+    for nome, valor in result["best_params"].items():
+        print(f"   - {nome:<18}: {valor}")
+
+    arquivo = save_tuning_result(result, args.output)
+    print(f"⚙️ Configuração salva em: {arquivo}")
+    if os.environ.get("AGROFUTURE_TRACE", "0") == "1":
+        print("\n" + format_trace())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Busca de hiperparâmetros do XGBoost")
+    parser.add_argument("--trials", type=int, default=20, help="Configurações avaliadas")
+    parser.add_argument("--splits", type=int, default=5, help="Folds da validação cruzada temporal")
+    parser.add_argument("--backend", choices=BACKENDS, default=os.environ.get("AGROFUTURE_BACKEND", "multioutput"))
+    parser.add_argument("--max-rounds", type=int, default=1000, help="Limite de árvores (early stopping escolhe quantas)")
+    parser.add_argument("--early-stopping", type=int, default=50, help="Rodadas sem melhora antes de parar")
+    parser.add_argument("--reduction", type=int, default=2, help="Fator do successive halving")
+    parser.add_argument("--seed", type=int, default=242)
+    parser.add_argument("--output", type=Path, default=MODELS_DIR / TUNED_PARAMS_FILE)
+    main(parser.parse_args())
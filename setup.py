@@ -16,7 +16,7 @@ setup(
         "console_scripts": [
             "agrofuture=agrofuture.cli:main",
             "agrofuture-train = agrofuture.model_trainer:main",
-            "agrofuture-predict=scripts.generate_predictions:main",
+            "agrofuture-predict=agrofuture.cli:predict_main",
         ]
     }
 )
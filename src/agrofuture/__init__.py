@@ -3,18 +3,39 @@ AgroFuture - IA na Previsão de Negociações
 
 Este pacote fornece funções para treinar e predizer negociações
 de commodities agrícolas com base em dados históricos.
+
+As funções abaixo são importadas sob demanda (PEP 562): `import agrofuture`
+não carrega pandas, scikit-learn nem XGBoost.
 """
 
-from .data_loader import load_data, merge_data
-from .feature_engineer import create_features, prepare_target
-from .model_trainer import train_and_validate
+from importlib import import_module
 
 __version__ = "0.1.0"
 
+_LAZY = {
+    "load_data": "agrofuture.data_loader",
+    "merge_data": "agrofuture.data_loader",
+    "create_features": "agrofuture.feature_engineer",
+    "prepare_target": "agrofuture.feature_engineer",
+    "train_and_validate": "agrofuture.model_trainer",
+}
+
 __all__ = [
     "load_data",
     "merge_data",
     "create_features",
     "prepare_target",
     "train_and_validate",
-]
\ No newline at end of file
+]
+
+
+def __getattr__(name):
+    if name in _LAZY:
+        valor = getattr(import_module(_LAZY[name]), name)
+        globals()[name] = valor
+        return valor
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
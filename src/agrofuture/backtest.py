@@ -0,0 +1,218 @@
+"""
+Backtest walk-forward: retreino periódico ao longo do histórico.
+
+A cada passo o modelo é treinado com os dias anteriores ao corte (janela
+crescente, ou móvel com `window_days`) e avaliado nos `cadence_days`
+seguintes; o corte então avança `cadence_days`. Isso simula, por exemplo, um
+retreino semanal ao longo dos últimos dois anos.
+
+Para que 100+ retreinos sejam viáveis:
+
+- a matriz de features (do feature store, calculada uma vez) é convertida
+  para float32 uma única vez; cada passo usa fatias contíguas de linhas
+  (uma linha por dia, localizadas por busca binária nas datas);
+- os boosters são aquecidos (warm start): cada passo continua o treino do
+  booster anterior com `xgb.train(..., xgb_model=...)`, acrescentando só
+  `warm_rounds` árvores sobre a janela atual, em vez de treinar
+  `n_estimators` árvores do zero. `full_refit_every` força um treino do
+  zero a cada N passos (limita o crescimento do número de árvores).
+
+Os thresholds de cada passo saem das previsões fora da amostra dos passos
+anteriores (`best_f1_thresholds`), como faria um modelo em produção; a
+série de thresholds por empresa mostra a deriva ao longo do tempo.
+"""
+
+import time
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+import xgboost as xgb
+from sklearn.metrics import f1_score, precision_score, recall_score
+
+from agrofuture.feature_engineer import prepare_target
+from agrofuture.instrumentation import span, traced
+from agrofuture.model_trainer import BACKENDS, MULTI_STRATEGY, XGB_PARAMS, best_f1_thresholds
+from agrofuture.parallel import available_threads
+from agrofuture.tuning import native_params
+
+
+class BacktestResult(NamedTuple):
+    """Métricas por passo, thresholds (passos x empresas) e probabilidades fora da amostra (datas x empresas)"""
+    steps: pd.DataFrame
+    thresholds: pd.DataFrame
+    predictions: pd.DataFrame
+
+    def threshold_drift(self) -> pd.DataFrame:
+        """Deriva dos thresholds por empresa: primeiro, último, mínimo, máximo, desvio e variação média por passo"""
+        thr = self.thresholds
+        return pd.DataFrame({
+            "first": thr.iloc[0],
+            "last": thr.iloc[-1],
+            "min": thr.min(),
+            "max": thr.max(),
+            "std": thr.std(ddof=0),
+            "mean_abs_change": thr.diff().abs().mean().fillna(0.0),
+        })
+
+
+def walk_forward_windows(dates: pd.DatetimeIndex, start: Optional[pd.Timestamp] = None,
+                         cadence_days: int = 7, window_days: Optional[int] = None,
+                         min_train_days: int = 60, lookback_days: int = 730) -> List[Tuple[pd.Timestamp, pd.Timestamp, pd.Timestamp]]:
+    """
+    Janelas (início do treino, corte, fim do teste) de cada passo
+
+    O treino usa [início, corte) e o teste [corte, fim). Sem `start`, o
+    primeiro corte é `lookback_days` antes da última data, respeitando
+    `min_train_days` de treino.
+    """
+    if cadence_days < 1:
+        raise ValueError("cadence_days deve ser >= 1")
+    primeira, ultima = dates.min(), dates.max()
+    minimo = primeira + pd.Timedelta(days=min_train_days)
+    corte = pd.Timestamp(start) if start is not None else max(minimo, ultima - pd.Timedelta(days=lookback_days))
+    corte = max(corte, minimo)
+    janelas = []
+    passo = pd.Timedelta(days=cadence_days)
+    while corte <= ultima:
+        inicio = primeira if window_days is None else max(primeira, corte - pd.Timedelta(days=window_days))
+        janelas.append((inicio, corte, corte + passo))
+        corte += passo
+    return janelas
+
+
+@traced(shape=False)
+def walk_forward_backtest(df_features: pd.DataFrame, backend: str = "multioutput",
+                          start: Optional[pd.Timestamp] = None, cadence_days: int = 7,
+                          window_days: Optional[int] = None, min_train_days: int = 60,
+                          lookback_days: int = 730, warm_start: bool = True,
+                          warm_rounds: Optional[int] = None, full_refit_every: int = 0,
+                          threshold_days: Optional[int] = None, params: Optional[Dict[str, Any]] = None,
+                          n_threads: Optional[int] = None) -> BacktestResult:
+    """
+    Avalia o retreino periódico do modelo ao longo do histórico
+
+    Args:
+        df_features: Matriz de features (saída de `create_features`/feature store)
+        backend: Backend de treino (ver model_trainer.BACKENDS)
+        start: Primeiro corte (padrão: `lookback_days` antes da última data)
+        cadence_days: Dias entre retreinos (e tamanho de cada período de teste)
+        window_days: Janela móvel de treino em dias (None = todo o histórico anterior)
+        min_train_days: Mínimo de dias de treino antes do primeiro corte
+        lookback_days: Período avaliado quando `start` não é informado
+        warm_start: Continua o booster do passo anterior em vez de treinar do zero
+        warm_rounds: Árvores acrescentadas por passo aquecido (padrão: n_estimators / 10)
+        full_refit_every: Treina do zero a cada N passos (0 = só no primeiro)
+        threshold_days: Dias de previsões fora da amostra usados nos thresholds
+            (None = todos os passos anteriores)
+        params: Parâmetros do XGBoost (sobre XGB_PARAMS)
+        n_threads: Threads do XGBoost (None = núcleos disponíveis)
+
+    Returns:
+        BacktestResult com uma linha por passo em `steps`
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Backend desconhecido: {backend} (use {BACKENDS})")
+    n_threads = available_threads() if n_threads is None else max(1, int(n_threads))
+    nativos, rodadas = native_params({**XGB_PARAMS, **(params or {})}, n_threads)
+    if backend != "multioutput":
+        nativos.update(multi_strategy=MULTI_STRATEGY[backend])
+    warm_rounds = max(1, rodadas // 10) if warm_rounds is None else int(warm_rounds)
+
+    # Matriz única (float32, uma linha por dia, ordenada) fatiada por intervalos de linhas
+    ordenado = df_features.sort_values("date", kind="stable").reset_index(drop=True)
+    y, company_classes = prepare_target(ordenado)
+    y = np.asarray(y, dtype=np.float32)
+    X_df = ordenado.drop(columns=["empresas_vendedoras", "date"])
+    nomes = list(X_df.columns)
+    X = X_df.to_numpy(dtype=np.float32)
+    datas = pd.DatetimeIndex(ordenado["date"])
+    n_empresas = y.shape[1]
+
+    janelas = walk_forward_windows(datas, start, cadence_days, window_days, min_train_days, lookback_days)
+    curto = "Histórico curto demais para o backtest (aumente o período ou reduza min_train_days)"
+    if not janelas:
+        raise ValueError(curto)
+
+    oof = np.full(y.shape, np.nan, dtype=np.float32)
+    boosters: Optional[List[xgb.Booster]] = None
+    linhas_passos, linhas_thr = [], []
+    for passo, (inicio, corte, fim) in enumerate(janelas):
+        i0, i1, i2 = datas.searchsorted([inicio, corte, fim])
+        if i2 <= i1 or i1 <= i0:
+            continue
+
+        # Thresholds a partir das previsões fora da amostra anteriores ao corte
+        anteriores = ~np.isnan(oof[:i1]).any(axis=1)
+        if threshold_days is not None:
+            anteriores &= np.asarray(datas[:i1] >= corte - pd.Timedelta(days=threshold_days))
+        if anteriores.any():
+            limiares, _ = best_f1_thresholds(y[:i1][anteriores], oof[:i1][anteriores])
+        else:
+            limiares = np.full(n_empresas, 0.5)
+
+        refit = boosters is None or not warm_start or (full_refit_every > 0 and passo % full_refit_every == 0)
+        n_rodadas = rodadas if refit else warm_rounds
+        with span("backtest_step", step=passo, train_rows=i1 - i0, test_rows=i2 - i1, refit=refit):
+            t0 = time.perf_counter()
+            dtrain = xgb.DMatrix(X[i0:i1], feature_names=nomes, nthread=n_threads)
+            if backend == "multioutput":
+                novos = []
+                for j in range(n_empresas):
+                    dtrain.set_label(y[i0:i1, j])
+                    novos.append(xgb.train(nativos, dtrain, num_boost_round=n_rodadas,
+                                           xgb_model=None if refit else boosters[j]))
+                boosters = novos
+            else:
+                dtrain.set_label(y[i0:i1])
+                boosters = [xgb.train(nativos, dtrain, num_boost_round=n_rodadas,
+                                      xgb_model=None if refit else boosters[0])]
+            fit_s = time.perf_counter() - t0
+
+            t0 = time.perf_counter()
+            dtest = xgb.DMatrix(X[i1:i2], feature_names=nomes, nthread=n_threads)
+            if backend == "multioutput":
+                proba = np.column_stack([b.predict(dtest) for b in boosters])
+            else:
+                proba = boosters[0].predict(dtest).reshape(i2 - i1, n_empresas)
+            predict_s = time.perf_counter() - t0
+
+        oof[i1:i2] = proba
+        y_teste = y[i1:i2].astype(int)
+        y_pred = (proba >= limiares).astype(int)
+        linhas_passos.append({
+            "step": passo,
+            "train_start": inicio.date(),
+            "cutoff": corte.date(),
+            "test_end": datas[i2 - 1].date(),
+            "train_days": int(i1 - i0),
+            "test_days": int(i2 - i1),
+            "refit": refit,
+            "trees": int(boosters[0].num_boosted_rounds()),
+            "f1_score": f1_score(y_teste, y_pred, average="micro", zero_division=0),
+            "precision": precision_score(y_teste, y_pred, average="micro", zero_division=0),
+            "recall": recall_score(y_teste, y_pred, average="micro", zero_division=0),
+            "logloss": _logloss(y[i1:i2], proba),
+            "positives": int(y_teste.sum()),
+            "predicted": int(y_pred.sum()),
+            "fit_s": round(fit_s, 4),
+            "predict_s": round(predict_s, 4),
+        })
+        linhas_thr.append(limiares)
+
+    if not linhas_passos:
+        # Todas as janelas sem dias de treino ou de teste (lacunas nas datas, cadência curta)
+        raise ValueError(curto)
+    steps = pd.DataFrame(linhas_passos)
+    thresholds = pd.DataFrame(np.vstack(linhas_thr), columns=list(company_classes),
+                              index=pd.DatetimeIndex(pd.to_datetime(steps["cutoff"]), name="cutoff"))
+    avaliados = ~np.isnan(oof).any(axis=1)
+    predictions = pd.DataFrame(oof[avaliados], columns=list(company_classes),
+                               index=pd.DatetimeIndex(datas[avaliados], name="date"))
+    return BacktestResult(steps=steps, thresholds=thresholds, predictions=predictions)
+
+
+def _logloss(y_true: np.ndarray, proba: np.ndarray) -> float:
+    """Logloss binária média sobre todas as (data, empresa)"""
+    p = np.clip(proba.astype(np.float64), 1e-7, 1 - 1e-7)
+    return float(-np.mean(y_true * np.log(p) + (1 - y_true) * np.log(1 - p)))
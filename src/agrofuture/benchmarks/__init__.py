@@ -0,0 +1,26 @@
+"""
+Benchmarks do pipeline sobre dados sintéticos semeados.
+
+Uso:
+    python -m agrofuture.benchmarks --grid tiny small
+    python -m agrofuture.benchmarks --grid small --compare outputs/reports/benchmarks/benchmark_<data>.json
+"""
+
+from .profiling import PeakRSS, measure, measure_command
+from .suite import SIZE_GRID, STAGES, compare_results, run_size, run_startup, run_suite, save_results
+from .synthetic import DatasetSize, generate_dataset
+
+__all__ = [
+    "DatasetSize",
+    "generate_dataset",
+    "PeakRSS",
+    "measure",
+    "measure_command",
+    "SIZE_GRID",
+    "STAGES",
+    "run_size",
+    "run_startup",
+    "run_suite",
+    "compare_results",
+    "save_results",
+]
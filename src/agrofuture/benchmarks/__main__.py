@@ -0,0 +1,69 @@
+"""
+Linha de comando da suíte de benchmarks (`python -m agrofuture.benchmarks`).
+"""
+
+import argparse
+import json
+import sys
+from pathlib import Path
+
+from agrofuture.benchmarks.suite import SIZE_GRID, STAGES, compare_results, run_suite, save_results
+from agrofuture.benchmarks.synthetic import DatasetSize
+
+DEFAULT_OUTPUT_DIR = Path("outputs") / "reports" / "benchmarks"
+
+
+def parse_size(texto: str) -> DatasetSize:
+    """Tamanho nomeado da grade ou 'empresas,produtos,cidades,dias[,transacoes_por_dia]'"""
+    if texto in SIZE_GRID:
+        return SIZE_GRID[texto]
+    partes = texto.split(",")
+    if len(partes) not in (4, 5):
+        raise argparse.ArgumentTypeError(f"tamanho inválido: {texto} (use {list(SIZE_GRID)} ou c,p,m,d[,tx])")
+    valores = [int(p) for p in partes[:4]] + [float(p) for p in partes[4:]]
+    return DatasetSize(*valores)
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m agrofuture.benchmarks",
+                                     description="Benchmarks do pipeline com dados sintéticos")
+    parser.add_argument("--grid", nargs="+", default=["tiny", "small"],
+                        help=f"Tamanhos: {list(SIZE_GRID)} ou 'empresas,produtos,cidades,dias[,tx_por_dia]'")
+    parser.add_argument("--stages", nargs="+", default=list(STAGES), choices=STAGES)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--n-splits", type=int, default=3)
+    parser.add_argument("--repeat", type=int, default=1, help="Repetições por etapa (usa a mais rápida)")
+    parser.add_argument("--output-dir", type=Path, default=DEFAULT_OUTPUT_DIR)
+    parser.add_argument("--compare", type=Path, help="JSON de uma execução anterior para comparação")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="Aumento relativo de tempo tolerado antes de acusar regressão")
+    parser.add_argument("--verbose", action="store_true", help="Mostra as mensagens das etapas")
+    parser.add_argument("--skip-startup", action="store_true",
+                        help="Não mede o início de processos novos (import agrofuture, agrofuture --help)")
+    return parser
+
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    sizes = {nome: parse_size(nome) for nome in args.grid}
+
+    resultados = run_suite(sizes, seed=args.seed, stages=args.stages, n_splits=args.n_splits,
+                           repeat=args.repeat, quiet=not args.verbose, startup=not args.skip_startup)
+    path = save_results(resultados, args.output_dir)
+    print(f"\n📄 Resultados salvos em: {path}")
+
+    if args.compare:
+        baseline = json.loads(args.compare.read_text(encoding="utf-8"))
+        linhas = compare_results(baseline, resultados, tolerance=args.tolerance)
+        print(f"\nComparação com {args.compare.name} (tolerância {args.tolerance:.0%}):")
+        for linha in linhas:
+            marca = "❌" if linha["regression"] else "✅"
+            print(f" {marca} {linha['size']:<10} {linha['stage']:<20} "
+                  f"{linha['baseline']:>9.3f}s -> {linha['current']:>9.3f}s  (x{linha['ratio']:.2f})")
+        if any(linha["regression"] for linha in linhas):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
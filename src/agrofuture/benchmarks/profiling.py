@@ -0,0 +1,95 @@
+"""
+Medição de tempo e memória de uma chamada (ou de um processo novo).
+"""
+
+import gc
+import resource
+import subprocess
+import sys
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Sequence, Tuple
+
+import psutil
+
+
+class PeakRSS:
+    """Amostra o RSS do processo em uma thread enquanto o bloco executa"""
+
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self.process = psutil.Process()
+        self.base = 0
+        self.peak = 0
+        self._stop = threading.Event()
+
+    def _sample(self):
+        while not self._stop.is_set():
+            self.peak = max(self.peak, self.process.memory_info().rss)
+            time.sleep(self.interval)
+
+    def __enter__(self):
+        self.base = self.process.memory_info().rss
+        self.peak = self.base
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, self.process.memory_info().rss)
+
+    @property
+    def delta_mb(self) -> float:
+        """Crescimento do RSS acima do início do bloco, em MB"""
+        return (self.peak - self.base) / 2**20
+
+
+def measure(fn: Callable[..., Any], *args, **kwargs) -> Tuple[Any, Dict[str, float]]:
+    """
+    Executa `fn(*args, **kwargs)` medindo tempo de parede, CPU e pico de RSS
+
+    Returns:
+        (resultado, {"wall_s", "cpu_s", "peak_rss_mb", "rss_mb"})
+    """
+    gc.collect()
+    with PeakRSS() as mem:
+        wall = time.perf_counter()
+        cpu = time.process_time()
+        resultado = fn(*args, **kwargs)
+        cpu = time.process_time() - cpu
+        wall = time.perf_counter() - wall
+    return resultado, {
+        "wall_s": round(wall, 4),
+        "cpu_s": round(cpu, 4),
+        "peak_rss_mb": round(mem.delta_mb, 2),
+        "rss_mb": round(mem.peak / 2**20, 1),
+    }
+
+
+def measure_command(argv: Sequence[str], repeat: int = 3,
+                    env: Optional[Dict[str, str]] = None) -> Dict[str, float]:
+    """
+    Tempo de um processo Python novo (ex.: custo de importação da CLI), o menor de `repeat` execuções
+
+    Returns:
+        {"wall_s", "cpu_s", "peak_rss_mb"} (CPU e RSS do processo filho)
+    """
+    melhor: Dict[str, float] = {}
+    for _ in range(max(1, repeat)):
+        antes = resource.getrusage(resource.RUSAGE_CHILDREN)
+        wall = time.perf_counter()
+        subprocess.run([sys.executable, *argv], check=True, stdout=subprocess.DEVNULL, env=env)
+        wall = time.perf_counter() - wall
+        depois = resource.getrusage(resource.RUSAGE_CHILDREN)
+        metricas = {
+            "wall_s": round(wall, 4),
+            "cpu_s": round((depois.ru_utime + depois.ru_stime) - (antes.ru_utime + antes.ru_stime), 4),
+            # ru_maxrss (KB no Linux) é o maior filho até aqui
+            "peak_rss_mb": round(depois.ru_maxrss / 1024, 2),
+        }
+        if not melhor or metricas["wall_s"] < melhor["wall_s"]:
+            melhor = metricas
+    return melhor
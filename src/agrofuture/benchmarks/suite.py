@@ -0,0 +1,242 @@
+"""
+Suíte de benchmarks do pipeline completo sobre dados sintéticos.
+
+Para cada tamanho da grade gera dados semeados e mede cada etapa:
+`apply_schema`, `merge_data`, `create_features`, `prepare_target`, `train_and_validate`,
+previsão de uma data e previsão em lote. A entrada "startup" mede o início
+de um processo novo (`import agrofuture` e `agrofuture --help`), que não
+deve carregar pandas/XGBoost. O resultado é um dicionário JSON
+com metadados do ambiente, que pode ser comparado entre execuções com
+`compare_results`.
+"""
+
+import contextlib
+import io
+import json
+import os
+import platform
+import subprocess
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from agrofuture.benchmarks.profiling import measure, measure_command
+from agrofuture.benchmarks.synthetic import DatasetSize, generate_dataset
+from agrofuture.schema import format_memory_report
+
+SIZE_GRID: Dict[str, DatasetSize] = {
+    "tiny": DatasetSize(companies=8, products=4, cities=3, days=60, transactions_per_day=20),
+    "small": DatasetSize(companies=12, products=7, cities=5, days=120, transactions_per_day=25),
+    "medium": DatasetSize(companies=50, products=8, cities=20, days=365, transactions_per_day=100),
+    "large": DatasetSize(companies=200, products=12, cities=60, days=730, transactions_per_day=400),
+}
+
+STAGES = ("apply_schema", "merge_data", "create_features", "prepare_target", "train_and_validate",
+          "predict_single", "predict_batch")
+
+# Datas previstas na etapa predict_batch (as últimas do histórico)
+BATCH_DAYS = 30
+
+
+# Comandos medidos em um processo novo (entrada "startup" dos resultados)
+STARTUP_COMMANDS = {
+    "import_agrofuture": ["-c", "import agrofuture"],
+    "cli_help": ["-m", "agrofuture.cli", "--help"],
+}
+
+
+def run_startup(repeat: int = 3) -> Dict[str, Any]:
+    """Tempo de início de processos novos, no mesmo formato de `run_size`"""
+    # O processo filho importa este mesmo pacote (mesmo sem instalação)
+    raiz = str(Path(__file__).resolve().parents[2])
+    env = {**os.environ, "PYTHONPATH": os.pathsep.join(filter(None, [raiz, os.environ.get("PYTHONPATH")]))}
+    return {"name": "startup", "label": "processo novo",
+            "stages": {nome: measure_command(argv, repeat, env) for nome, argv in STARTUP_COMMANDS.items()}}
+
+
+def run_size(size: DatasetSize, seed: int = 0, stages: Sequence[str] = STAGES,
+             n_splits: int = 3, repeat: int = 1, quiet: bool = True) -> Dict[str, Any]:
+    """
+    Mede as etapas do pipeline para um tamanho de dados
+
+    Args:
+        size: Dimensões do conjunto sintético
+        seed: Semente do gerador
+        stages: Etapas a medir (as anteriores são executadas mesmo se não medidas)
+        n_splits: Folds da validação cruzada em `train_and_validate`
+        repeat: Repetições por etapa (reporta a de menor tempo de parede)
+        quiet: Suprime as mensagens impressas pelas etapas
+
+    Returns:
+        {"size": ..., "shape": ..., "stages": {etapa: métricas}}
+    """
+    from agrofuture.data_loader import merge_data
+    from agrofuture.feature_engineer import create_features, prepare_target
+    from agrofuture.fx_rates import ConstantRateSource
+    from agrofuture.model_trainer import train_and_validate
+    from agrofuture.predictor import predict_dates
+    from agrofuture.schema import apply_schema, memory_report
+
+    transacoes, mercado = generate_dataset(size, seed=seed)
+    rates = ConstantRateSource()
+    resultado: Dict[str, Any] = {"size": size._asdict(), "label": size.label, "seed": seed, "stages": {}}
+    ultima = _last_stage(stages)
+
+    def etapa(nome, fn, *args, **kwargs):
+        melhor, saida = None, None
+        for _ in range(repeat if nome in stages else 1):
+            with _silenciado(quiet):
+                saida, metricas = measure(fn, *args, **kwargs)
+            if melhor is None or metricas["wall_s"] < melhor["wall_s"]:
+                melhor = metricas
+        if nome in stages:
+            melhor.update(_shape(saida))
+            resultado["stages"][nome] = melhor
+        return saida
+
+    transacoes, mercado = etapa("apply_schema", lambda: apply_schema(transacoes.copy(), mercado.copy()))
+    if ultima == "apply_schema":
+        return resultado
+
+    merged = etapa("merge_data", lambda: merge_data(transacoes.copy(), mercado.copy(), rate_source=rates))
+    resultado["shape"] = {"transacoes": len(transacoes), "mercado": len(mercado), "merged": len(merged)}
+    resultado["memory"] = memory_report(merged)
+    if ultima == "merge_data":
+        return resultado
+
+    df_features = etapa("create_features", create_features, merged)
+    if ultima == "create_features":
+        return resultado
+
+    etapa("prepare_target", lambda: prepare_target(df_features.copy())[0])
+    if ultima == "prepare_target":
+        return resultado
+
+    model, _, _ = etapa("train_and_validate", train_and_validate, merged,
+                        n_splits=n_splits, df_features=df_features.copy())
+    if ultima == "train_and_validate":
+        return resultado
+
+    _, company_classes = prepare_target(df_features.copy())
+    datas = np.sort(df_features["date"].unique())
+    etapa("predict_single", predict_dates, model, df_features, [datas[-1]],
+          company_classes=company_classes)
+    etapa("predict_batch", predict_dates, model, df_features, list(datas[-BATCH_DAYS:]),
+          company_classes=company_classes)
+    return resultado
+
+
+def run_suite(sizes: Dict[str, DatasetSize], seed: int = 0, stages: Sequence[str] = STAGES,
+              n_splits: int = 3, repeat: int = 1, quiet: bool = True, startup: bool = True) -> Dict[str, Any]:
+    """Executa `run_startup` e `run_size` para cada tamanho e adiciona os metadados do ambiente"""
+    resultados = []
+    if startup:
+        resultado = run_startup(max(3, repeat))
+        print("▶ startup: processo novo")
+        for etapa, metricas in resultado["stages"].items():
+            print(f"   {etapa:<20} {metricas['wall_s']:>9.3f}s  cpu {metricas['cpu_s']:>9.3f}s")
+        resultados.append(resultado)
+    for nome, size in sizes.items():
+        print(f"▶ {nome}: {size.label}")
+        resultado = run_size(size, seed=seed, stages=stages, n_splits=n_splits, repeat=repeat, quiet=quiet)
+        resultado["name"] = nome
+        for etapa, metricas in resultado["stages"].items():
+            print(f"   {etapa:<20} {metricas['wall_s']:>9.3f}s  cpu {metricas['cpu_s']:>9.3f}s  "
+                  f"+{metricas['peak_rss_mb']:>8.1f}MB")
+        if "memory" in resultado:
+            print(f"   {'merged (schema)':<20} {format_memory_report(resultado['memory'])}")
+        resultados.append(resultado)
+    return {"meta": environment_metadata(seed, n_splits, repeat), "results": resultados}
+
+
+def compare_results(baseline: Dict[str, Any], current: Dict[str, Any], tolerance: float = 0.2,
+                    metric: str = "wall_s") -> List[Dict[str, Any]]:
+    """
+    Compara duas execuções etapa a etapa
+
+    Args:
+        baseline: Resultado de referência (JSON de uma execução anterior)
+        current: Resultado atual
+        tolerance: Aumento relativo tolerado antes de marcar regressão
+        metric: Métrica comparada ("wall_s", "cpu_s" ou "peak_rss_mb")
+
+    Returns:
+        Uma linha por (tamanho, etapa) presente nas duas execuções
+    """
+    anteriores = {(r.get("name", r["label"]), etapa): m
+                  for r in baseline["results"] for etapa, m in r["stages"].items()}
+    linhas = []
+    for r in current["results"]:
+        for etapa, metricas in r["stages"].items():
+            chave = (r.get("name", r["label"]), etapa)
+            if chave not in anteriores:
+                continue
+            antes, agora = anteriores[chave][metric], metricas[metric]
+            razao = agora / antes if antes else float("inf") if agora else 1.0
+            linhas.append({
+                "size": chave[0], "stage": etapa, "metric": metric,
+                "baseline": antes, "current": agora, "ratio": round(razao, 3),
+                "regression": razao > 1 + tolerance,
+            })
+    return linhas
+
+
+def environment_metadata(seed: int, n_splits: int, repeat: int) -> Dict[str, Any]:
+    import sklearn
+    import xgboost
+
+    return {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "git_commit": _git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "sklearn": sklearn.__version__,
+        "xgboost": xgboost.__version__,
+        "seed": seed,
+        "n_splits": n_splits,
+        "repeat": repeat,
+    }
+
+
+def save_results(results: Dict[str, Any], output_dir: Path) -> Path:
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    path = output_dir / f"benchmark_{datetime.now().strftime('%Y%m%d%H%M%S')}.json"
+    path.write_text(json.dumps(results, indent=2, ensure_ascii=False), encoding="utf-8")
+    return path
+
+
+def _last_stage(stages: Sequence[str]) -> str:
+    pedidas = [s for s in STAGES if s in stages]
+    return pedidas[-1] if pedidas else STAGES[0]
+
+
+def _shape(saida: Any) -> Dict[str, int]:
+    if isinstance(saida, pd.DataFrame):
+        return {"rows": int(saida.shape[0]), "cols": int(saida.shape[1])}
+    if isinstance(saida, np.ndarray):
+        return {"rows": int(saida.shape[0]), "cols": int(saida.shape[1]) if saida.ndim > 1 else 1}
+    return {}
+
+
+@contextlib.contextmanager
+def _silenciado(ativo: bool):
+    if not ativo:
+        yield
+        return
+    with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+        yield
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=Path(__file__).resolve().parent, timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
@@ -0,0 +1,106 @@
+"""
+Gerador sintético de planilhas de transações e de mercado.
+
+Produz DataFrames com as mesmas colunas (e capitalização) das planilhas do
+desafio, prontos para `merge_data`. Toda a aleatoriedade vem de um único
+`numpy.random.Generator` semeado, então o mesmo tamanho e semente geram
+sempre os mesmos dados.
+"""
+
+from typing import NamedTuple, Tuple
+
+import numpy as np
+import pandas as pd
+
+PRODUTOS_BASE = ["soja", "milho", "trigo", "cafe", "algodao", "sorgo", "feijao", "arroz"]
+ESTADOS = ["MT", "GO", "PR", "MS", "MG", "RS", "BA", "SP"]
+DESTINOS = [("Santos", "SP"), ("Paranagua", "PR"), ("Rio Grande", "RS"), ("Itaqui", "MA")]
+
+
+class DatasetSize(NamedTuple):
+    """Dimensões de um conjunto sintético"""
+    companies: int = 12
+    products: int = 7
+    cities: int = 5
+    days: int = 120
+    transactions_per_day: float = 25.0
+
+    @property
+    def label(self) -> str:
+        return f"{self.companies}c_{self.products}p_{self.cities}m_{self.days}d"
+
+
+def generate_dataset(size: DatasetSize = DatasetSize(), seed: int = 0,
+                     start: str = "2024-01-01", weekdays_only: bool = True,
+                     market_coverage: float = 0.8) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Gera (transacoes, mercado) no formato das planilhas originais
+
+    Args:
+        size: Empresas, produtos, cidades, dias e transações por dia
+        seed: Semente do gerador
+        start: Primeiro dia do calendário
+        weekdays_only: Gera negociações apenas em dias úteis (como o dado real)
+        market_coverage: Fração das combinações dia x produto x cidade com cotação
+
+    Returns:
+        (transacoes, mercado)
+    """
+    rng = np.random.default_rng(seed)
+    empresas = np.array([f"Empresa{i:0{max(2, len(str(size.companies - 1)))}d}" for i in range(size.companies)])
+    produtos = np.array(_names(PRODUTOS_BASE, size.products))
+    cidades = np.array([f"Cidade{i:03d}" for i in range(size.cities)])
+    estados = np.array([ESTADOS[i % len(ESTADOS)] for i in range(size.cities)])
+
+    dias = pd.date_range(start, periods=size.days, freq="D")
+    if weekdays_only:
+        dias = dias[dias.dayofweek < 5]
+
+    # Empresas e produtos com popularidade desigual (como no dado real); o piso
+    # evita empresas que nunca vendem em um fold (XGBoost rejeita rótulo constante)
+    peso_empresa = 0.5 + rng.gamma(2.0, 1.0, size.companies)
+    peso_produto = rng.gamma(1.5, 1.0, size.products)
+
+    n_tx = max(1, int(round(len(dias) * size.transactions_per_day)))
+    empresa_idx = rng.choice(size.companies, n_tx, p=peso_empresa / peso_empresa.sum())
+    produto_idx = rng.choice(size.products, n_tx, p=peso_produto / peso_produto.sum())
+    cidade_idx = rng.integers(0, size.cities, n_tx)
+    destino_idx = rng.integers(0, len(DESTINOS), n_tx)
+    amount = rng.gamma(2.0, 50.0, n_tx).round(2)
+    amount[rng.random(n_tx) < 0.1] = 0
+
+    transacoes = pd.DataFrame({
+        "Date": rng.choice(dias.to_numpy(), n_tx),
+        "Time": [f"{h:02d}:{m:02d}" for h, m in zip(rng.integers(8, 18, n_tx), rng.integers(0, 60, n_tx))],
+        "Company": empresas[empresa_idx],
+        "Seller ID": rng.integers(1, 500, n_tx),
+        "Buyer ID": rng.integers(1, 500, n_tx),
+        "Price": rng.normal(120, 10, n_tx).round(2),
+        "Amount": amount,
+        "Product": produtos[produto_idx],
+        "Origin_City": cidades[cidade_idx],
+        "Origin_State": estados[cidade_idx],
+        "Destination_City": [DESTINOS[i][0] for i in destino_idx],
+        "Destination_State": [DESTINOS[i][1] for i in destino_idx],
+    })
+
+    # Mercado: grade dia x produto x cidade com parte das combinações ausente
+    grade = pd.MultiIndex.from_product([dias, range(size.products), range(size.cities)],
+                                       names=["Date", "p", "c"]).to_frame(index=False)
+    grade = grade[rng.random(len(grade)) < market_coverage].reset_index(drop=True)
+    mercado = pd.DataFrame({
+        "Date": grade["Date"],
+        "Company": "Mkt",
+        "Product": produtos[grade["p"].to_numpy()],
+        "Origin_City": cidades[grade["c"].to_numpy()],
+        "Origin_State": estados[grade["c"].to_numpy()],
+        "Price": 100 + rng.normal(0, 5, len(grade)),
+        "CBOT": rng.normal(10, 1, len(grade)),
+    })
+    return transacoes, mercado
+
+
+def _names(base, n):
+    if n <= len(base):
+        return base[:n]
+    return base + [f"produto{i:03d}" for i in range(len(base), n)]
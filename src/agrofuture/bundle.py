@@ -0,0 +1,233 @@
+"""
+Pacote de modelo: boosters nativos do XGBoost + manifesto JSON.
+
+Em vez de serializar o `MultiOutputClassifier` inteiro com joblib, o modelo
+treinado é gravado como um diretório versionado:
+
+    xgboost_model_<timestamp>/
+        manifest.json        formato, backend, features (nome e ordem),
+                             empresas, thresholds, parâmetros, métricas e a
+                             impressão digital dos dados de treino
+        booster_000.ubj ...  um booster UBJSON por empresa ("multioutput")
+        booster.ubj          ou um único booster multi-saída ("native*")
+
+`ModelBundle.load` lê apenas o manifesto; os boosters são carregados na
+primeira previsão. O XGBoost copia o modelo para as próprias estruturas ao
+carregar (não há leitura mapeada em memória na API), então o ganho vem de
+não desserializar objetos Python/scikit-learn e de adiar a leitura.
+
+`ModelBundle` expõe a mesma interface usada pelo restante do projeto
+(`predict_proba` como lista de arrays (n, 2), `feature_names_in_`) e
+`predict` aplica os thresholds salvos de cada empresa.
+"""
+
+import json
+import os
+import shutil
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Union
+
+import numpy as np
+import pandas as pd
+import xgboost as xgb
+
+BUNDLE_FORMAT = "agrofuture-model-bundle"
+BUNDLE_FORMAT_VERSION = 1
+MANIFEST_FILE = "manifest.json"
+
+
+def save_bundle(model, path: Union[str, Path], company_classes: Sequence[str], feature_names: Sequence[str],
+                thresholds: Dict[str, float], backend: str, params: Optional[Dict[str, Any]] = None,
+                fingerprint: Optional[Dict[str, Any]] = None, metrics: Optional[Dict[str, Any]] = None) -> Path:
+    """
+    Grava um modelo treinado como pacote em `path` (diretório novo)
+
+    A gravação acontece em um diretório temporário oculto ao lado de `path`,
+    renomeado no final: quem procura o modelo mais recente nunca vê um pacote
+    pela metade.
+
+    Args:
+        model: MultiOutputClassifier de XGBClassifier, NativeMultiLabelXGB ou
+            ModelBundle (ver `ModelBundle.from_boosters`) treinado
+        company_classes: Empresas na ordem das saídas do modelo
+        feature_names: Features na ordem usada no treino
+        thresholds: Threshold de decisão por empresa
+        backend: Backend de treino (ver model_trainer.BACKENDS)
+        params: Parâmetros do XGBoost usados
+        fingerprint: Impressão digital dos dados de treino (ver FeatureStore.fingerprint)
+        metrics: Métricas de teste
+    """
+    path = Path(path)
+    tmp = path.with_name(f".{path.name}.tmp")
+    shutil.rmtree(tmp, ignore_errors=True)
+    tmp.mkdir(parents=True)
+
+    if hasattr(model, "estimators_"):
+        boosters = [est.get_booster() for est in model.estimators_]
+        multi_strategy = None
+    elif isinstance(model, ModelBundle):
+        # Boosters treinados diretamente com xgb.train (ex.: agrofuture.external_memory)
+        boosters, multi_strategy = model.boosters, model.multi_strategy
+    else:
+        boosters = [model.get_booster()]
+        multi_strategy = model.multi_strategy
+    arquivos = [f"booster_{i:03d}.ubj" for i in range(len(boosters))] if multi_strategy is None else ["booster.ubj"]
+    for booster, arquivo in zip(boosters, arquivos):
+        booster.save_model(str(tmp / arquivo))
+
+    manifest = {
+        "format": BUNDLE_FORMAT,
+        "version": BUNDLE_FORMAT_VERSION,
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "xgboost": xgb.__version__,
+        "backend": backend,
+        "multi_strategy": multi_strategy,
+        "boosters": arquivos,
+        "feature_names": list(feature_names),
+        "company_classes": [str(c) for c in company_classes],
+        "thresholds": {str(c): float(thresholds[c]) for c in company_classes if c in thresholds},
+        "params": _jsonable(params or {}),
+        "training_data": _jsonable(fingerprint or {}),
+        "metrics": _jsonable(metrics or {}),
+    }
+    with open(tmp / MANIFEST_FILE, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, ensure_ascii=False)
+
+    if path.exists():
+        shutil.rmtree(path)
+    os.replace(tmp, path)
+    return path
+
+
+def is_bundle(path: Union[str, Path]) -> bool:
+    return (Path(path) / MANIFEST_FILE).is_file()
+
+
+class ModelBundle:
+    """
+    Modelo carregado de um pacote (boosters lidos sob demanda)
+
+    Args:
+        path: Diretório do pacote
+        manifest: Conteúdo de manifest.json
+    """
+
+    def __init__(self, path: Path, manifest: Dict[str, Any]):
+        self.path = Path(path)
+        self.manifest = manifest
+        self.backend: str = manifest["backend"]
+        self.multi_strategy: Optional[str] = manifest.get("multi_strategy")
+        self.company_classes: List[str] = list(manifest["company_classes"])
+        self.thresholds: Dict[str, float] = dict(manifest["thresholds"])
+        self.feature_names_in_ = np.asarray(manifest["feature_names"], dtype=object)
+        self._boosters: Optional[List[xgb.Booster]] = None
+
+    @classmethod
+    def load(cls, path: Union[str, Path]) -> "ModelBundle":
+        """Lê o manifesto; ValueError se o diretório não for um pacote compatível"""
+        path = Path(path)
+        try:
+            with open(path / MANIFEST_FILE, encoding="utf-8") as f:
+                manifest = json.load(f)
+        except FileNotFoundError:
+            raise ValueError(f"{path} não é um pacote de modelo ({MANIFEST_FILE} ausente)") from None
+        if manifest.get("format") != BUNDLE_FORMAT or manifest.get("version") != BUNDLE_FORMAT_VERSION:
+            raise ValueError(f"Pacote de modelo incompatível em {path}")
+        return cls(path, manifest)
+
+    @classmethod
+    def from_boosters(cls, boosters: Sequence[xgb.Booster], backend: str, multi_strategy: Optional[str],
+                      feature_names: Sequence[str], company_classes: Sequence[str],
+                      thresholds: Optional[Dict[str, float]] = None) -> "ModelBundle":
+        """
+        Pacote em memória (ainda não gravado) a partir de boosters do `xgb.train`
+
+        Args:
+            boosters: Um booster por empresa (multi_strategy None) ou um único booster multi-saída
+        """
+        manifest = {
+            "format": BUNDLE_FORMAT,
+            "version": BUNDLE_FORMAT_VERSION,
+            "backend": backend,
+            "multi_strategy": multi_strategy,
+            "boosters": [],
+            "feature_names": list(feature_names),
+            "company_classes": [str(c) for c in company_classes],
+            "thresholds": dict(thresholds or {}),
+        }
+        bundle = cls(Path(), manifest)
+        bundle._boosters = list(boosters)
+        return bundle
+
+    @property
+    def boosters(self) -> List[xgb.Booster]:
+        if self._boosters is None:
+            boosters = []
+            for arquivo in self.manifest["boosters"]:
+                booster = xgb.Booster()
+                booster.load_model(str(self.path / arquivo))
+                boosters.append(booster)
+            self._boosters = boosters
+        return self._boosters
+
+    @property
+    def loaded(self) -> bool:
+        return self._boosters is not None
+
+    def _matrix(self, X: pd.DataFrame) -> xgb.DMatrix:
+        return xgb.DMatrix(X[list(self.feature_names_in_)])
+
+    def predict_proba_matrix(self, X: pd.DataFrame) -> np.ndarray:
+        """Probabilidades positivas como matriz (n_amostras, n_empresas)"""
+        matriz = self._matrix(X)
+        if self.multi_strategy is None:
+            return np.column_stack([b.predict(matriz) for b in self.boosters])
+        return self.boosters[0].predict(matriz).reshape(matriz.num_row(), -1)
+
+    def predict_proba(self, X: pd.DataFrame) -> List[np.ndarray]:
+        """Lista (uma por empresa) de arrays (n_amostras, 2), como no MultiOutputClassifier"""
+        positivas = self.predict_proba_matrix(X)
+        return [np.column_stack([1 - positivas[:, i], positivas[:, i]]) for i in range(positivas.shape[1])]
+
+    def threshold_array(self) -> np.ndarray:
+        return np.array([self.thresholds.get(c, 0.5) for c in self.company_classes])
+
+    def predict(self, X: pd.DataFrame) -> np.ndarray:
+        """Decisão por empresa com o threshold salvo de cada uma (0.5 quando ausente)"""
+        return (self.predict_proba_matrix(X) >= self.threshold_array()).astype(int)
+
+    def importances_by_target(self, feature_names: List[str]) -> pd.DataFrame:
+        """Importância (gain) das features por empresa (features x empresas), como no NativeMultiLabelXGB"""
+        from agrofuture.multilabel import booster_importances_by_target
+
+        if self.multi_strategy is None:
+            return pd.concat([pd.Series(b.get_score(importance_type="gain"), dtype=float)
+                              .reindex(feature_names, fill_value=0.0) for b in self.boosters],
+                             axis=1, ignore_index=True)
+        return booster_importances_by_target(self.boosters[0], self.multi_strategy,
+                                             len(self.company_classes), feature_names)
+
+    def predict_contribs(self, X: pd.DataFrame) -> np.ndarray:
+        """Contribuições TreeSHAP (n_amostras, n_empresas, n_features + 1; a última é o viés)"""
+        if self.multi_strategy == "multi_output_tree":
+            raise ValueError("Contribuições não disponíveis para árvores multi-saída (backend native); "
+                             "use multioutput ou native_per_target")
+        matriz = self._matrix(X)
+        if self.multi_strategy is None:
+            return np.stack([b.predict(matriz, pred_contribs=True) for b in self.boosters], axis=1)
+        tensor = self.boosters[0].predict(matriz, pred_contribs=True)
+        return tensor if tensor.ndim == 3 else tensor[:, None, :]
+
+
+def _jsonable(valor):
+    """Converte tipos NumPy/pandas (ex.: thresholds float64, datas) para JSON"""
+    if isinstance(valor, dict):
+        return {str(k): _jsonable(v) for k, v in valor.items()}
+    if isinstance(valor, (list, tuple)):
+        return [_jsonable(v) for v in valor]
+    if isinstance(valor, np.generic):
+        return valor.item()
+    if isinstance(valor, (pd.Timestamp, datetime)):
+        return valor.isoformat()
+    return valor
@@ -0,0 +1,136 @@
+"""
+Cache colunar em disco para as planilhas de entrada.
+
+Cada planilha Excel é convertida uma única vez para Parquet e reutilizada nas
+execuções seguintes enquanto o arquivo de origem não mudar (caminho, tamanho e
+data de modificação). Os dtypes originais ficam registrados em um manifesto
+JSON, de modo que a leitura do cache não precisa inferir tipos novamente.
+"""
+
+import hashlib
+import json
+import os
+import re
+from pathlib import Path
+from typing import Callable, Dict, Union
+
+import pandas as pd
+
+CACHE_FORMAT_VERSION = 1
+
+
+def _parquet_available() -> bool:
+    from importlib.util import find_spec
+
+    return find_spec("pyarrow") is not None
+
+
+class ColumnarCache:
+    """
+    Cache de DataFrames em Parquet indexado pela identidade do arquivo de origem.
+
+    Args:
+        cache_dir: Diretório onde os arquivos Parquet e manifestos são gravados
+        hash_contents: Se True, inclui o SHA-1 do conteúdo na chave (mais lento,
+            porém imune a arquivos substituídos preservando o mtime)
+    """
+
+    def __init__(self, cache_dir: Union[str, Path], hash_contents: bool = False):
+        self.cache_dir = Path(cache_dir)
+        self.hash_contents = hash_contents
+        self.hits = 0
+        self.misses = 0
+        self.enabled = _parquet_available()
+
+    def key_for(self, source: Union[str, Path]) -> str:
+        """Gera a chave do cache a partir de caminho, tamanho e mtime (ou hash)"""
+        source = Path(source).resolve()
+        stat = source.stat()
+        parts = [str(source), str(stat.st_size), str(stat.st_mtime_ns)]
+        if self.hash_contents:
+            parts.append(_file_sha1(source))
+        return hashlib.sha1("|".join(parts).encode("utf-8")).hexdigest()
+
+    def load(self, source: Union[str, Path], reader: Callable[[Path], pd.DataFrame]) -> pd.DataFrame:
+        """
+        Retorna o DataFrame de `source`, lendo do cache quando possível.
+
+        Args:
+            source: Arquivo de origem (ex.: planilha Excel)
+            reader: Função usada para ler a origem em caso de cache miss
+
+        Returns:
+            DataFrame com os mesmos dtypes da leitura original
+        """
+        source = Path(source)
+        if not self.enabled:
+            self.misses += 1
+            return reader(source)
+
+        key = self.key_for(source)
+        data_path = self.cache_dir / f"{source.stem}-{key}.parquet"
+        manifest_path = data_path.with_suffix(".json")
+
+        if data_path.exists() and manifest_path.exists():
+            try:
+                manifest = json.loads(manifest_path.read_text(encoding="utf-8"))
+                if manifest.get("version") == CACHE_FORMAT_VERSION:
+                    df = pd.read_parquet(data_path)
+                    self.hits += 1
+                    return _restore_dtypes(df, manifest["dtypes"])
+            except (OSError, ValueError, KeyError):
+                # Cache corrompido: cai para a leitura original e regrava
+                pass
+
+        self.misses += 1
+        df = reader(source)
+        self._store(df, source, data_path, manifest_path)
+        return df
+
+    def stats(self) -> Dict[str, int]:
+        """Contadores de acertos e falhas do cache"""
+        return {"hits": self.hits, "misses": self.misses}
+
+    def _store(self, df: pd.DataFrame, source: Path, data_path: Path, manifest_path: Path) -> None:
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        # Remove versões antigas da mesma origem; o padrão exige a chave
+        # completa para não casar com outra planilha de mesmo prefixo
+        # (ex.: "mercado" x "mercado-desafio")
+        padrao = re.compile(rf"{re.escape(source.stem)}-[0-9a-f]{{40}}\.(parquet|json)")
+        for stale in self.cache_dir.iterdir():
+            if padrao.fullmatch(stale.name) and stale not in (data_path, manifest_path):
+                stale.unlink(missing_ok=True)
+
+        # Colunas object com tipos mistos não são serializáveis em Parquet;
+        # nesse caso o cache é simplesmente ignorado para esta origem.
+        tmp_path = data_path.with_suffix(f".{os.getpid()}.tmp")
+        try:
+            df.to_parquet(tmp_path, index=False)
+        except (TypeError, ValueError, ImportError):
+            tmp_path.unlink(missing_ok=True)
+            return
+        os.replace(tmp_path, data_path)
+
+        manifest = {
+            "version": CACHE_FORMAT_VERSION,
+            "source": str(source.resolve()),
+            "rows": len(df),
+            "dtypes": {col: str(dtype) for col, dtype in df.dtypes.items()},
+        }
+        manifest_path.write_text(json.dumps(manifest, indent=2), encoding="utf-8")
+
+
+def _restore_dtypes(df: pd.DataFrame, dtypes: Dict[str, str]) -> pd.DataFrame:
+    """Reaplica os dtypes registrados quando o Parquet não os preserva exatamente"""
+    for col, dtype in dtypes.items():
+        if col in df.columns and str(df[col].dtype) != dtype:
+            df[col] = df[col].astype(dtype)
+    return df
+
+
+def _file_sha1(path: Path, chunk_size: int = 1 << 20) -> str:
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
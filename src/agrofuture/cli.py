@@ -0,0 +1,280 @@
+"""
+Linha de comando `agrofuture`.
+
+Uso:
+    agrofuture train [--backend native] [--external-memory]
+    agrofuture predict 2024-11-05
+    agrofuture batch-predict --start 2024-11-01 --end 2024-11-30
+    agrofuture forecast --horizon 14 [--feedback]
+    agrofuture explain 2024-04-10 [--top 5]
+    agrofuture models list
+    agrofuture models alias production xgboost_model_20241105120000
+    agrofuture predict 2024-11-05 --model production
+    agrofuture predictions query --company Empresa01 --start 2024-11-01 --end 2024-11-30
+    agrofuture predictions compact
+    agrofuture backtest --cadence 7 --window 365
+    agrofuture benchmark --grid tiny small
+
+Só argparse é importado no início: pandas, scikit-learn e XGBoost são
+carregados dentro de cada subcomando, então `agrofuture --help` e erros de
+argumentos respondem sem o custo dessas bibliotecas. Os caminhos de dados e
+saídas partem de `--base-dir` (padrão: AGROFUTURE_HOME ou o diretório atual).
+"""
+
+import argparse
+import json
+import sys
+from typing import List, Optional
+
+BACKENDS = ("multioutput", "native", "native_per_target")  # ver model_trainer.BACKENDS
+
+
+def _train(args: argparse.Namespace) -> int:
+    from agrofuture.pipeline import project_paths, train_pipeline
+
+    train_pipeline(project_paths(args.base_dir), backend=args.backend,
+                   external_memory=args.external_memory or None)
+    return 0
+
+
+def _predict(args: argparse.Namespace) -> int:
+    from agrofuture.pipeline import predict_pipeline, project_paths, resolve_target_dates
+
+    try:
+        datas = resolve_target_dates(getattr(args, "date", None), getattr(args, "start", None),
+                                     getattr(args, "end", None), getattr(args, "dates_file", None))
+    except (ValueError, OSError) as e:
+        print(f"Datas inválidas ({e}). Use YYYY-MM-DD")
+        return 1
+    return predict_pipeline(project_paths(args.base_dir), datas, batch=args.command == "batch-predict",
+                            model_ref=args.model, csv=args.csv or None)
+
+
+def _forecast(args: argparse.Namespace) -> int:
+    from agrofuture.pipeline import forecast_pipeline, project_paths
+
+    return forecast_pipeline(project_paths(args.base_dir), args.horizon, feedback=args.feedback,
+                             model_ref=args.model, csv=args.csv or None)
+
+
+def _explain(args: argparse.Namespace) -> int:
+    from agrofuture.pipeline import explain_pipeline, project_paths, resolve_target_dates
+
+    try:
+        datas = resolve_target_dates(args.date, args.start, args.end)
+    except (ValueError, OSError) as e:
+        print(f"Datas inválidas ({e}). Use YYYY-MM-DD")
+        return 1
+    return explain_pipeline(project_paths(args.base_dir), datas, top=args.top, model_ref=args.model)
+
+
+def _models(args: argparse.Namespace) -> int:
+    from agrofuture.pipeline import project_paths
+    from agrofuture.registry import open_registry
+
+    registry = open_registry(project_paths(args.base_dir).models_dir)
+    try:
+        if args.action == "alias":
+            mid = registry.set_alias(args.alias, args.ref)
+            print(f"🏷️ {args.alias} -> {mid}")
+        elif args.action == "unalias":
+            registry.remove_alias(args.alias)
+            print(f"🏷️ Apelido removido: {args.alias}")
+        elif args.action == "show":
+            mid = registry.resolve(args.ref)
+            print(json.dumps({"id": mid, "aliases": registry.aliases_of(mid), **registry.models[mid]},
+                             indent=2, ensure_ascii=False))
+        else:
+            _print_models(registry)
+    except (KeyError, ValueError, FileNotFoundError) as e:
+        print(e.args[0] if e.args else e)
+        return 1
+    return 0
+
+
+def _predictions(args: argparse.Namespace) -> int:
+    from agrofuture.pipeline import project_paths
+    from agrofuture.prediction_store import prediction_store
+
+    paths = project_paths(args.base_dir)
+    store = prediction_store(paths.predictions_dir)
+    if args.action == "compact":
+        stats = store.compact(min_files=args.min_files)
+        print(f"🗜️ {len(stats['partitions'])} partição(ões) compactada(s): "
+              f"{stats['files_before']} -> {stats['files_after']} arquivo(s), "
+              f"{stats['rows_before']} -> {stats['rows_after']} linha(s) nas partições compactadas")
+        return 0
+
+    model_id = args.model
+    if model_id:
+        from agrofuture.registry import open_registry
+
+        try:
+            model_id = open_registry(paths.models_dir).resolve(model_id)
+        except (KeyError, FileNotFoundError):
+            pass  # id de um modelo que já saiu do registro
+    df = store.query(args.company, args.start, args.end, model_id=model_id, latest=not args.all)
+    if df.empty:
+        print(f"Nenhuma previsão em: {store.root}")
+        return 1
+    if args.output:
+        df.to_csv(args.output, index=False)
+        print(f"{len(df)} previsão(ões) salvas em: {args.output}")
+        return 0
+    tabela = df.drop_duplicates(["date", "company"], keep="last").pivot(index="date", columns="company",
+                                                                        values="probability")
+    print(f"{'Data':<12}" + "".join(f"{c:>12}" for c in tabela.columns))
+    for data, linha in tabela.iterrows():
+        print(f"{str(data.date()):<12}" + "".join(f"{p * 100:>11.2f}%" if p == p else f"{'-':>12}" for p in linha))
+    return 0
+
+
+def _print_models(registry) -> None:
+    modelos = registry.list_models()
+    if not modelos:
+        print(f"Nenhum modelo registrado em: {registry.models_dir}")
+        return
+    print(f"{'Modelo':<32}{'Criado em':<21}{'Backend':<19}{'F1 teste':>9}  {'Features':<17}Apelidos")
+    for mid, entrada in modelos:
+        f1 = entrada.get("metrics", {}).get("f1_score")
+        print(f"{mid:<32}{(entrada.get('created_at') or '-'):<21}{(entrada.get('backend') or '-'):<19}"
+              f"{(f'{f1:.4f}' if f1 is not None else '-'):>9}  {(entrada.get('feature_hash') or '-'):<17}"
+              f"{', '.join(registry.aliases_of(mid))}")
+
+
+def _backtest(args: argparse.Namespace) -> int:
+    from agrofuture.pipeline import backtest_pipeline, project_paths
+
+    return backtest_pipeline(project_paths(args.base_dir), backend=args.backend, cadence_days=args.cadence,
+                             window_days=args.window, start=args.start, lookback_days=args.lookback,
+                             warm_start=not args.no_warm_start, warm_rounds=args.warm_rounds,
+                             full_refit_every=args.full_refit_every)
+
+
+def _benchmark(args: argparse.Namespace) -> int:
+    from agrofuture.benchmarks.__main__ import main as benchmark_main
+
+    return benchmark_main(args.benchmark_args)
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="agrofuture", description="AgroFuture - previsão de negociações")
+    parser.add_argument("--version", action="version", version=f"%(prog)s {_version()}")
+    comum = argparse.ArgumentParser(add_help=False)
+    comum.add_argument("--base-dir", help="Diretório com data/ e outputs/ (padrão: AGROFUTURE_HOME ou o atual)")
+    modelo = argparse.ArgumentParser(add_help=False)
+    modelo.add_argument("--model", help="Id ou apelido do modelo (padrão: AGROFUTURE_MODEL ou latest)")
+    saida = argparse.ArgumentParser(add_help=False)
+    saida.add_argument("--csv", action="store_true",
+                       help="Grava também um CSV da execução além do store Parquet "
+                            "(padrão: AGROFUTURE_PREDICTIONS_CSV=1)")
+    sub = parser.add_subparsers(dest="command", required=True, metavar="comando")
+
+    train = sub.add_parser("train", parents=[comum], help="Treina, valida e salva um novo modelo")
+    train.add_argument("--backend", choices=BACKENDS,
+                       help="Backend de treino (padrão: AGROFUTURE_BACKEND ou multioutput)")
+    train.add_argument("--external-memory", action="store_true",
+                       help="Treina a partir de shards no disco (matrizes maiores que a RAM; "
+                            "padrão: AGROFUTURE_EXTERNAL_MEMORY=1)")
+    train.set_defaults(func=_train)
+
+    predict = sub.add_parser("predict", parents=[comum, modelo, saida], help="Previsões para uma data")
+    predict.add_argument("date", help="Data (YYYY-MM-DD)")
+    predict.set_defaults(func=_predict)
+
+    batch = sub.add_parser("batch-predict", parents=[comum, modelo, saida], help="Previsões para várias datas de uma vez")
+    datas = batch.add_mutually_exclusive_group(required=True)
+    datas.add_argument("--start", help="Início do intervalo de datas (YYYY-MM-DD, exige --end)")
+    datas.add_argument("--dates-file", help="Arquivo com uma data por linha")
+    batch.add_argument("--end", help="Fim do intervalo de datas (YYYY-MM-DD, inclusivo)")
+    batch.set_defaults(func=_predict)
+
+    forecast = sub.add_parser("forecast", parents=[comum, modelo, saida], help="Previsões para os N dias seguintes ao histórico")
+    forecast.add_argument("--horizon", type=int, default=7, help="Dias a prever (padrão: 7)")
+    forecast.add_argument("--feedback", action="store_true",
+                          help="Usa as vendas previstas de cada dia no estado do dia seguinte")
+    forecast.set_defaults(func=_forecast)
+
+    explain = sub.add_parser("explain", parents=[comum, modelo], help="Contribuição de cada feature nas previsões (TreeSHAP)")
+    explain.add_argument("date", nargs="?", help="Data (YYYY-MM-DD)")
+    explain.add_argument("--start", help="Início do intervalo de datas (YYYY-MM-DD)")
+    explain.add_argument("--end", help="Fim do intervalo de datas (YYYY-MM-DD, inclusivo)")
+    explain.add_argument("--top", type=int, default=5, help="Features por empresa e data (padrão: 5)")
+    explain.set_defaults(func=_explain)
+
+    models = sub.add_parser("models", parents=[comum], help="Modelos registrados e apelidos (latest, production, ...)")
+    acoes = models.add_subparsers(dest="action", metavar="ação")
+    # --base-dir aceito antes ou depois da ação (sem sobrescrever o valor dado antes)
+    comum_acao = argparse.ArgumentParser(add_help=False)
+    comum_acao.add_argument("--base-dir", default=argparse.SUPPRESS, help=argparse.SUPPRESS)
+    acoes.add_parser("list", parents=[comum_acao], help="Lista os modelos (padrão)")
+    show = acoes.add_parser("show", parents=[comum_acao], help="Entrada do índice de um modelo")
+    show.add_argument("ref", nargs="?", default="latest", help="Id ou apelido (padrão: latest)")
+    alias = acoes.add_parser("alias", parents=[comum_acao], help="Aponta um apelido para um modelo (pin/rollback)")
+    alias.add_argument("alias", help="Apelido (ex.: production)")
+    alias.add_argument("ref", help="Id ou apelido do modelo")
+    unalias = acoes.add_parser("unalias", parents=[comum_acao], help="Remove um apelido")
+    unalias.add_argument("alias")
+    models.set_defaults(func=_models, action="list")
+
+    backtest = sub.add_parser("backtest", parents=[comum], help="Backtest walk-forward com retreino periódico")
+    backtest.add_argument("--backend", choices=BACKENDS,
+                          help="Backend de treino (padrão: AGROFUTURE_BACKEND ou multioutput)")
+    backtest.add_argument("--cadence", type=int, default=7, help="Dias entre retreinos (padrão: 7)")
+    backtest.add_argument("--window", type=int, help="Janela móvel de treino em dias (padrão: todo o histórico)")
+    backtest.add_argument("--start", help="Primeiro corte (YYYY-MM-DD; padrão: --lookback dias antes do fim)")
+    backtest.add_argument("--lookback", type=int, default=730, help="Dias avaliados sem --start (padrão: 730)")
+    backtest.add_argument("--warm-rounds", type=int, help="Árvores acrescentadas por retreino (padrão: n_estimators/10)")
+    backtest.add_argument("--full-refit-every", type=int, default=0,
+                          help="Treina do zero a cada N retreinos (padrão: 0 = só no primeiro)")
+    backtest.add_argument("--no-warm-start", action="store_true", help="Treina do zero em todos os passos")
+    backtest.set_defaults(func=_backtest)
+
+    predictions = sub.add_parser("predictions", help="Consulta e compacta o store Parquet de previsões")
+    acoes = predictions.add_subparsers(dest="action", required=True, metavar="ação")
+    query = acoes.add_parser("query", parents=[comum], help="Previsões por empresa e intervalo de datas")
+    query.add_argument("--company", action="append", help="Empresa (repetível; padrão: todas)")
+    query.add_argument("--start", help="Início do intervalo de datas (YYYY-MM-DD)")
+    query.add_argument("--end", help="Fim do intervalo de datas (YYYY-MM-DD, inclusivo)")
+    query.add_argument("--model", help="Só as previsões deste modelo (id ou apelido)")
+    query.add_argument("--all", action="store_true",
+                       help="Inclui previsões substituídas por execuções mais recentes")
+    query.add_argument("--output", help="Grava o resultado em CSV em vez de imprimir")
+    compact = acoes.add_parser("compact", parents=[comum], help="Junta os arquivos pequenos de cada partição")
+    compact.add_argument("--min-files", type=int, default=2, help="Compacta partições com pelo menos N arquivos")
+    predictions.set_defaults(func=_predictions)
+
+    # Argumentos repassados sem mudança à CLI dos benchmarks (ver `main`)
+    bench = sub.add_parser("benchmark", help="Benchmarks com dados sintéticos (python -m agrofuture.benchmarks)",
+                           add_help=False)
+    bench.set_defaults(func=_benchmark)
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = build_parser()
+    args, extras = parser.parse_known_args(argv)
+    if args.command == "benchmark":
+        args.benchmark_args = extras
+    elif extras:
+        parser.error(f"argumentos não reconhecidos: {' '.join(extras)}")
+    if args.command == "batch-predict" and bool(args.start) != bool(args.end):
+        parser.error("batch-predict: informe --start e --end, ou --dates-file")
+    if args.command == "explain" and (bool(args.date) == bool(args.start or args.end) or bool(args.start) != bool(args.end)):
+        parser.error("explain: informe uma data, ou --start e --end")
+    return args.func(args)
+
+
+def predict_main(argv: Optional[List[str]] = None) -> int:
+    """Entry point `agrofuture-predict` (mesmos argumentos de `agrofuture predict`)"""
+    return main(["predict", *(sys.argv[1:] if argv is None else argv)])
+
+
+def _version() -> str:
+    from agrofuture import __version__
+
+    return __version__
+
+
+if __name__ == "__main__":
+    sys.exit(main())
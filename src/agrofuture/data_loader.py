@@ -1,48 +1,147 @@
+import os
 from pathlib import Path
+from typing import Any, Dict, Optional
 import pandas as pd
-import requests
 
-def load_data(transacoes_path: Path, mercado_path: Path) -> tuple:
-  transacoes = pd.read_excel(transacoes_path)
-  mercado = pd.read_excel(mercado_path)
+from agrofuture.cache import ColumnarCache
+from agrofuture.fx_rates import RateSource, rates_for_dates
+from agrofuture.instrumentation import span, traced
+from agrofuture.market_index import MarketIndex, Staleness
+from agrofuture.schema import JOIN_KEYS, align_categories, apply_schema, compact_float, memory_report
+
+_CACHES: Dict[Path, ColumnarCache] = {}
+
+def get_cache(cache_dir: Path) -> ColumnarCache:
+  """Retorna o cache colunar associado a `cache_dir` (um por diretório por processo)"""
+  cache_dir = Path(cache_dir).resolve()
+  if cache_dir not in _CACHES:
+    _CACHES[cache_dir] = ColumnarCache(cache_dir)
+  return _CACHES[cache_dir]
+
+@traced()
+def load_data(transacoes_path: Path, mercado_path: Path, cache_dir: Optional[Path] = None, use_cache: bool = True,
+              compact: bool = True) -> tuple:
+  """
+  Carrega as planilhas de transações e de mercado.
+
+  As planilhas são convertidas para Parquet na primeira leitura e reutilizadas
+  enquanto os arquivos de origem não mudarem.
+
+  Args:
+      transacoes_path: Planilha de transações
+      mercado_path: Planilha de mercado
+      cache_dir: Diretório do cache (padrão: `.cache` ao lado das planilhas)
+      use_cache: Desativa o cache quando False
+      compact: Aplica o schema compacto (categorias, float32, ids inteiros; ver `schema`)
+  """
+  if not use_cache:
+    with span("load_excel"):
+      transacoes, mercado = pd.read_excel(transacoes_path), pd.read_excel(mercado_path)
+    return _compact(transacoes, mercado) if compact else (transacoes, mercado)
+
+  cache = get_cache(cache_dir if cache_dir is not None else Path(transacoes_path).parent / ".cache")
+  with span("load_transacoes", source=Path(transacoes_path).name) as s:
+    transacoes = cache.load(transacoes_path, pd.read_excel)
+    s.record_shape(transacoes)
+  with span("load_mercado", source=Path(mercado_path).name) as s:
+    mercado = cache.load(mercado_path, pd.read_excel)
+    s.record_shape(mercado)
+  return _compact(transacoes, mercado) if compact else (transacoes, mercado)
+
+def _compact(transacoes: pd.DataFrame, mercado: pd.DataFrame) -> tuple:
+  with span("apply_schema") as s:
+    transacoes, mercado = apply_schema(transacoes, mercado)
+    relatorio = memory_report(transacoes)
+    s.set(**{f"transacoes_{k}": v for k, v in relatorio.items()})
   return transacoes, mercado
 
-def merge_data(transacoes: pd.DataFrame, mercado: pd.DataFrame) -> pd.DataFrame:
+def prepare_market(mercado: pd.DataFrame, rate_source: Optional[RateSource] = None) -> pd.DataFrame:
+    """
+    Padroniza a tabela de mercado para o join: colunas em minúsculas e coluna
+    `dolar` (CBOT convertido com a cotação vigente em cada data)
+
+    Args:
+        rate_source: Fonte das cotações USD-BRL por data (padrão: `default_rate_source()`)
+    """
+    mercado.columns = [col.lower() for col in mercado.columns]
+
+    # Converte o CBOT com a cotação vigente em cada data (última conhecida até o dia)
+    with span("fx_rates", rows=len(mercado)):
+        mercado['dolar'] = mercado['cbot'] * rates_for_dates(mercado['date'], rate_source)
+        if mercado['cbot'].dtype == 'float32':
+            mercado['dolar'] = compact_float(mercado['dolar'])
+    return mercado
+
+def build_market_index(mercado: pd.DataFrame, rate_source: Optional[RateSource] = None) -> MarketIndex:
+    """
+    Prepara o mercado e monta o índice do join (reutilizável entre chamadas de `merge_data`)
+
+    Args:
+        rate_source: Fonte das cotações USD-BRL por data (padrão: `default_rate_source()`)
+    """
+    with span("market_index", rows=len(mercado)):
+        return MarketIndex(prepare_market(mercado, rate_source))
+
+def market_join_from_env() -> Dict[str, Any]:
+    """
+    Modo do join com o mercado a partir de AGROFUTURE_MARKET_STALENESS
+
+    Sem a variável o join é exato (mesmo dia). Com uma duração ("3D", "7D")
+    usa a última cotação até a data da transação, com no máximo essa idade;
+    "none" remove o limite.
+    """
+    valor = os.environ.get("AGROFUTURE_MARKET_STALENESS", "").strip()
+    if not valor:
+        return {"asof": False, "max_staleness": None}
+    if valor.lower() == "none":
+        return {"asof": True, "max_staleness": None}
+    return {"asof": True, "max_staleness": pd.Timedelta(valor)}
+
+@traced()
+def merge_data(transacoes: pd.DataFrame, mercado: Optional[pd.DataFrame] = None, rate_source: Optional[RateSource] = None,
+               asof: bool = False, max_staleness: Staleness = None,
+               market_index: Optional[MarketIndex] = None) -> pd.DataFrame:
     """
     Indexes(['date', 'time', 'company_transacoes', 'seller id', 'buyer id', 'price_transacoes',
          'amount', 'product', 'origin_city', 'origin_state', 'company_mercado',
          'destination_city', 'destination_state', 'price_mercado', 'cbot', 'dolar'],
         dtype='object')
+
+    Args:
+        rate_source: Fonte das cotações USD-BRL por data (padrão: `default_rate_source()`)
+        asof: Usa a última cotação conhecida até a data da transação (mesmo
+            produto e origem) em vez de exigir cotação no mesmo dia
+        max_staleness: Idade máxima da cotação no modo as-of (ex.: "3D"; None: sem limite)
+        market_index: Índice já montado com `build_market_index` (dispensa `mercado`)
     """
 
     # Padroniza os nomes das colunas para garantir correspondência, ignorando maiúsculas/minúsculas
     transacoes.columns = [col.lower() for col in transacoes.columns]
-    mercado.columns = [col.lower() for col in mercado.columns]
+    if market_index is None:
+        if mercado is None:
+            raise ValueError("Informe `mercado` ou `market_index`")
+        # Mesmo dicionário nas chaves categóricas: o join compara códigos, não texto
+        mercado.columns = [col.lower() for col in mercado.columns]
+        align_categories(transacoes, mercado, JOIN_KEYS)
+        if asof:
+            market_index = build_market_index(mercado, rate_source)
+        else:
+            mercado = prepare_market(mercado, rate_source)
+
+    with span("merge", asof=asof, max_staleness=str(max_staleness) if max_staleness is not None else None) as s:
+        if market_index is not None:
+            merged = market_index.join(transacoes, asof=asof, max_staleness=max_staleness)
+        else:
+            # Join exato avulso: o hash join do pandas sobre os códigos dispensa o índice
+            merged = pd.merge(
+                transacoes,
+                mercado,
+                on=["date", "product", "origin_city", "origin_state"],
+                how="left",
+                suffixes=("_transacoes", "_mercado")
+            )
+        s.record_shape(merged)
+        if 'cbot' in merged.columns:
+            s.set(without_quote=int(merged['cbot'].isna().sum()))
 
-    #substituir por dados reais
-    # Obtém o valor real do dólar usando uma API ou fonte confiável
-    def get_real_dolar():
-        try:
-            response = requests.get("https://economia.awesomeapi.com.br/json/last/USD-BRL")
-            response.raise_for_status()
-            data = response.json()
-            return float(data["USDBRL"]["bid"])
-        except Exception:
-            # fallback para um valor padrão caso a API falhe
-            return 5.0
-
-    dolar_real = get_real_dolar()
-    mercado['dolar'] = mercado['cbot'] * dolar_real
-
-
-    merged = pd.merge(
-        transacoes,
-        mercado,
-        on=["date", "product", "origin_city", "origin_state"],
-        how="left",
-        suffixes=("_transacoes", "_mercado")
-    )
-
-    # print(merged.columns)
-
-    return merged
\ No newline at end of file
+    return merged
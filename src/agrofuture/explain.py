@@ -0,0 +1,103 @@
+"""
+Explicações por previsão a partir das contribuições das árvores (TreeSHAP).
+
+`predict_contributions` chama `pred_contribs` de cada booster sobre um lote
+inteiro de datas (uma única `DMatrix` compartilhada por todas as empresas) e
+devolve um tensor datas × empresas × features. A soma das contribuições de
+uma empresa mais o viés é a margem (log-odds) da previsão daquela data.
+
+Backends: "multioutput" (um booster por empresa) e "native_per_target" (um
+booster, uma árvore por empresa). Árvores com folhas vetoriais ("native")
+ainda não têm `pred_contribs` no XGBoost. Pacotes de modelo
+(`agrofuture.bundle`) usam os boosters salvos diretamente.
+"""
+
+from typing import List, NamedTuple, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+import xgboost as xgb
+
+from agrofuture.predictor import align_features, model_company_classes
+
+
+class Contributions(NamedTuple):
+    """Contribuições (datas × empresas × features), viés (datas × empresas) e rótulos dos eixos"""
+    values: np.ndarray
+    bias: np.ndarray
+    dates: pd.DatetimeIndex
+    companies: List[str]
+    features: List[str]
+
+    @property
+    def margin(self) -> np.ndarray:
+        """Margem (log-odds) de cada data e empresa"""
+        return self.values.sum(axis=2) + self.bias
+
+
+def predict_contributions(model, X: pd.DataFrame, company_classes: Sequence[str],
+                          dates: Optional[Sequence[pd.Timestamp]] = None) -> Contributions:
+    """
+    Contribuição de cada feature para cada previsão do lote
+
+    Args:
+        model: Modelo multi-label treinado (MultiOutputClassifier, NativeMultiLabelXGB ou ModelBundle)
+        X: Features das datas (sem `date` e `empresas_vendedoras`)
+        company_classes: Empresas na ordem das saídas do modelo
+        dates: Datas das linhas de X (apenas para rotular o resultado)
+    """
+    X = align_features(model, X)
+    if hasattr(model, "predict_contribs"):
+        tensor = model.predict_contribs(X)
+    elif hasattr(model, "estimators_"):
+        # Um booster por empresa, todos sobre a mesma DMatrix
+        matriz = xgb.DMatrix(X)
+        tensor = np.stack([est.get_booster().predict(matriz, pred_contribs=True) for est in model.estimators_], axis=1)
+    else:
+        booster = model.get_booster()
+        if getattr(model, "multi_strategy", None) == "multi_output_tree":
+            raise ValueError("Contribuições não disponíveis para árvores multi-saída (backend native); "
+                             "use multioutput ou native_per_target")
+        tensor = booster.predict(xgb.DMatrix(X), pred_contribs=True)
+        if tensor.ndim == 2:
+            tensor = tensor[:, None, :]
+    datas = pd.DatetimeIndex(dates if dates is not None else pd.RangeIndex(len(X)))
+    return Contributions(values=tensor[:, :, :-1], bias=tensor[:, :, -1], dates=datas,
+                         companies=list(company_classes), features=list(X.columns))
+
+
+def explain_dates(model, df_features: pd.DataFrame, target_dates: Sequence[pd.Timestamp],
+                  company_classes: Optional[Sequence[str]] = None) -> Contributions:
+    """Contribuições para as datas pedidas de uma matriz de features (ver `predict_dates`)"""
+    if company_classes is None:
+        company_classes = model_company_classes(model, df_features)
+    selecionadas = df_features[df_features["date"].isin(list(target_dates))].sort_values("date")
+    X = selecionadas.drop(columns=['empresas_vendedoras', 'date'], errors='ignore')
+    return predict_contributions(model, X, company_classes, dates=selecionadas["date"])
+
+
+def contribution_importances(contribs: Contributions) -> pd.DataFrame:
+    """Importância global: média do |contribuição| por feature e empresa (features × empresas)"""
+    media = np.abs(contribs.values).mean(axis=0).T
+    return pd.DataFrame(media, index=contribs.features, columns=contribs.companies)
+
+
+def top_contributions(contribs: Contributions, top: int = 5) -> pd.DataFrame:
+    """
+    As `top` features de maior |contribuição| em cada (data, empresa), em formato longo
+
+    Returns:
+        DataFrame com colunas Data, Empresa, Feature, Contribuição, Margem
+    """
+    n_datas, n_empresas, n_features = contribs.values.shape
+    top = min(top, n_features)
+    ordem = np.argsort(-np.abs(contribs.values), axis=2, kind="stable")[:, :, :top]
+    valores = np.take_along_axis(contribs.values, ordem, axis=2)
+    features = np.asarray(contribs.features, dtype=object)
+    return pd.DataFrame({
+        "Data": np.repeat(contribs.dates.date, n_empresas * top),
+        "Empresa": np.tile(np.repeat(np.asarray(contribs.companies, dtype=object), top), n_datas),
+        "Feature": features[ordem].ravel(),
+        "Contribuição": valores.ravel(),
+        "Margem": np.repeat(contribs.margin.ravel(), top),
+    })
@@ -0,0 +1,310 @@
+"""
+Treino em memória externa para matrizes de features maiores que a RAM.
+
+`train_and_validate` mantém `X_train_no_date`/`X_test_no_date` como
+DataFrames densos e cada fold cria cópias com `.iloc`. Aqui:
+
+- a matriz de features é gravada uma vez em disco, em shards `.npy`
+  (float32, `rows_per_shard` dias cada) mais rótulos, datas e um manifesto
+  (`write_feature_shards`);
+- os shards são lidos com `np.load(mmap_mode="r")` e entregues ao XGBoost
+  por um `xgb.DataIter` (`ShardIter`), que gera um `ExtMemQuantileDMatrix`
+  (páginas do histograma em cache no disco) sem concatenar os shards;
+- folds, treino e teste são intervalos de linhas [início, fim) sobre os
+  shards (as linhas estão em ordem de data), não cópias da matriz;
+- os rótulos (dias x empresas, pequenos) ficam em memória e são trocados com
+  `set_label` entre empresas, sem reconstruir a matriz do fold.
+
+O resultado tem o mesmo formato de `train_and_validate` (modelo, relatório,
+thresholds); o modelo é um `ModelBundle` em memória, gravado pelo pipeline
+como qualquer outro pacote.
+"""
+
+import json
+import shutil
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+import xgboost as xgb
+from sklearn.metrics import f1_score, precision_score, recall_score
+from sklearn.model_selection import TimeSeriesSplit
+
+from agrofuture.bundle import ModelBundle
+from agrofuture.feature_engineer import prepare_target
+from agrofuture.instrumentation import span, traced
+from agrofuture.model_trainer import BACKENDS, MULTI_STRATEGY, XGB_PARAMS, best_f1_thresholds, get_feature_importances
+from agrofuture.parallel import available_threads
+from agrofuture.tuning import native_params
+
+SHARDS_FORMAT_VERSION = 1
+SHARDS_MANIFEST = "shards.json"
+DEFAULT_ROWS_PER_SHARD = 4096
+
+
+def write_feature_shards(df_features: pd.DataFrame, path: Union[str, Path],
+                         rows_per_shard: int = DEFAULT_ROWS_PER_SHARD) -> "FeatureShards":
+    """
+    Grava a matriz de features em shards float32 ordenados por data
+
+    Cada shard é convertido e gravado separadamente, então o pico de memória
+    extra é de um shard, não de uma cópia da matriz inteira.
+
+    Args:
+        df_features: Matriz de features (saída de `create_features`/feature store)
+        path: Diretório dos shards (recriado)
+        rows_per_shard: Linhas (dias) por shard
+    """
+    path = Path(path)
+    shutil.rmtree(path, ignore_errors=True)
+    path.mkdir(parents=True)
+
+    ordem = np.argsort(df_features["date"].to_numpy(), kind="stable")
+    y, company_classes = prepare_target(df_features)
+    colunas = [c for c in df_features.columns if c not in ("date", "empresas_vendedoras")]
+    posicoes = [df_features.columns.get_loc(c) for c in colunas]
+
+    offsets = [0]
+    for n, inicio in enumerate(range(0, len(ordem), rows_per_shard)):
+        linhas = ordem[inicio:inicio + rows_per_shard]
+        # Linhas primeiro: `iloc[linhas, posicoes]` copiaria as colunas inteiras antes de filtrar
+        bloco = df_features.iloc[linhas].iloc[:, posicoes].to_numpy(dtype=np.float32)
+        np.save(path / f"x-{n:05d}.npy", bloco)
+        offsets.append(offsets[-1] + len(linhas))
+    np.save(path / "y.npy", np.asarray(y, dtype=np.float32)[ordem])
+    np.save(path / "dates.npy", df_features["date"].to_numpy(dtype="datetime64[ns]")[ordem])
+
+    manifest = {
+        "version": SHARDS_FORMAT_VERSION,
+        "rows": int(len(ordem)),
+        "offsets": offsets,
+        "feature_names": colunas,
+        "company_classes": [str(c) for c in company_classes],
+    }
+    with open(path / SHARDS_MANIFEST, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, ensure_ascii=False)
+    return FeatureShards(path)
+
+
+class FeatureShards:
+    """
+    Matriz de features em shards no disco, lida sob demanda (memory-mapped)
+
+    Args:
+        path: Diretório gravado por `write_feature_shards`
+    """
+
+    def __init__(self, path: Union[str, Path]):
+        self.path = Path(path)
+        with open(self.path / SHARDS_MANIFEST, encoding="utf-8") as f:
+            manifest = json.load(f)
+        if manifest.get("version") != SHARDS_FORMAT_VERSION:
+            raise ValueError(f"Versão de shards incompatível em {self.path}")
+        self.n_rows: int = manifest["rows"]
+        self.offsets = np.asarray(manifest["offsets"], dtype=np.int64)
+        self.feature_names: List[str] = manifest["feature_names"]
+        self.company_classes: List[str] = manifest["company_classes"]
+        self.labels = np.load(self.path / "y.npy")
+        self.dates = pd.DatetimeIndex(np.load(self.path / "dates.npy"))
+
+    @property
+    def n_shards(self) -> int:
+        return len(self.offsets) - 1
+
+    def shard(self, n: int) -> np.ndarray:
+        return np.load(self.path / f"x-{n:05d}.npy", mmap_mode="r")
+
+    def batches(self, start: int, stop: int) -> Iterator[np.ndarray]:
+        """Fatias (views dos shards mapeados) que cobrem as linhas [start, stop)"""
+        primeiro = int(np.searchsorted(self.offsets, start, side="right")) - 1
+        for n in range(max(primeiro, 0), self.n_shards):
+            inicio, fim = self.offsets[n], self.offsets[n + 1]
+            if inicio >= stop or start >= stop:
+                break
+            yield self.shard(n)[max(start, inicio) - inicio:min(stop, fim) - inicio]
+
+    def matrix(self, start: int, stop: int, cache_dir: Union[str, Path], max_bin: int = 256,
+               ref: Optional[xgb.DMatrix] = None, n_threads: Optional[int] = None) -> xgb.DMatrix:
+        """
+        DMatrix em memória externa das linhas [start, stop) (sem rótulo; ver `set_label`)
+
+        Args:
+            cache_dir: Diretório das páginas de cache do XGBoost
+            ref: Matriz de treino cujos quantis são reutilizados (validação/teste)
+        """
+        iterador = ShardIter(self, start, stop, Path(cache_dir) / f"rows-{start}-{stop}")
+        if hasattr(xgb, "ExtMemQuantileDMatrix"):
+            return xgb.ExtMemQuantileDMatrix(iterador, max_bin=max_bin, ref=ref, nthread=n_threads)
+        return xgb.DMatrix(iterador, nthread=n_threads)
+
+
+class ShardIter(xgb.DataIter):
+    """Entrega ao XGBoost, lote a lote, as linhas [start, stop) dos shards"""
+
+    def __init__(self, shards: FeatureShards, start: int, stop: int, cache_prefix: Path):
+        self.shards = shards
+        self.start = start
+        self.stop = stop
+        self._lotes: Optional[Iterator[np.ndarray]] = None
+        cache_prefix.parent.mkdir(parents=True, exist_ok=True)
+        super().__init__(cache_prefix=str(cache_prefix))
+
+    def next(self, input_data) -> bool:
+        if self._lotes is None:
+            self._lotes = self.shards.batches(self.start, self.stop)
+        lote = next(self._lotes, None)
+        if lote is None:
+            return False
+        input_data(data=lote, feature_names=self.shards.feature_names)
+        return True
+
+    def reset(self) -> None:
+        self._lotes = None
+
+
+def fold_ranges(n_rows: int, n_splits: int) -> List[Tuple[int, int, int]]:
+    """Folds do TimeSeriesSplit como intervalos (início do treino, início da validação, fim da validação)"""
+    intervalos = []
+    for treino, val in TimeSeriesSplit(n_splits=n_splits).split(np.empty((n_rows, 1))):
+        intervalos.append((int(treino[0]), int(val[0]), int(val[-1]) + 1))
+    return intervalos
+
+
+def _train_boosters(dtrain: xgb.DMatrix, y: np.ndarray, backend: str, nativos: Dict[str, Any],
+                    rodadas: int) -> List[xgb.Booster]:
+    if backend == "multioutput":
+        boosters = []
+        for j in range(y.shape[1]):
+            dtrain.set_label(y[:, j])
+            boosters.append(xgb.train(nativos, dtrain, num_boost_round=rodadas))
+        return boosters
+    dtrain.set_label(y)
+    return [xgb.train(nativos, dtrain, num_boost_round=rodadas)]
+
+
+def _predict(boosters: Sequence[xgb.Booster], matriz: xgb.DMatrix, backend: str, n: int) -> np.ndarray:
+    if backend == "multioutput":
+        return np.column_stack([b.predict(matriz) for b in boosters])
+    return boosters[0].predict(matriz).reshape(n, -1)
+
+
+def _scores(y_true: np.ndarray, y_pred: np.ndarray) -> Dict[str, float]:
+    return {
+        "f1_score": f1_score(y_true, y_pred, average="micro"),
+        "precision": precision_score(y_true, y_pred, average="micro"),
+        "recall": recall_score(y_true, y_pred, average="micro"),
+    }
+
+
+@traced(shape=False)
+def train_external_memory(shards: FeatureShards, test_size: float = 0.2, n_splits: int = 5,
+                          backend: str = "multioutput", params: Optional[Dict[str, Any]] = None,
+                          cache_dir: Optional[Union[str, Path]] = None,
+                          n_threads: Optional[int] = None) -> Tuple[ModelBundle, Dict[str, Any], Dict[str, float]]:
+    """
+    Treina e valida como `train_and_validate`, lendo a matriz dos shards em memória externa
+
+    Os folds rodam em sequência (em paralelo cada um manteria suas próprias
+    páginas e buffers, multiplicando a memória que este modo quer limitar);
+    as threads vão todas para o XGBoost.
+
+    Args:
+        shards: Matriz gravada por `write_feature_shards`
+        backend: Backend de treino (ver model_trainer.BACKENDS)
+        params: Parâmetros do XGBoost que substituem XGB_PARAMS
+        cache_dir: Onde criar as páginas de cache, removidas no fim (padrão: temporário do sistema)
+        n_threads: Threads do XGBoost (None = núcleos disponíveis)
+
+    Returns:
+        (modelo, relatório, thresholds), como em `train_and_validate`
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Backend desconhecido: {backend} (use {BACKENDS})")
+    n_threads = available_threads() if n_threads is None else max(1, int(n_threads))
+    xgb_params = {**XGB_PARAMS, **(params or {})}
+    nativos, rodadas = native_params(xgb_params, n_threads)
+    max_bin = int(xgb_params.get("max_bin", 256))
+    nativos["max_bin"] = max_bin
+    if backend != "multioutput":
+        nativos.update(multi_strategy=MULTI_STRATEGY[backend], tree_method="hist")
+
+    company_classes = shards.company_classes
+    y = shards.labels
+    # Mesmo corte de temporal_train_test_split (uma linha por data)
+    n_treino = int(shards.n_rows * (1 - test_size))
+    if cache_dir is not None:
+        Path(cache_dir).mkdir(parents=True, exist_ok=True)
+    cache_dir = Path(tempfile.mkdtemp(prefix="agrofuture-extmem-", dir=cache_dir))
+    print(f"Memória externa: {shards.n_rows} linhas em {shards.n_shards} shard(s), cache em {cache_dir}")
+
+    try:
+        print("Iniciando validação cruzada temporal (intervalos de linhas)...")
+        oof_proba = np.full((n_treino, len(company_classes)), np.nan, dtype=np.float32)
+        fold_reports = []
+        with span("cross_validation", rows=n_treino, cols=len(shards.feature_names), n_folds=n_splits,
+                  external_memory=True):
+            for fold, (inicio, corte, fim) in enumerate(fold_ranges(n_treino, n_splits), 1):
+                t0 = time.perf_counter()
+                dtrain = shards.matrix(inicio, corte, cache_dir / f"fold{fold}", max_bin, n_threads=n_threads)
+                dval = shards.matrix(corte, fim, cache_dir / f"fold{fold}", max_bin, ref=dtrain, n_threads=n_threads)
+                boosters = _train_boosters(dtrain, y[inicio:corte], backend, nativos, rodadas)
+                fit_s = time.perf_counter() - t0
+                t0 = time.perf_counter()
+                val_proba = _predict(boosters, dval, backend, fim - corte)
+                predict_s = time.perf_counter() - t0
+                del dtrain, dval
+
+                y_val = y[corte:fim].astype(int)
+                relatorio = {"fold": fold, **_scores(y_val, (val_proba > 0.5).astype(int)), "thresholds": {},
+                             "timings": {"fit_s": round(fit_s, 3), "predict_s": round(predict_s, 3),
+                                         "total_s": round(fit_s + predict_s, 3)}}
+                limiares, f1s = best_f1_thresholds(y_val, val_proba)
+                for empresa, valor, f1 in zip(company_classes, limiares, f1s):
+                    relatorio["thresholds"][empresa] = {"value": float(valor), "f1": float(f1)}
+                fold_reports.append(relatorio)
+                oof_proba[corte:fim] = val_proba
+                print(f"Fold {fold}: treino {fit_s:.2f}s | validação {predict_s:.2f}s")
+
+        print("\nTreinando modelo final com todo o conjunto de treino...")
+        with span("final_fit", rows=n_treino, cols=len(shards.feature_names), backend=backend, external_memory=True):
+            dtrain = shards.matrix(0, n_treino, cache_dir / "final", max_bin, n_threads=n_threads)
+            boosters = _train_boosters(dtrain, y[:n_treino], backend, nativos, rodadas)
+
+        print("Calculando thresholds dinâmicos finais (out-of-fold)...")
+        validados = ~np.isnan(oof_proba).any(axis=1)
+        oof_thresholds, oof_f1 = best_f1_thresholds(y[:n_treino][validados], oof_proba[validados])
+        final_thresholds = dict(zip(company_classes, oof_thresholds.tolist()))
+
+        print("\nAvaliando no conjunto de teste...")
+        with span("test_evaluation", rows=shards.n_rows - n_treino):
+            dtest = shards.matrix(n_treino, shards.n_rows, cache_dir / "final", max_bin, ref=dtrain,
+                                  n_threads=n_threads)
+            test_proba = _predict(boosters, dtest, backend, shards.n_rows - n_treino)
+            del dtrain, dtest
+        test_report = _scores(y[n_treino:].astype(int), (test_proba > 0.5).astype(int))
+    finally:
+        shutil.rmtree(cache_dir, ignore_errors=True)
+
+    model = ModelBundle.from_boosters(boosters, backend, nativos.get("multi_strategy"), shards.feature_names,
+                                      company_classes, final_thresholds)
+    final_report = {
+        "model": f"ExternalMemory[{backend}]",
+        "backend": backend,
+        "target_names": list(company_classes),
+        "feature_names": list(shards.feature_names),
+        "xgb_params": xgb_params,
+        "cross_validation": fold_reports,
+        "test_performance": test_report,
+        "thresholds": final_thresholds,
+        "oof_f1": dict(zip(company_classes, oof_f1.tolist())),
+        "oof_days": int(validados.sum()),
+        "external_memory": {"rows": shards.n_rows, "shards": shards.n_shards},
+    }
+    print("Calculando importância de features...")
+    with span("feature_importances"):
+        importancias = get_feature_importances(model, company_classes, list(shards.feature_names))
+    final_report["feature_importances"] = importancias.to_dict()
+    return model, final_report, final_thresholds
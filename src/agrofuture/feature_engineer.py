@@ -1,141 +1,437 @@
-from typing import Tuple
+from typing import Dict, Optional, Tuple, Union
 import numpy as np
 import pandas as pd
 from sklearn.preprocessing import MultiLabelBinarizer
 
-def create_features(df: pd.DataFrame) -> pd.DataFrame:
+from agrofuture.instrumentation import span, traced
+
+# Estatísticas móveis por empresa: nome da coluna -> (janela, estatística).
+# Janelas inteiras contam transações da empresa; strings ('30D') são janelas de
+# calendário. Estatísticas suportadas: sum, mean, std, count.
+ROLLING_FEATURES: Dict[str, Tuple[Union[int, str], str]] = {
+    'vendas_30d': (30, 'sum'),
+    'media_30d': (30, 'mean'),
+    'desvio_30d': (30, 'std'),
+    'media_7d': (7, 'mean'),
+}
+
+# Agregações diárias fixas das colunas de ROLLING_FEATURES
+_DAILY_ROLLING_AGGS = {
+    'media_vendas_30d': ('media_30d', 'mean'),
+    'desvio_vendas_30d': ('desvio_30d', 'mean'),
+    'tendencia_media': ('tendencia', 'mean'),
+    'dias_ult_venda_media': ('dias_desde_ultima_venda', 'mean'),
+}
+
+@traced()
+def create_features(df: pd.DataFrame, rolling_spec: Optional[Dict[str, Tuple[Union[int, str], str]]] = None) -> pd.DataFrame:
     df['date'] = pd.to_datetime(df['date'])
     df = df.sort_values(['company_transacoes', 'date'])
+    df_final = build_feature_frame(df, rolling_spec)
+    return fill_calendar(df_final)
 
+def build_feature_frame(df: pd.DataFrame, rolling_spec: Optional[Dict[str, Tuple[Union[int, str], str]]] = None,
+                        top_produtos: Optional[list] = None) -> pd.DataFrame:
+    """
+    Monta a matriz de features com uma linha por data com transações
+
+    Args:
+        df: Transações mescladas, ordenadas por empresa e data (recebe as
+            colunas auxiliares de rolling)
+        rolling_spec: Estatísticas móveis por empresa (padrão: ROLLING_FEATURES)
+        top_produtos: Produtos das colunas `pct_produto_*` (padrão: os 5 mais frequentes)
+    """
     # ===============================
     # 1. Features globais por dia
     # ===============================
-    vendas_por_dia = (
-        df[df['amount'] > 0]
-        .groupby('date')['company_transacoes']
-        .apply(list)
-        .reset_index(name='empresas_vendedoras')
-    )
-
-    df_diario = (
-        df.groupby('date').agg(
-            total_vendas=('amount', 'sum'),
-            avg_preco=('price_transacoes', 'mean'),
-            produtos_negociados=('product', 'nunique'),
-            qtd_transacoes=('amount', 'count')
-        )
-        .reset_index()
-    )
-
-    df_diario['dia_semana'] = df_diario['date'].dt.dayofweek
-    df_diario['mes'] = df_diario['date'].dt.month
-    df_diario['trimestre'] = df_diario['date'].dt.quarter
-
-    produto_pct_df = add_produto_pct_features(df, top_n=5)
-    num_estados_origem = df.groupby('date')['origin_state'].nunique().reset_index(name='num_estados_origem')
-    preco_cb_spread = df.assign(spread=df['price_transacoes'] - df['cbot']).groupby('date')['spread'].mean().reset_index(name='preco_cb_spread')
-    num_rotas_unicas = (
-        df.groupby('date')[['origin_city', 'destination_city']]
-        .apply(lambda x: x.drop_duplicates().shape[0])
-        .reset_index(name='num_rotas_unicas')
-    )
-    peso_medio_transacao = df.groupby('date')['amount'].mean().reset_index(name='peso_medio_transacao')
-
-    df_diario = (
-        df_diario
-        .merge(vendas_por_dia, on='date', how='left')
-        .merge(produto_pct_df, on='date', how='left')
-        .merge(num_estados_origem, on='date', how='left')
-        .merge(preco_cb_spread, on='date', how='left')
-        .merge(num_rotas_unicas, on='date', how='left')
-        .merge(peso_medio_transacao, on='date', how='left')
-    )
+    with span("daily_features", rows_in=len(df)) as s:
+        df_diario = daily_features(df, top_n=5, top_produtos=top_produtos)
+        s.record_shape(df_diario)
 
     # ===============================
     # 2. Features por empresa (rolling e agregadas)
     # ===============================
-    df['vendeu'] = df['amount'] > 0
-
-    rolling_window = 30
-    df['vendas_30d'] = df.groupby('company_transacoes')['amount'].transform(lambda x: x.rolling(rolling_window, min_periods=1).sum())
-    df['media_30d'] = df.groupby('company_transacoes')['amount'].transform(lambda x: x.rolling(rolling_window, min_periods=1).mean())
-    df['desvio_30d'] = df.groupby('company_transacoes')['amount'].transform(lambda x: x.rolling(rolling_window, min_periods=1).std().fillna(0))
-    df['media_7d'] = df.groupby('company_transacoes')['amount'].transform(lambda x: x.rolling(7, min_periods=1).mean())
-    df['tendencia'] = df['media_7d'] - df['media_30d']
-    df['dias_desde_ultima_venda'] = df.groupby('company_transacoes')['date'].transform(lambda x: (x.max() - x).dt.days)
-
-    df_empresa_agg = df.groupby('date').agg(
-        media_vendas_30d=('media_30d', 'mean'),
-        desvio_vendas_30d=('desvio_30d', 'mean'),
-        tendencia_media=('tendencia', 'mean'),
-        dias_ult_venda_media=('dias_desde_ultima_venda', 'mean'),
-    ).reset_index()
+    with span("rolling_features") as s:
+        df['vendeu'] = df['amount'] > 0
+
+        spec = ROLLING_FEATURES if rolling_spec is None else rolling_spec
+        add_rolling_features(df, spec)
+        if 'media_7d' in df.columns and 'media_30d' in df.columns:
+            df['tendencia'] = df['media_7d'] - df['media_30d']
+        df['dias_desde_ultima_venda'] = (df.groupby('company_transacoes', observed=True)['date'].transform('max') - df['date']).dt.days
+
+        df_empresa_agg = aggregate_rolling_features(df, spec)
+        s.record_shape(df_empresa_agg)
 
     # ===============================
     # 3. Features específicas por empresa
     # ===============================
-    empresas = df['company_transacoes'].unique()
-    for empresa in empresas:
-        nome = empresa.lower()
-        vendas_valor = df[df['company_transacoes'] == empresa].groupby('date')['amount'].sum().reset_index(name=f'total_vendas_{nome}')
-        df_diario = df_diario.merge(vendas_valor, on='date', how='left')
-        df_diario[f'{nome}_vendeu_ontem'] = add_empresa_vendeu_ontem(df_diario, empresa)
-        df_diario[f'dias_desde_ultima_venda_{nome}'] = add_dias_desde_ultima_venda_empresa(df_diario, empresa)
-        df_diario[f'{nome}_freq_ultimos_7d'] = add_freq_ultimos_7d(df_diario, empresa)
-        df_diario[f'{nome}_media_vendas_7d'] = df_diario[f'total_vendas_{nome}'].rolling(window=7, min_periods=1).mean().fillna(0)
-        df_diario[f'{nome}_domina_vendas'] = (df_diario[f'total_vendas_{nome}'] / df_diario['total_vendas']).fillna(0).apply(lambda x: int(x > 0.5))
-
-    df_final = (
+    with span("company_features") as s:
+        empresas = df['company_transacoes'].unique()
+        df_diario = pd.concat([df_diario, company_features(df, df_diario, empresas)], axis=1)
+        s.set(companies=len(empresas))
+        s.record_shape(df_diario)
+
+    return (
         df_diario
         .merge(df_empresa_agg, on='date', how='left')
         .sort_values('date')
         .reset_index(drop=True)
     )
 
-    # Garante que todas as datas entre min e max estejam presentes, inclusive datas futuras
+def fill_calendar(df_final: pd.DataFrame) -> pd.DataFrame:
+    """Garante que todas as datas entre min e max estejam presentes, inclusive datas futuras"""
     full_range = pd.date_range(df_final['date'].min(), df_final['date'].max(), freq='D')
-    df_final = df_final.set_index('date').reindex(full_range).reset_index().rename(columns={'index': 'date'})
-
-    return df_final
+    return df_final.set_index('date').reindex(full_range).reset_index().rename(columns={'index': 'date'})
 
+@traced()
 def prepare_target(df_merged: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray]:
     df_merged['empresas_vendedoras'] = df_merged['empresas_vendedoras'].apply(lambda x: x if isinstance(x, list) else [])
     mlb = MultiLabelBinarizer()
     y = mlb.fit_transform(df_merged['empresas_vendedoras'])
     return y, mlb.classes_ # type: ignore
 
-def add_produto_pct_features(df: pd.DataFrame, top_n: int = 5) -> pd.DataFrame:
-    top_produtos = df['product'].value_counts().nlargest(top_n).index.tolist()
-    produto_pct = (
-        df.groupby(['date', 'product'])['amount'].count()
+def add_rolling_features(df: pd.DataFrame, spec: Dict[str, Tuple[Union[int, str], str]],
+                         group_col: str = 'company_transacoes', value_col: str = 'amount',
+                         date_col: str = 'date') -> pd.DataFrame:
+    """
+    Adiciona estatísticas móveis por empresa descritas em `spec`
+
+    As linhas são agrupadas por empresa uma única vez e as somas acumuladas
+    por empresa são calculadas uma vez; para cada janela calcula-se o início
+    da janela de todas as linhas (busca binária nas datas, nas janelas de
+    calendário) e cada estatística é uma diferença de somas acumuladas, sem
+    lambdas por empresa e com custo que não cresce com o tamanho da janela.
+    Recalcular só o final do histórico (feature store incremental) dá o mesmo
+    resultado a menos de arredondamento (erro relativo da ordem de 1e-12).
+
+    Args:
+        df: Transações ordenadas por empresa e data
+        spec: nome da coluna -> (janela, estatística); ver ROLLING_FEATURES
+
+    Returns:
+        O próprio `df` com as novas colunas
+    """
+    janelas: Dict[Union[int, str], list] = {}
+    for nome, (janela, estatistica) in spec.items():
+        if estatistica not in ('sum', 'mean', 'std', 'count'):
+            raise ValueError(f"Estatística não suportada em '{nome}': {estatistica}")
+        janelas.setdefault(janela, []).append((nome, estatistica))
+
+    # Linhas em ordem de grupo (empresas sem nome ficam de fora, como no groupby)
+    grupos = df.groupby(group_col, observed=True, sort=False).ngroup().to_numpy()
+    posicoes = np.argsort(grupos, kind='stable')[np.count_nonzero(grupos < 0):]
+    grupos = grupos[posicoes]
+    valores = df[value_col].to_numpy(dtype=float)[posicoes]
+    linhas = np.arange(len(posicoes))
+    novo_grupo = np.r_[True, grupos[1:] != grupos[:-1]] if len(grupos) else np.zeros(0, dtype=bool)
+    inicio_grupo = np.maximum.accumulate(np.where(novo_grupo, linhas, 0)) if len(grupos) else linhas
+    prefixos = _prefix_sums(valores, grupos)
+
+    for janela, colunas in janelas.items():
+        if isinstance(janela, str):
+            # Janela de calendário (t - janela, t], dentro da mesma empresa
+            segundos = df[date_col].to_numpy(dtype='datetime64[s]').astype(np.int64)[posicoes]
+            passo = int(pd.Timedelta(janela).total_seconds())
+            deslocamento = (segundos.max() - segundos.min() + passo + 1) if len(segundos) else 0
+            chave = grupos.astype(np.int64) * deslocamento + (segundos - (segundos.min() if len(segundos) else 0))
+            inicios = np.maximum(np.searchsorted(chave, chave - passo, side='right'), inicio_grupo)
+        else:
+            inicios = np.maximum(linhas - janela + 1, inicio_grupo)
+        resultado = _window_stats(prefixos, inicios, inicio_grupo, {estatistica for _, estatistica in colunas})
+        for nome, estatistica in colunas:
+            saida = np.full(len(df), np.nan)
+            saida[posicoes] = resultado[estatistica]
+            if estatistica == 'std':
+                saida = np.nan_to_num(saida, nan=0.0)
+            df[nome] = saida
+    return df
+
+def _prefix_sums(valores: np.ndarray, grupos: np.ndarray) -> Dict[str, np.ndarray]:
+    """
+    Somas acumuladas por grupo usadas por `_window_stats` (calculadas uma vez para todas as janelas)
+
+    Os valores do desvio são centrados na média do grupo, o que evita o
+    cancelamento de soma(x²) - soma(x)²/n quando a média é grande perante a
+    variância. Sequências de valores iguais são medidas para que janelas
+    constantes tenham desvio exatamente zero (como no rolling do pandas).
+
+    Args:
+        valores: Valores ordenados por grupo (NaN ignorados)
+        grupos: Código do grupo de cada linha (grupos contíguos)
+    """
+    presente = ~np.isnan(valores)
+    limpos = np.where(presente, valores, 0.0)
+    contagem_grupo = np.bincount(grupos, weights=presente)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        media_grupo = np.bincount(grupos, weights=limpos) / contagem_grupo
+    centrados = np.where(presente, valores - media_grupo[grupos], 0.0)
+
+    # Soma acumulada reiniciada a cada grupo: o erro de arredondamento depende
+    # só do tamanho do próprio grupo
+    acumulado = pd.DataFrame({'contagem': presente.astype(float), 'soma': limpos,
+                              'soma_c': centrados, 'soma_c2': centrados * centrados}).groupby(grupos, sort=False).cumsum()
+
+    # Início da sequência de valores iguais (e presentes) que termina em cada linha
+    linhas = np.arange(len(valores))
+    quebra = np.r_[True, (grupos[1:] != grupos[:-1]) | (valores[1:] != valores[:-1])] if len(valores) else presente
+    inicio_iguais = np.maximum.accumulate(np.where(quebra | ~presente, linhas, 0)) if len(valores) else linhas
+    return {**{col: acumulado[col].to_numpy() for col in acumulado.columns}, 'inicio_iguais': inicio_iguais}
+
+def _window_stats(prefixos: Dict[str, np.ndarray], inicios: np.ndarray, inicio_grupo: np.ndarray,
+                  estatisticas) -> Dict[str, np.ndarray]:
+    """
+    Estatísticas sobre as janelas [inicios[i], i] (NaN ignorados)
+
+    Cada soma de janela é a diferença de duas somas acumuladas do grupo
+    (`_prefix_sums`): custo O(linhas), independente do tamanho da janela.
+    """
+    anterior = np.maximum(inicios - 1, 0)
+    dentro = inicios > inicio_grupo
+
+    def janela(col: str) -> np.ndarray:
+        acumulado = prefixos[col]
+        return acumulado - np.where(dentro, acumulado[anterior], 0.0)
+
+    contagem = np.rint(janela('contagem'))
+    soma = janela('soma')
+    saida = {}
+    with np.errstate(divide='ignore', invalid='ignore'):
+        if 'sum' in estatisticas:
+            saida['sum'] = np.where(contagem > 0, soma, np.nan)
+        if 'mean' in estatisticas:
+            saida['mean'] = soma / contagem
+        if 'count' in estatisticas:
+            saida['count'] = np.where(contagem > 0, contagem, np.nan)
+        if 'std' in estatisticas:
+            soma_c = janela('soma_c')
+            variancia = np.maximum(janela('soma_c2') - soma_c * soma_c / contagem, 0.0) / (contagem - 1)
+            linhas = np.arange(len(inicios))
+            constante = prefixos['inicio_iguais'] <= inicios
+            variancia = np.where(constante & (contagem == linhas - inicios + 1), 0.0, variancia)
+            saida['std'] = np.where(contagem > 1, np.sqrt(variancia), np.nan)
+    return saida
+
+def aggregate_rolling_features(df: pd.DataFrame, spec: Dict[str, Tuple[Union[int, str], str]]) -> pd.DataFrame:
+    """
+    Médias diárias das estatísticas por empresa
+
+    Mantém as quatro colunas originais e adiciona `<nome>_diario` para cada
+    entrada extra de `spec`.
+    """
+    aggs = {col: agg for col, agg in _DAILY_ROLLING_AGGS.items() if agg[0] in df.columns}
+    for nome in spec:
+        if nome not in ROLLING_FEATURES:
+            aggs[f'{nome}_diario'] = (nome, 'mean')
+    return df.groupby('date').agg(**aggs).reset_index()
+
+def product_counts(df: pd.DataFrame) -> pd.Series:
+    """Transações por produto (só produtos presentes, índice em texto mesmo com categorias)"""
+    contagem = df['product'].value_counts()
+    if isinstance(contagem.index, pd.CategoricalIndex):
+        contagem = contagem[contagem > 0]
+        contagem.index = contagem.index.astype(object)
+    return contagem
+
+def top_products(df: pd.DataFrame, top_n: int = 5) -> list:
+    """Produtos mais frequentes, na ordem usada para as colunas `pct_produto_*`"""
+    return product_counts(df).nlargest(top_n).index.tolist()
+
+def daily_features(df: pd.DataFrame, top_n: int = 5, top_produtos: Optional[list] = None) -> pd.DataFrame:
+    """
+    Calcula todas as features globais por dia em uma única agregação
+
+    As transações são ordenadas por data (de forma estável) e as chaves de
+    grupo, rotas e produtos são fatorizadas uma vez; todas as colunas diárias
+    saem do mesmo agrupamento, sem lambdas por grupo nem merges intermediários.
+
+    Args:
+        df: Transações mescladas (ordenadas por empresa e data)
+        top_n: Número de produtos com coluna `pct_produto_*`
+        top_produtos: Produtos já escolhidos (ignora `top_n` quando informado)
+
+    Returns:
+        DataFrame com uma linha por data com transações, ordenado por data
+    """
+    if top_produtos is None:
+        top_produtos = top_products(df, top_n)
+
+    ordered = df[df['date'].notna()].sort_values('date', kind='stable')
+    date_codes, dates = pd.factorize(ordered['date'], sort=True)
+    n_dias = len(dates)
+    amount = ordered['amount'].to_numpy(dtype=float)
+
+    # Rotas como um único código por par (origem, destino); NaN conta como valor
+    origem_codes, _ = pd.factorize(ordered['origin_city'], use_na_sentinel=False)
+    destino_codes, destino_uniques = pd.factorize(ordered['destination_city'], use_na_sentinel=False)
+    rota = origem_codes.astype(np.int64) * max(len(destino_uniques), 1) + destino_codes
+
+    # Produto e estado entram como códigos (nunique não precisa do texto);
+    # valores em float64 mesmo quando a tabela guarda float32
+    preco = ordered['price_transacoes'].to_numpy(dtype=float)
+    aux = pd.DataFrame({
+        'amount': amount,
+        'price_transacoes': preco,
+        'product': _codes(ordered['product']),
+        'origin_state': _codes(ordered['origin_state']),
+        'spread': preco - ordered['cbot'].to_numpy(dtype=float),
+        'rota': rota,
+    })
+    agregado = aux.groupby(date_codes, sort=True).agg(
+        total_vendas=('amount', 'sum'),
+        avg_preco=('price_transacoes', 'mean'),
+        produtos_negociados=('product', 'nunique'),
+        qtd_transacoes=('amount', 'count'),
+        num_estados_origem=('origin_state', 'nunique'),
+        preco_cb_spread=('spread', 'mean'),
+        num_rotas_unicas=('rota', 'nunique'),
+        peso_medio_transacao=('amount', 'mean'),
+    )
+
+    df_diario = pd.DataFrame({'date': pd.DatetimeIndex(dates)})
+    for col in ['total_vendas', 'avg_preco', 'produtos_negociados', 'qtd_transacoes']:
+        df_diario[col] = agregado[col].to_numpy()
+    df_diario['dia_semana'] = df_diario['date'].dt.dayofweek
+    df_diario['mes'] = df_diario['date'].dt.month
+    df_diario['trimestre'] = df_diario['date'].dt.quarter
+
+    # Lista de empresas vendedoras por dia (com repetições, na ordem das transações)
+    vendeu = amount > 0
+    vendas_por_dia = np.bincount(date_codes[vendeu], minlength=n_dias)
+    listas = np.split(ordered['company_transacoes'].to_numpy()[vendeu], np.cumsum(vendas_por_dia)[:-1])
+    df_diario['empresas_vendedoras'] = [
+        lista.tolist() if n else np.nan for lista, n in zip(listas, vendas_por_dia)
+    ]
+
+    for col, valores in _produto_pct(date_codes, n_dias, ordered['product'], ~np.isnan(amount), top_produtos).items():
+        df_diario[col] = valores
+
+    for col in ['num_estados_origem', 'preco_cb_spread', 'num_rotas_unicas', 'peso_medio_transacao']:
+        df_diario[col] = agregado[col].to_numpy()
+    return df_diario
+
+def _codes(serie: pd.Series) -> np.ndarray:
+    """Códigos inteiros dos valores (NaN preservado), para contagens distintas"""
+    codes, _ = pd.factorize(serie)
+    codes = codes.astype(float)
+    codes[codes < 0] = np.nan
+    return codes
+
+def _produto_pct(date_codes: np.ndarray, n_dias: int, product: pd.Series, conta: np.ndarray, top_produtos: list) -> dict:
+    """Participação de cada produto do top no número de transações do dia"""
+    product_codes, produtos = pd.factorize(product)
+    valido = (product_codes >= 0) & conta
+    n_produtos = len(produtos)
+    contagem = np.bincount(
+        date_codes[valido] * n_produtos + product_codes[valido], minlength=n_dias * n_produtos
+    ).reshape(n_dias, n_produtos)
+    total = contagem.sum(axis=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        pct = contagem / total[:, None]
+    posicao = {p: i for i, p in enumerate(produtos)}
+    # Produto do top ausente neste recorte: participação zero nos dias com transações
+    ausente = np.where(total > 0, 0.0, np.nan)
+    return {f'pct_produto_{p}': pct[:, posicao[p]] if p in posicao else ausente for p in top_produtos}
+
+def company_sales_matrices(df: pd.DataFrame, dates: pd.Series, empresas) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Monta as matrizes dias × empresas usadas pelas features por empresa
+
+    Args:
+        df: Transações (colunas date, company_transacoes, amount)
+        dates: Datas (linhas) da matriz, em ordem
+        empresas: Empresas (colunas) da matriz, em ordem
+
+    Returns:
+        (totais, vendeu): soma de `amount` por dia/empresa (NaN quando a empresa
+        não tem transações no dia) e indicador de venda (amount > 0)
+    """
+    dates = pd.DatetimeIndex(dates)
+    empresas = pd.Index(empresas)
+    totais = (
+        df.groupby(['date', 'company_transacoes'], observed=True)['amount'].sum()
+        .unstack()
+        .reindex(index=dates, columns=empresas)
+    )
+    vendeu = (
+        df[df['amount'] > 0]
+        .groupby(['date', 'company_transacoes'], observed=True).size()
         .unstack(fill_value=0)
-        .apply(lambda x: x / x.sum(), axis=1)
-        .reset_index()
+        .reindex(index=dates, columns=empresas, fill_value=0)
     )
-    produto_pct = produto_pct.rename(columns={p: f'pct_produto_{p}' for p in top_produtos if p in produto_pct.columns})
-    cols = ['date'] + [f'pct_produto_{p}' for p in top_produtos if f'pct_produto_{p}' in produto_pct.columns]
-    return produto_pct[cols]
-
-def add_empresa_vendeu_ontem(df: pd.DataFrame, empresa: str) -> pd.Series:
-    df_sorted = df.sort_values('date').copy()
-    flag = df_sorted['empresas_vendedoras'].apply(lambda x: empresa in x)
-    return flag.shift(1).fillna(False).astype(bool).astype(int)
-
-def add_dias_desde_ultima_venda_empresa(df: pd.DataFrame, empresa: str) -> pd.Series:
-    df_sorted = df.sort_values('date').copy()
-    last_seen = -1
-    counter = []
-    for vendeu in df_sorted['empresas_vendedoras'].apply(lambda x: empresa in x):
-        if vendeu:
-            last_seen = 0
-        elif last_seen >= 0:
-            last_seen += 1
-        else:
-            last_seen = -1
-        counter.append(last_seen if last_seen >= 0 else np.nan)
-    return pd.Series(counter, index=df_sorted.index).ffill().fillna(-1)
-
-def add_freq_ultimos_7d(df: pd.DataFrame, empresa: str) -> pd.Series:
-    df_sorted = df.sort_values('date').copy()
-    flags = df_sorted['empresas_vendedoras'].apply(lambda x: empresa in x).astype(int)
-    return flags.rolling(window=7, min_periods=1).sum()
+    return totais.to_numpy(dtype=float), vendeu.to_numpy() > 0
+
+def company_features(df: pd.DataFrame, df_diario: pd.DataFrame, empresas) -> pd.DataFrame:
+    """
+    Calcula todas as features por empresa de uma vez a partir da matriz dias × empresas
+
+    As janelas são contadas em linhas de `df_diario` (dias com transação), como
+    no cálculo original empresa a empresa.
+
+    Args:
+        df: Transações
+        df_diario: Features diárias ordenadas por data (colunas date, total_vendas)
+        empresas: Empresas, na ordem em que as colunas devem aparecer
+
+    Returns:
+        DataFrame alinhado a `df_diario` com seis colunas por empresa
+    """
+    totais, vendeu = company_sales_matrices(df, df_diario['date'], empresas)
+    return company_features_from_matrices(totais, vendeu, df_diario['total_vendas'].to_numpy(dtype=float), empresas, df_diario.index)
+
+# Marca "nunca vendeu" nas posições de última venda
+SEM_VENDA = np.iinfo(np.int64).min // 2
+
+def company_features_from_matrices(totais: np.ndarray, vendeu: np.ndarray, total_vendas: np.ndarray, empresas, index=None,
+                                   ultima_venda: Optional[np.ndarray] = None) -> pd.DataFrame:
+    """
+    Features por empresa a partir das matrizes de `company_sales_matrices`
+
+    Args:
+        ultima_venda: Linha da última venda de cada empresa antes da primeira
+            linha das matrizes (posições negativas; SEM_VENDA se nunca vendeu).
+            Permite continuar o cálculo a partir de um estado salvo.
+    """
+    n_dias, n_empresas = vendeu.shape
+    vendeu_int = vendeu.astype(np.int64)
+
+    # Venda no dia anterior (linha anterior)
+    vendeu_ontem = np.zeros_like(vendeu_int)
+    vendeu_ontem[1:] = vendeu_int[:-1]
+
+    # Linhas desde a última venda (-1 antes da primeira venda)
+    linhas = np.arange(n_dias)[:, None]
+    ultima = np.maximum.accumulate(np.where(vendeu, linhas, SEM_VENDA), axis=0)
+    if ultima_venda is not None:
+        ultima = np.maximum(ultima, ultima_venda[None, :])
+    dias_desde = np.where(ultima > SEM_VENDA, linhas - ultima, -1)
+    # Mantém inteiro apenas quando a empresa já vende desde a primeira linha (sem -1)
+    dias_inteiros = (dias_desde >= 0).all(axis=0)
+
+    # Frequência nas últimas 7 linhas via soma acumulada
+    acumulado = np.cumsum(vendeu_int, axis=0)
+    freq_7d = acumulado.copy()
+    freq_7d[7:] -= acumulado[:-7]
+
+    # Média das últimas 7 linhas ignorando dias sem transação da empresa
+    janelas = np.lib.stride_tricks.sliding_window_view(
+        np.vstack([np.full((6, n_empresas), np.nan), totais]), 7, axis=0
+    )
+    presentes = (~np.isnan(janelas)).sum(axis=-1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        media_7d = np.where(presentes > 0, np.nansum(janelas, axis=-1) / presentes, 0.0)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        participacao = totais / total_vendas[:, None]
+    domina = (participacao > 0.5).astype(np.int64)
+
+    colunas = {}
+    for j, empresa in enumerate(empresas):
+        nome = empresa.lower()
+        colunas[f'total_vendas_{nome}'] = totais[:, j]
+        colunas[f'{nome}_vendeu_ontem'] = vendeu_ontem[:, j]
+        colunas[f'dias_desde_ultima_venda_{nome}'] = dias_desde[:, j] if dias_inteiros[j] else dias_desde[:, j].astype(float)
+        colunas[f'{nome}_freq_ultimos_7d'] = freq_7d[:, j].astype(float)
+        colunas[f'{nome}_media_vendas_7d'] = media_7d[:, j]
+        colunas[f'{nome}_domina_vendas'] = domina[:, j]
+    return pd.DataFrame(colunas, index=index)
@@ -0,0 +1,559 @@
+"""
+Feature store incremental.
+
+Guarda a matriz diária de features junto com o estado necessário para
+continuá-la: últimas transações de cada empresa (janelas móveis), últimas
+linhas das matrizes dias × empresas, posição da última venda, contagem de
+transações por dia/empresa e contagem de produtos. Com isso, `update_features`
+processa apenas as novas transações e produz o mesmo resultado de um
+`create_features` sobre todo o histórico.
+
+O custo de uma atualização acompanha os dias novos: a matriz com o
+calendário completo fica em cache e recebe só as linhas novas, e a média de
+dias até a última venda é mantida por somas diárias. A única coluna
+reescrita no histórico é essa média, porque ela depende da última data de
+cada empresa em todo o histórico (como em `create_features`).
+
+Quando uma atualização não pode ser feita de forma incremental (transações
+com data já existente, mudança no ranking de produtos, datas ausentes), o
+store reconstrói tudo a partir do histórico que ele mesmo mantém.
+"""
+
+import copy
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from agrofuture.feature_engineer import (
+    ROLLING_FEATURES,
+    SEM_VENDA,
+    add_rolling_features,
+    aggregate_rolling_features,
+    build_feature_frame,
+    company_features_from_matrices,
+    company_sales_matrices,
+    daily_features,
+    fill_calendar,
+    product_counts,
+    top_products,
+)
+from agrofuture.instrumentation import traced
+
+STORE_FORMAT_VERSION = 2
+
+# Linhas de contexto das matrizes dias × empresas (janela de 7 linhas - 1)
+_CONTEXT_ROWS = 6
+
+_STATE_FILE = "state.joblib"
+_HISTORY_DIR = "history"
+
+
+class FeatureStore:
+    """
+    Matriz de features diária com estado para atualizações incrementais.
+
+    Uso típico:
+
+        store = FeatureStore.build(merged_df, path=PROCESSED_DATA_DIR / "feature_store")
+        store.save()
+        ...
+        store = FeatureStore.load(PROCESSED_DATA_DIR / "feature_store")
+        df_features = store.update_features(novas_transacoes)
+
+    Args:
+        path: Diretório de persistência (opcional; sem ele o store vive só em memória)
+        rolling_spec: Estatísticas móveis por empresa (padrão: ROLLING_FEATURES)
+        pinned_products: Produtos fixos das colunas `pct_produto_*` (padrão: os
+            5 mais frequentes do histórico, recalculados a cada atualização)
+    """
+
+    def __init__(self, path: Optional[Union[str, Path]] = None,
+                 rolling_spec: Optional[Dict[str, Tuple[Union[int, str], str]]] = None,
+                 pinned_products: Optional[List] = None):
+        self.path = Path(path) if path is not None else None
+        self.rolling_spec = dict(ROLLING_FEATURES if rolling_spec is None else rolling_spec)
+        self.pinned_products = list(pinned_products) if pinned_products is not None else None
+        self.daily: Optional[pd.DataFrame] = None
+        self.rebuilds = 0
+        self.incremental_updates = 0
+        # Partes do histórico ainda não gravadas e onde estão as já gravadas
+        self._history_parts: List[pd.DataFrame] = []
+        self._history_path = self.path
+        self._saved_parts = 0
+        self._reset_state()
+
+    # ------------------------------------------------------------------
+    # Construção e persistência
+    # ------------------------------------------------------------------
+
+    @classmethod
+    def build(cls, merged: pd.DataFrame, path: Optional[Union[str, Path]] = None,
+              rolling_spec: Optional[Dict[str, Tuple[Union[int, str], str]]] = None) -> "FeatureStore":
+        """Constrói o store a partir do histórico completo de transações mescladas"""
+        store = cls(path, rolling_spec)
+        store._rebuild([merged.copy()])
+        return store
+
+    @classmethod
+    def load(cls, path: Union[str, Path]) -> "FeatureStore":
+        """Carrega um store salvo com `save()` (o histórico só é lido se for preciso reconstruir)"""
+        path = Path(path)
+        state = joblib.load(path / _STATE_FILE)
+        if state.get("version") != STORE_FORMAT_VERSION:
+            raise ValueError(f"Versão de feature store incompatível em {path}")
+        store = cls(path, state["rolling_spec"])
+        store.__dict__.update(state["attrs"])
+        store._saved_parts = state["saved_parts"]
+        return store
+
+    def save(self, path: Optional[Union[str, Path]] = None) -> Path:
+        """Persiste o estado e anexa ao disco as partes novas do histórico"""
+        if path is not None:
+            self.path = Path(path)
+        if self.path is None:
+            raise ValueError("Informe o diretório do feature store")
+        if self._history_path != self.path:
+            # Diretório novo: o histórico inteiro precisa ir junto
+            self._history_parts = self._load_history()
+            self._saved_parts = 0
+            self._history_path = self.path
+
+        history_dir = self.path / _HISTORY_DIR
+        history_dir.mkdir(parents=True, exist_ok=True)
+        if self._saved_parts == 0:
+            for stale in history_dir.glob("part-*.pkl"):
+                stale.unlink()
+        for part in self._history_parts:
+            part.to_pickle(history_dir / f"part-{self._saved_parts:06d}.pkl")
+            self._saved_parts += 1
+        self._history_parts = []
+
+        # A matriz com calendário completo é derivada de `daily` e refeita na primeira consulta
+        attrs = {k: v for k, v in self.__dict__.items()
+                 if k not in ("path", "_history_parts", "_history_path", "_saved_parts", "_filled")}
+        state = {
+            "version": STORE_FORMAT_VERSION,
+            "rolling_spec": self.rolling_spec,
+            "saved_parts": self._saved_parts,
+            "attrs": attrs,
+        }
+        tmp = self.path / f"{_STATE_FILE}.tmp"
+        joblib.dump(state, tmp)
+        tmp.replace(self.path / _STATE_FILE)
+        return self.path
+
+    def copy(self) -> "FeatureStore":
+        """Cópia em memória (atualizações na cópia não afetam o store salvo)"""
+        clone = copy.copy(self)
+        for attr in ("daily", "_tail", "_context_totais", "_context_vendeu", "_contagem",
+                     "_ultima_venda", "_ultima_data", "_product_counts", "_soma_ultima", "_n_transacoes"):
+            setattr(clone, attr, copy.deepcopy(getattr(self, attr)))
+        # `_filled` pode ser compartilhado: as atualizações sempre montam um novo DataFrame
+        clone._history_parts = list(self._history_parts)
+        # A cópia continua lendo o histórico já gravado, mas não grava no diretório do original
+        clone.path = None
+        return clone
+
+    # ------------------------------------------------------------------
+    # Consulta
+    # ------------------------------------------------------------------
+
+    def features(self) -> pd.DataFrame:
+        """Matriz de features no mesmo formato de `create_features` (calendário completo)"""
+        if self.daily is None:
+            raise ValueError("Feature store vazio")
+        if self._filled is None:
+            self._filled = fill_calendar(self.daily)
+        # Cópia: quem consome a matriz pode alterá-la (ex.: `prepare_target`)
+        return self._filled.copy()
+
+    @property
+    def last_date(self) -> Optional[pd.Timestamp]:
+        return self._last_date
+
+    @property
+    def companies(self) -> List:
+        return list(self._empresas)
+
+    def fingerprint(self) -> Dict[str, Any]:
+        """Identificação dos dados ingeridos (linhas, hash e período), gravada no pacote do modelo"""
+        return {
+            "rows": int(self._n_rows),
+            "rows_hash": f"{int(self._rows_hash):016x}",
+            "first_date": str(self.daily["date"].min().date()) if self.daily is not None and len(self.daily) else None,
+            "last_date": str(self._last_date.date()) if self._last_date is not None else None,
+        }
+
+    def sync(self, merged: pd.DataFrame) -> pd.DataFrame:
+        """
+        Alinha o store a um histórico completo que cresce por acréscimo de linhas.
+
+        Se `merged` tem pelo menos as linhas já ingeridas e a última delas é a
+        mesma (hash da linha na mesma posição), só as linhas novas são
+        processadas, sem reler o prefixo; caso contrário o store é
+        reconstruído. Alterações no meio do histórico que preservem essa
+        linha não são detectadas: nesse caso use `FeatureStore.build`.
+
+        Returns:
+            Matriz de features atualizada
+        """
+        if self.daily is not None and len(merged) >= self._n_rows > 0:
+            if _rows_hash(merged.iloc[self._n_rows - 1:self._n_rows]) == self._last_row_hash:
+                novas = merged.iloc[self._n_rows:]
+                if len(novas):
+                    return self.update_features(novas)
+                return self.features()
+        self._rebuild([merged.copy()])
+        return self.features()
+
+    # ------------------------------------------------------------------
+    # Atualização incremental
+    # ------------------------------------------------------------------
+
+    @traced()
+    def update_features(self, new_rows: pd.DataFrame) -> pd.DataFrame:
+        """
+        Acrescenta novas transações mescladas e atualiza apenas as datas afetadas.
+
+        Args:
+            new_rows: Transações no formato de `merge_data`
+
+        Returns:
+            Matriz de features completa, igual à de `create_features` sobre
+            histórico + novas transações
+        """
+        self._ingest(new_rows)
+        return self.features()
+
+    def extend(self, new_rows: pd.DataFrame) -> pd.DataFrame:
+        """
+        Acrescenta transações posteriores à última data e devolve só as linhas das novas datas
+
+        Mesmo estado final de `update_features`, sem montar a matriz completa
+        a cada chamada; serve para avançar o store dia a dia (ex.: horizonte
+        de previsão com registros sintéticos).
+
+        Returns:
+            Linhas de features das datas posteriores à última data anterior
+        """
+        anterior = self._last_date
+        self._ingest(new_rows)
+        if anterior is None:
+            return self.daily.reset_index(drop=True)
+        return self.daily[self.daily['date'] > anterior].reset_index(drop=True)
+
+    def _ingest(self, new_rows: pd.DataFrame) -> None:
+        if new_rows.empty:
+            return
+        rows_hash = _rows_hash(new_rows)
+        last_row_hash = _rows_hash(new_rows.iloc[-1:])
+        new_rows = new_rows.copy()
+        new_rows['date'] = pd.to_datetime(new_rows['date'])
+        if self.daily is None:
+            self._rebuild([new_rows])
+            return
+
+        contagem = self._product_counts.add(product_counts(new_rows), fill_value=0).astype(np.int64)
+        if not self._can_update(new_rows, contagem):
+            self._rebuild(self._load_history() + [new_rows])
+            return
+
+        self._append(new_rows, contagem, rows_hash, last_row_hash)
+        self.incremental_updates += 1
+
+    def _can_update(self, new_rows: pd.DataFrame, product_counts: pd.Series) -> bool:
+        if self._has_nat or new_rows['date'].isna().any():
+            return False
+        if new_rows['date'].min() <= self._last_date:
+            return False
+        if new_rows['company_transacoes'].isna().any():
+            return False
+        if self.pinned_products is not None:
+            return True
+        return _unambiguous_top(product_counts, self._top_n) == self._top_produtos
+
+    def _append(self, new_rows: pd.DataFrame, product_counts: pd.Series, rows_hash: np.uint64,
+                last_row_hash: np.uint64) -> None:
+        df = new_rows.sort_values(['company_transacoes', 'date'])
+        spec = self.rolling_spec
+
+        # 1. Features globais dos novos dias
+        novo_diario = daily_features(df, top_produtos=self._top_produtos)
+        novas_datas = pd.DatetimeIndex(novo_diario['date'])
+
+        # 2. Rolling por empresa usando o buffer das últimas transações
+        contexto = pd.concat([self._tail, df], ignore_index=True)
+        contexto = contexto.sort_values(['company_transacoes', 'date'], kind='stable')
+        contexto['vendeu'] = contexto['amount'] > 0
+        add_rolling_features(contexto, spec)
+        if 'media_7d' in contexto.columns and 'media_30d' in contexto.columns:
+            contexto['tendencia'] = contexto['media_7d'] - contexto['media_30d']
+        ultima_data = pd.concat([self._ultima_data, df.groupby('company_transacoes', observed=True)['date'].max()]).groupby(level=0, observed=True).max()
+        contexto['dias_desde_ultima_venda'] = (contexto['company_transacoes'].map(ultima_data) - contexto['date']).dt.days
+        novas_linhas = contexto[contexto['date'] > self._last_date]
+        agregado = aggregate_rolling_features(novas_linhas, spec)
+
+        # 3. Features por empresa a partir do contexto das matrizes
+        empresas = sorted(set(self._empresas) | set(df['company_transacoes'].unique()))
+        novas_empresas = [e for e in empresas if e not in set(self._empresas)]
+        totais_novos, vendeu_novos = company_sales_matrices(df, novas_datas, empresas)
+        ctx_totais = self._context_totais.reindex(columns=empresas)
+        ctx_vendeu = self._context_vendeu.reindex(columns=empresas, fill_value=False)
+        n_ctx = len(ctx_totais)
+        totais = np.vstack([ctx_totais.to_numpy(dtype=float), totais_novos])
+        vendeu = np.vstack([ctx_vendeu.to_numpy(dtype=bool), vendeu_novos])
+        total_vendas = np.concatenate([
+            self.daily['total_vendas'].to_numpy(dtype=float)[len(self.daily) - n_ctx:],
+            novo_diario['total_vendas'].to_numpy(dtype=float),
+        ])
+        inicio = self._n_linhas - n_ctx
+        ultima_venda = self._ultima_venda.reindex(empresas, fill_value=SEM_VENDA).to_numpy(dtype=np.int64)
+        ultima_venda = np.where(ultima_venda > SEM_VENDA, ultima_venda - inicio, SEM_VENDA)
+        bloco = company_features_from_matrices(totais, vendeu, total_vendas, empresas, ultima_venda=ultima_venda)
+        bloco = bloco.iloc[n_ctx:].reset_index(drop=True)
+
+        novo = pd.concat([novo_diario.reset_index(drop=True), bloco], axis=1).merge(agregado, on='date', how='left')
+
+        # Empresas novas: colunas do histórico com os valores de "nunca vendeu"
+        daily = self.daily
+        if novas_empresas:
+            historico = _empty_company_block(novas_empresas, len(daily))
+            daily = pd.concat([daily, historico], axis=1)
+        columns = list(novo_diario.columns) + _company_columns(empresas) + [c for c in agregado.columns if c != 'date']
+        n_antes = len(daily)
+        daily = pd.concat([daily, novo], ignore_index=True)[columns]
+
+        # Estado
+        contagem_nova = (
+            df.groupby(['date', 'company_transacoes'], observed=True).size().unstack(fill_value=0)
+            .reindex(index=novas_datas, columns=empresas, fill_value=0)
+        )
+        self._update_last_sale_sums(ultima_data, contagem_nova)
+        self._contagem = pd.concat([self._contagem.reindex(columns=empresas, fill_value=0), contagem_nova]).astype(np.int32)
+        self._ultima_data = ultima_data
+        self._empresas = empresas
+        self._update_sales_state(totais, vendeu, empresas, inicio)
+        self._tail = self._trim_tail(contexto[['company_transacoes', 'date', 'amount']])
+        self._product_counts = product_counts
+        self._last_date = novas_datas.max()
+        self._n_rows += len(new_rows)
+        self._rows_hash = _combine_hashes(self._rows_hash, rows_hash)
+        self._last_row_hash = last_row_hash
+        self._history_parts.append(new_rows)
+
+        daily['dias_ult_venda_media'] = self._dias_ult_venda_media(daily['date'])
+        self.daily = daily
+        self._extend_filled(n_antes)
+
+    # ------------------------------------------------------------------
+    # Reconstrução completa
+    # ------------------------------------------------------------------
+
+    def _reset_state(self) -> None:
+        self._top_n = 5
+        self._top_produtos: List = []
+        self._product_counts = pd.Series(dtype=np.int64)
+        self._empresas: List = []
+        self._tail = pd.DataFrame(columns=['company_transacoes', 'date', 'amount'])
+        self._context_totais = pd.DataFrame()
+        self._context_vendeu = pd.DataFrame()
+        self._ultima_venda = pd.Series(dtype=np.int64)
+        self._ultima_data = pd.Series(dtype='datetime64[ns]')
+        self._contagem = pd.DataFrame()
+        self._n_linhas = 0
+        self._last_date: Optional[pd.Timestamp] = None
+        self._has_nat = False
+        self._n_rows = 0
+        self._rows_hash = np.uint64(0)
+        self._last_row_hash = np.uint64(0)
+        # Por linha de `daily`: transações e soma dos dias (desde a época) da última data das empresas
+        self._n_transacoes = np.zeros(0, dtype=np.int64)
+        self._soma_ultima = np.zeros(0, dtype=np.int64)
+        self._filled: Optional[pd.DataFrame] = None
+
+    def _rebuild(self, parts: List[pd.DataFrame]) -> None:
+        merged = pd.concat(parts, ignore_index=True) if len(parts) > 1 else parts[0]
+        self._reset_state()
+        self.rebuilds += 1
+
+        df = merged.copy()
+        df['date'] = pd.to_datetime(df['date'])
+        df = df.sort_values(['company_transacoes', 'date'])
+        if self.pinned_products is not None:
+            self._top_produtos = list(self.pinned_products)
+        else:
+            self._top_produtos = top_products(df, self._top_n)
+        daily = build_feature_frame(df, self.rolling_spec, top_produtos=self._top_produtos)
+
+        self._product_counts = product_counts(df).astype(np.int64)
+        empresas = list(df['company_transacoes'].dropna().unique())
+        self._empresas = empresas
+        self._has_nat = bool(df['date'].isna().any())
+        datas = pd.DatetimeIndex(daily['date'])
+        totais, vendeu = company_sales_matrices(df, datas, empresas)
+        self._update_sales_state(totais, vendeu, empresas, 0)
+        self._contagem = (
+            df.groupby(['date', 'company_transacoes'], observed=True).size().unstack(fill_value=0)
+            .reindex(index=datas, columns=empresas, fill_value=0)
+            .astype(np.int32)
+        )
+        self._ultima_data = df.groupby('company_transacoes', observed=True)['date'].max()
+        contagem = self._contagem.to_numpy(dtype=np.int64)
+        self._n_transacoes = contagem.sum(axis=1)
+        self._soma_ultima = contagem @ _day_numbers(self._ultima_data.reindex(empresas))
+        self._tail = self._trim_tail(df[['company_transacoes', 'date', 'amount']])
+        self._last_date = datas.max() if len(datas) else None
+        self._n_rows = len(merged)
+        self._rows_hash = _rows_hash(merged)
+        self._last_row_hash = _rows_hash(merged.iloc[-1:])
+        # O histórico passa a ser só `merged`; partes antigas em disco são descartadas no próximo save
+        self._history_parts = [merged]
+        self._saved_parts = 0
+        self._history_path = self.path
+        self.daily = daily
+
+    # ------------------------------------------------------------------
+    # Auxiliares
+    # ------------------------------------------------------------------
+
+    def _update_sales_state(self, totais: np.ndarray, vendeu: np.ndarray, empresas: List, inicio: int) -> None:
+        """
+        Guarda as últimas linhas das matrizes e, para cada empresa, a posição
+        global da última venda anterior a essas linhas de contexto
+        """
+        n = len(vendeu)
+        corte = max(n - _CONTEXT_ROWS, 0)
+        linhas = np.arange(corte)[:, None]
+        ultima = np.where(vendeu[:corte], linhas, -1).max(axis=0) if corte else np.full(len(empresas), -1)
+        anterior = self._ultima_venda.reindex(empresas, fill_value=SEM_VENDA).to_numpy(dtype=np.int64)
+        atual = np.where(ultima >= 0, ultima + inicio, anterior)
+        self._ultima_venda = pd.Series(atual, index=empresas, dtype=np.int64)
+        self._context_totais = pd.DataFrame(totais[corte:], columns=empresas)
+        self._context_vendeu = pd.DataFrame(vendeu[corte:], columns=empresas)
+        self._n_linhas = inicio + n
+
+    def _trim_tail(self, rows: pd.DataFrame) -> pd.DataFrame:
+        """Mantém apenas as transações que ainda podem entrar em alguma janela móvel"""
+        janelas_linhas = [j for j, _ in self.rolling_spec.values() if not isinstance(j, str)]
+        janelas_tempo = [pd.Timedelta(j) for j, _ in self.rolling_spec.values() if isinstance(j, str)]
+        manter = np.zeros(len(rows), dtype=bool)
+        if janelas_linhas:
+            manter |= rows.groupby('company_transacoes', observed=True).cumcount(ascending=False).to_numpy() < max(janelas_linhas)
+        if janelas_tempo and len(rows):
+            manter |= (rows['date'] > rows['date'].max() - max(janelas_tempo)).to_numpy()
+        return rows[manter].reset_index(drop=True)
+
+    def _update_last_sale_sums(self, ultima_data: pd.Series, contagem_nova: pd.DataFrame) -> None:
+        """
+        Atualiza as somas diárias da última data das empresas
+
+        Só as colunas das empresas cuja última data mudou são relidas do
+        histórico; os novos dias entram com a última data já atualizada.
+        """
+        empresas = self._contagem.columns
+        antes = self._ultima_data.reindex(empresas)
+        depois = ultima_data.reindex(empresas)
+        mudaram = empresas[(antes != depois).to_numpy()]
+        soma = self._soma_ultima
+        if len(mudaram):
+            delta = _day_numbers(depois[mudaram]) - _day_numbers(antes[mudaram])
+            soma = soma + self._contagem[mudaram].to_numpy(dtype=np.int64) @ delta
+        nova = contagem_nova.to_numpy(dtype=np.int64)
+        self._soma_ultima = np.concatenate([soma, nova @ _day_numbers(ultima_data.reindex(contagem_nova.columns))])
+        self._n_transacoes = np.concatenate([self._n_transacoes, nova.sum(axis=1)])
+
+    def _dias_ult_venda_media(self, datas: pd.Series) -> np.ndarray:
+        """Média diária de dias até a última transação de cada empresa (muda com cada nova data)"""
+        n = self._n_transacoes
+        soma = self._soma_ultima - n * _day_numbers(datas)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.where(n > 0, soma / n, np.nan)
+
+    def _extend_filled(self, n_antes: int) -> None:
+        """Acrescenta à matriz com calendário completo só as datas novas (e as lacunas até elas)"""
+        if self._filled is None or n_antes == 0:
+            return
+        novos = fill_calendar(self.daily.iloc[n_antes - 1:]).iloc[1:]
+        if list(novos.columns) != list(self._filled.columns):
+            # Empresas novas mudam as colunas: a matriz é refeita na próxima consulta
+            self._filled = None
+            return
+        filled = pd.concat([self._filled, novos], ignore_index=True)
+        coluna = np.full(len(filled), np.nan)
+        posicoes = (self.daily['date'] - filled['date'].iloc[0]).dt.days.to_numpy()
+        coluna[posicoes] = self.daily['dias_ult_venda_media'].to_numpy(dtype=float)
+        filled['dias_ult_venda_media'] = coluna
+        self._filled = filled
+
+    def _load_history(self) -> List[pd.DataFrame]:
+        parts: List[pd.DataFrame] = []
+        if self._history_path is not None and self._saved_parts:
+            history_dir = self._history_path / _HISTORY_DIR
+            parts = [pd.read_pickle(history_dir / f"part-{i:06d}.pkl") for i in range(self._saved_parts)]
+        return parts + list(self._history_parts)
+
+
+def _company_columns(empresas: List) -> List[str]:
+    colunas = []
+    for empresa in empresas:
+        nome = empresa.lower()
+        colunas += [
+            f'total_vendas_{nome}', f'{nome}_vendeu_ontem', f'dias_desde_ultima_venda_{nome}',
+            f'{nome}_freq_ultimos_7d', f'{nome}_media_vendas_7d', f'{nome}_domina_vendas',
+        ]
+    return colunas
+
+
+def _empty_company_block(empresas: List, n_linhas: int) -> pd.DataFrame:
+    """Colunas de empresas que ainda não apareciam no histórico"""
+    n = len(empresas)
+    return company_features_from_matrices(
+        np.full((n_linhas, n), np.nan), np.zeros((n_linhas, n), dtype=bool), np.zeros(n_linhas), empresas
+    )
+
+
+def _unambiguous_top(product_counts: pd.Series, top_n: int) -> Optional[List]:
+    """Top de produtos pelas contagens; None se houver empate que afete o ranking"""
+    ordenado = product_counts.sort_values(ascending=False, kind='stable')
+    valores = ordenado.to_numpy()[:top_n + 1]
+    if len(np.unique(valores)) != len(valores):
+        return None
+    return ordenado.index[:top_n].tolist()
+
+
+def _day_numbers(datas) -> np.ndarray:
+    """Datas como número de dias desde 1970-01-01"""
+    return pd.DatetimeIndex(datas).to_numpy(dtype='datetime64[D]').astype(np.int64)
+
+
+def _rows_hash(df: pd.DataFrame) -> np.uint64:
+    """Impressão digital das linhas (soma dos hashes; acumulável por acréscimo)"""
+    if df.empty:
+        return np.uint64(0)
+    with np.errstate(over='ignore'):
+        return np.uint64(pd.util.hash_pandas_object(df, index=False).to_numpy().sum(dtype=np.uint64))
+
+
+def _combine_hashes(a: np.uint64, b: np.uint64) -> np.uint64:
+    return np.uint64((int(a) + int(b)) % (1 << 64))
+
+
+@traced()
+def sync_feature_store(merged: pd.DataFrame, path: Union[str, Path]) -> Tuple[FeatureStore, pd.DataFrame]:
+    """
+    Carrega (ou cria) o feature store em `path`, alinha ao histórico e salva
+
+    Returns:
+        (store, matriz de features atualizada)
+    """
+    path = Path(path)
+    try:
+        store = FeatureStore.load(path)
+    except (FileNotFoundError, ValueError, EOFError):
+        store = FeatureStore(path)
+    df_features = store.sync(merged)
+    store.save()
+    return store, df_features
@@ -0,0 +1,298 @@
+"""
+Fontes de cotação USD-BRL por data.
+
+O `merge_data` precisa de uma série diária de câmbio para converter o CBOT em
+reais. As fontes abaixo podem ser combinadas em cadeia: uma base local
+(SQLite ou CSV) é consultada primeiro, a API pública só é chamada para as datas
+que faltarem (com timeout e cache com TTL) e um valor constante cobre o que
+ainda restar, de forma explícita.
+"""
+
+import os
+import sqlite3
+import time
+import warnings
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, Union
+
+import pandas as pd
+import requests
+
+DEFAULT_FALLBACK_RATE = 5.0
+FX_DB_FILE = "fx_rates.sqlite"
+AWESOMEAPI_URL = "https://economia.awesomeapi.com.br"
+
+
+class RateSource:
+    """Interface comum: devolve as cotações conhecidas para um intervalo de datas"""
+
+    def get_rates(self, start: pd.Timestamp, end: pd.Timestamp) -> pd.Series:
+        """
+        Args:
+            start: Primeira data do intervalo (inclusive)
+            end: Última data do intervalo (inclusive)
+
+        Returns:
+            Série indexada por data (normalizada) com a cotação; datas sem
+            cotação simplesmente não aparecem
+        """
+        raise NotImplementedError
+
+
+class ConstantRateSource(RateSource):
+    """Cotação fixa para todas as datas (último recurso)"""
+
+    def __init__(self, rate: float = DEFAULT_FALLBACK_RATE):
+        self.rate = float(rate)
+
+    def get_rates(self, start, end):
+        dates = pd.date_range(pd.Timestamp(start).normalize(), pd.Timestamp(end).normalize(), freq="D")
+        return pd.Series(self.rate, index=dates, name="rate")
+
+
+class CSVRateSource(RateSource):
+    """Arquivo CSV local com colunas `date` e `rate`"""
+
+    def __init__(self, path: Union[str, Path]):
+        self.path = Path(path)
+        self._rates: Optional[pd.Series] = None
+
+    def get_rates(self, start, end):
+        if self._rates is None:
+            df = pd.read_csv(self.path, parse_dates=["date"])
+            self._rates = (
+                df.assign(date=df["date"].dt.normalize())
+                .drop_duplicates("date", keep="last")
+                .set_index("date")["rate"]
+                .sort_index()
+                .astype(float)
+            )
+        return self._rates.loc[pd.Timestamp(start).normalize():pd.Timestamp(end).normalize()]
+
+
+class SQLiteRateSource(RateSource):
+    """
+    Base SQLite local com uma cotação por data (tabela `fx_rates`)
+
+    A leitura não cria nada: sem o arquivo, nenhuma cotação é conhecida. O
+    diretório e a tabela só são criados na primeira gravação (`store`).
+    """
+
+    def __init__(self, path: Union[str, Path]):
+        self.path = Path(path)
+        self._schema_ready = False
+
+    def get_rates(self, start, end):
+        if not self.path.exists():
+            return pd.Series(dtype=float, index=pd.DatetimeIndex([]), name="rate")
+        with sqlite3.connect(self.path) as conn:
+            df = pd.read_sql_query(
+                "SELECT date, rate FROM fx_rates WHERE date BETWEEN ? AND ? ORDER BY date",
+                conn,
+                params=(pd.Timestamp(start).strftime("%Y-%m-%d"), pd.Timestamp(end).strftime("%Y-%m-%d")),
+            )
+        return pd.Series(df["rate"].to_numpy(dtype=float), index=pd.DatetimeIndex(pd.to_datetime(df["date"])), name="rate")
+
+    def store(self, rates: pd.Series) -> None:
+        """Grava (ou substitui) cotações na base"""
+        if rates.empty:
+            return
+        rows = [(pd.Timestamp(d).strftime("%Y-%m-%d"), float(r)) for d, r in rates.items()]
+        if not self._schema_ready:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+        with sqlite3.connect(self.path) as conn:
+            if not self._schema_ready:
+                conn.execute("CREATE TABLE IF NOT EXISTS fx_rates (date TEXT PRIMARY KEY, rate REAL NOT NULL)")
+                self._schema_ready = True
+            conn.executemany("INSERT OR REPLACE INTO fx_rates (date, rate) VALUES (?, ?)", rows)
+
+
+class AwesomeAPIRateSource(RateSource):
+    """
+    Cotações diárias da AwesomeAPI com timeout rígido e cache em memória com TTL.
+
+    Args:
+        base_url: URL base da API (substituível por um servidor local em testes)
+        timeout: Timeout em segundos de cada requisição
+        ttl: Tempo de vida (segundos) das respostas em cache
+        store: Base local opcional onde as cotações obtidas são persistidas
+    """
+
+    max_days_per_request = 360
+
+    def __init__(self, base_url: str = AWESOMEAPI_URL, timeout: float = 3.0, ttl: float = 3600.0,
+                 store: Optional[SQLiteRateSource] = None):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.ttl = ttl
+        self.store = store
+        self.retry_after = min(ttl, 60.0)
+        self._cache: Dict[Tuple[str, str], Tuple[float, pd.Series]] = {}
+        self._failed_at: Optional[float] = None
+
+    def get_rates(self, start, end):
+        start, end = pd.Timestamp(start).normalize(), pd.Timestamp(end).normalize()
+        parts: List[pd.Series] = []
+        chunk_start = start
+        while chunk_start <= end:
+            chunk_end = min(chunk_start + pd.Timedelta(days=self.max_days_per_request - 1), end)
+            parts.append(self._fetch_cached(chunk_start, chunk_end))
+            chunk_start = chunk_end + pd.Timedelta(days=1)
+        rates = pd.concat(parts) if parts else pd.Series(dtype=float)
+        rates = rates[~rates.index.duplicated(keep="last")].sort_index()
+        if self.store is not None:
+            self.store.store(rates)
+        return rates
+
+    def _fetch_cached(self, start: pd.Timestamp, end: pd.Timestamp) -> pd.Series:
+        key = (start.strftime("%Y%m%d"), end.strftime("%Y%m%d"))
+        cached = self._cache.get(key)
+        if cached is not None and time.monotonic() - cached[0] < self.ttl:
+            return cached[1]
+        # Após uma falha, evita repetir o timeout a cada chamada por `retry_after` segundos
+        if self._failed_at is not None and time.monotonic() - self._failed_at < self.retry_after:
+            raise requests.ConnectionError("AwesomeAPI indisponível (falha recente)")
+        try:
+            rates = self._fetch(start, end)
+        except requests.RequestException:
+            self._failed_at = time.monotonic()
+            raise
+        self._failed_at = None
+        self._cache[key] = (time.monotonic(), rates)
+        return rates
+
+    def _fetch(self, start: pd.Timestamp, end: pd.Timestamp) -> pd.Series:
+        n_days = (end - start).days + 1
+        response = requests.get(
+            f"{self.base_url}/json/daily/USD-BRL/{n_days}",
+            params={"start_date": start.strftime("%Y%m%d"), "end_date": end.strftime("%Y%m%d")},
+            timeout=self.timeout,
+        )
+        response.raise_for_status()
+        data = response.json()
+        if not data:
+            return pd.Series(dtype=float, name="rate")
+        dates = pd.to_datetime([int(item["timestamp"]) for item in data], unit="s").normalize()
+        values = [float(item["bid"]) for item in data]
+        rates = pd.Series(values, index=dates, name="rate")
+        return rates[~rates.index.duplicated(keep="first")].sort_index()
+
+
+class ChainedRateSource(RateSource):
+    """
+    Consulta as fontes em ordem. Cada fonte seguinte só é chamada para as pontas
+    do intervalo que ainda não têm cotação; lacunas internas (fins de semana,
+    feriados) são resolvidas depois pela junção as-of.
+
+    Args:
+        sources: Fontes em ordem de prioridade
+        slack: Tolerância nas pontas antes de considerar o intervalo descoberto
+    """
+
+    def __init__(self, sources: List[RateSource], slack: pd.Timedelta = pd.Timedelta(days=4)):
+        self.sources = sources
+        self.slack = slack
+
+    def get_rates(self, start, end):
+        start, end = pd.Timestamp(start).normalize(), pd.Timestamp(end).normalize()
+        rates = pd.Series(dtype=float, name="rate")
+        for source in self.sources:
+            missing = self._missing_ranges(rates, start, end)
+            if not missing:
+                break
+            for range_start, range_end in missing:
+                try:
+                    found = source.get_rates(range_start, range_end)
+                except (requests.RequestException, OSError, ValueError, KeyError, sqlite3.Error) as exc:
+                    warnings.warn(f"Fonte de câmbio {source.__class__.__name__} indisponível: {exc}")
+                    continue
+                if found.empty:
+                    continue
+                if isinstance(source, ConstantRateSource):
+                    warnings.warn(
+                        f"Sem cotação USD-BRL entre {range_start.date()} e {range_end.date()}; "
+                        f"usando valor constante {source.rate}"
+                    )
+                if rates.empty:
+                    rates = found.sort_index()
+                else:
+                    rates = pd.concat([rates, found[~found.index.isin(rates.index)]]).sort_index()
+        return rates.rename("rate")
+
+    def _missing_ranges(self, rates: pd.Series, start: pd.Timestamp, end: pd.Timestamp) -> List[Tuple[pd.Timestamp, pd.Timestamp]]:
+        if rates.empty:
+            return [(start, end)]
+        one_day = pd.Timedelta(days=1)
+        missing = []
+        if rates.index.min() > start + self.slack:
+            missing.append((start, rates.index.min() - one_day))
+        if rates.index.max() < end - self.slack:
+            missing.append((rates.index.max() + one_day, end))
+        return missing
+
+
+def default_rate_source(db_path: Optional[Union[str, Path]] = None) -> RateSource:
+    """
+    Fonte padrão configurada por variáveis de ambiente:
+
+    - `AGROFUTURE_FX_DB`: base SQLite local (tem precedência sobre `db_path`)
+    - `AGROFUTURE_FX_OFFLINE=1`: não consulta a API pública
+    - `AGROFUTURE_FX_TIMEOUT`: timeout da API em segundos (padrão 3)
+    - `AGROFUTURE_FX_FALLBACK`: cotação constante de último recurso (padrão 5.0)
+
+    Args:
+        db_path: Base SQLite local (o pipeline usa `processed_data_dir / FX_DB_FILE`);
+            sem ela e sem `AGROFUTURE_FX_DB` as cotações da API não são persistidas
+    """
+    db_path = os.environ.get("AGROFUTURE_FX_DB") or db_path
+    store = SQLiteRateSource(db_path) if db_path is not None else None
+    sources: List[RateSource] = [store] if store is not None else []
+    if os.environ.get("AGROFUTURE_FX_OFFLINE", "0") != "1":
+        timeout = float(os.environ.get("AGROFUTURE_FX_TIMEOUT", "3"))
+        sources.append(_live_source(timeout, store))
+    sources.append(ConstantRateSource(float(os.environ.get("AGROFUTURE_FX_FALLBACK", DEFAULT_FALLBACK_RATE))))
+    return ChainedRateSource(sources)
+
+
+_LIVE_SOURCES: Dict[Tuple[float, Optional[Path]], AwesomeAPIRateSource] = {}
+
+
+def _live_source(timeout: float, store: Optional[SQLiteRateSource]) -> AwesomeAPIRateSource:
+    # Reaproveita a mesma instância para que o cache com TTL valha entre chamadas
+    key = (timeout, store.path if store is not None else None)
+    if key not in _LIVE_SOURCES:
+        _LIVE_SOURCES[key] = AwesomeAPIRateSource(timeout=timeout, store=store)
+    return _LIVE_SOURCES[key]
+
+
+def rates_for_dates(dates: Union[pd.Series, pd.DatetimeIndex], source: Optional[RateSource] = None) -> pd.Series:
+    """
+    Associa a cada data a cotação vigente (última cotação conhecida até a data).
+
+    Args:
+        dates: Datas a consultar (podem se repetir e estar fora de ordem)
+        source: Fonte de cotações (padrão: `default_rate_source()`)
+
+    Returns:
+        Série de cotações alinhada a `dates` (mesmo índice, se for Series)
+    """
+    source = source if source is not None else default_rate_source()
+    keys = pd.Series(pd.to_datetime(dates)).dt.normalize()
+    index = dates.index if isinstance(dates, pd.Series) else keys.index
+    valid = keys.dropna()
+    if valid.empty:
+        return pd.Series(float("nan"), index=index, name="rate")
+
+    rates = source.get_rates(valid.min(), valid.max())
+    if rates.empty:
+        return pd.Series(float("nan"), index=index, name="rate")
+    table = rates.rename("rate").rename_axis("date").reset_index().sort_values("date")
+
+    lookup = pd.DataFrame({"date": keys.to_numpy(), "_pos": range(len(keys))}).dropna(subset=["date"])
+    joined = pd.merge_asof(lookup.sort_values("date"), table, on="date", direction="backward")
+    # Datas anteriores à primeira cotação usam a primeira disponível
+    joined["rate"] = joined["rate"].fillna(table["rate"].iloc[0])
+    result = pd.Series(float("nan"), index=range(len(keys)), name="rate")
+    result.loc[joined["_pos"].to_numpy()] = joined["rate"].to_numpy()
+    result.index = index
+    return result
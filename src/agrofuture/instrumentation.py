@@ -0,0 +1,293 @@
+"""
+Instrumentação leve das etapas do pipeline.
+
+Cada etapa é envolvida em um `span` (context manager) ou decorada com
+`traced`, que registra tempo de parede, tempo de CPU, RSS (início, pico e
+variação) e o número de linhas/colunas produzidas. Spans podem ser
+aninhados; o trace completo é gravado em JSON com `write_trace`.
+
+Desativado (padrão nas bibliotecas), `span` devolve um objeto nulo
+compartilhado e o custo é o de uma chamada de função. Ative com
+`enable_tracing()` ou com a variável de ambiente AGROFUTURE_TRACE=1.
+"""
+
+import functools
+import json
+import os
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+try:
+    import psutil
+except ImportError:  # RSS fica ausente do trace, o resto funciona
+    psutil = None
+
+_MB = 2 ** 20
+
+
+class _NullSpan:
+    """Span usado quando a instrumentação está desativada"""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def set(self, **attrs) -> None:
+        pass
+
+    def record_shape(self, obj: Any) -> None:
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class Span:
+    """Um trecho medido do pipeline (criado por `span`, não diretamente)"""
+
+    def __init__(self, tracer: "Tracer", name: str, attrs: Dict[str, Any]):
+        self.tracer = tracer
+        self.name = name
+        self.attrs = dict(attrs)
+        self.parent: Optional[int] = None
+        self.id = -1
+        self.depth = 0
+        self.peak_rss = 0
+
+    def __enter__(self):
+        self.tracer._open(self)
+        self._rss_start = self.tracer._rss()
+        self.peak_rss = self._rss_start
+        self._wall = time.perf_counter()
+        self._cpu = time.process_time()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        wall = time.perf_counter() - self._wall
+        cpu = time.process_time() - self._cpu
+        rss_end = self.tracer._rss()
+        self.peak_rss = max(self.peak_rss, rss_end)
+        registro = {
+            "id": self.id,
+            "parent": self.parent,
+            "depth": self.depth,
+            "name": self.name,
+            "start_s": round(self._wall - self.tracer.started, 4),
+            "wall_s": round(wall, 4),
+            "cpu_s": round(cpu, 4),
+            "status": "ok" if exc_type is None else f"error: {exc_type.__name__}",
+        }
+        if self._rss_start:
+            registro.update({
+                "rss_start_mb": round(self._rss_start / _MB, 1),
+                "peak_rss_mb": round(self.peak_rss / _MB, 1),
+                "rss_delta_mb": round((rss_end - self._rss_start) / _MB, 1),
+            })
+        registro.update(self.attrs)
+        self.tracer._close(self, registro)
+        return False
+
+    def set(self, **attrs) -> None:
+        """Acrescenta atributos ao registro do span (ex.: rows, cols, n_folds)"""
+        self.attrs.update(attrs)
+
+    def record_shape(self, obj: Any) -> None:
+        """Registra linhas/colunas de um DataFrame, array ou tupla (primeiro elemento)"""
+        self.attrs.update(_shape_of(obj))
+
+
+class Tracer:
+    """
+    Coleta os spans de uma execução
+
+    Args:
+        sample_interval: Intervalo (s) de amostragem do RSS para o pico por span
+    """
+
+    def __init__(self, sample_interval: float = 0.01):
+        self.started = time.perf_counter()
+        self.started_at = datetime.now()
+        self.spans: List[Dict[str, Any]] = []
+        self.sample_interval = sample_interval
+        self._local = threading.local()
+        self._open_spans: List[Span] = []
+        self._lock = threading.Lock()
+        self._next_id = 0
+        self._process = psutil.Process() if psutil is not None else None
+        self._stop = threading.Event()
+        self._sampler: Optional[threading.Thread] = None
+
+    def _stack(self) -> List[Span]:
+        if not hasattr(self._local, "stack"):
+            self._local.stack = []
+        return self._local.stack
+
+    def _rss(self) -> int:
+        return self._process.memory_info().rss if self._process is not None else 0
+
+    def _open(self, span: Span) -> None:
+        stack = self._stack()
+        with self._lock:
+            span.id = self._next_id
+            self._next_id += 1
+            self._open_spans.append(span)
+        span.parent = stack[-1].id if stack else None
+        span.depth = len(stack)
+        stack.append(span)
+        if self._process is not None and self._sampler is None:
+            self._sampler = threading.Thread(target=self._sample, daemon=True, name="agrofuture-trace")
+            self._sampler.start()
+
+    def _close(self, span: Span, registro: Dict[str, Any]) -> None:
+        stack = self._stack()
+        if stack and stack[-1] is span:
+            stack.pop()
+        with self._lock:
+            self._open_spans.remove(span)
+            self.spans.append(registro)
+
+    def _sample(self) -> None:
+        while not self._stop.wait(self.sample_interval):
+            with self._lock:
+                abertos = list(self._open_spans)
+            if not abertos:
+                continue
+            rss = self._rss()
+            for span in abertos:
+                if rss > span.peak_rss:
+                    span.peak_rss = rss
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "started_at": self.started_at.isoformat(timespec="seconds"),
+            "total_s": round(time.perf_counter() - self.started, 4),
+            "pid": os.getpid(),
+            "spans": sorted(self.spans, key=lambda s: s["id"]),
+        }
+
+
+_TRACER: Optional[Tracer] = Tracer() if os.environ.get("AGROFUTURE_TRACE", "0") == "1" else None
+
+
+def enable_tracing(sample_interval: float = 0.01) -> Tracer:
+    """Ativa a instrumentação (reinicia o trace atual)"""
+    global _TRACER
+    if _TRACER is not None:
+        _TRACER.stop()
+    _TRACER = Tracer(sample_interval)
+    return _TRACER
+
+
+def disable_tracing() -> Optional[Tracer]:
+    """Desativa a instrumentação e devolve o trace coletado"""
+    global _TRACER
+    tracer, _TRACER = _TRACER, None
+    if tracer is not None:
+        tracer.stop()
+    return tracer
+
+
+def peak_rss_mb() -> Optional[float]:
+    """
+    Pico de memória residente do processo desde o início, em MB
+
+    Independe da instrumentação (vem do kernel via `resource`); sem
+    `resource` (Windows) usa o RSS atual do psutil.
+    """
+    try:
+        import resource
+        import sys
+
+        pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux informa em KB, macOS em bytes
+        return round(pico / (_MB if sys.platform == "darwin" else 1024), 1)
+    except ImportError:
+        if psutil is None:
+            return None
+        return round(psutil.Process().memory_info().rss / _MB, 1)
+
+
+def tracing_enabled() -> bool:
+    return _TRACER is not None
+
+
+def get_tracer() -> Optional[Tracer]:
+    return _TRACER
+
+
+def span(name: str, **attrs):
+    """
+    Mede o bloco `with span("etapa"):` (objeto nulo quando desativado)
+
+    Exemplo:
+        with span("create_features") as s:
+            df = create_features(df)
+            s.record_shape(df)
+    """
+    if _TRACER is None:
+        return _NULL_SPAN
+    return Span(_TRACER, name, attrs)
+
+
+def traced(name: Optional[str] = None, shape: bool = True) -> Callable:
+    """Decorador: mede cada chamada da função (e o formato do retorno, se `shape`)"""
+    def decorator(fn: Callable) -> Callable:
+        nome = name or fn.__name__
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if _TRACER is None:
+                return fn(*args, **kwargs)
+            with Span(_TRACER, nome, {}) as s:
+                resultado = fn(*args, **kwargs)
+                if shape:
+                    s.record_shape(resultado)
+                return resultado
+        return wrapper
+    return decorator
+
+
+def write_trace(path: Path, tracer: Optional[Tracer] = None, **meta) -> Optional[Path]:
+    """Grava o trace em JSON (não faz nada se a instrumentação estiver desativada)"""
+    tracer = tracer or _TRACER
+    if tracer is None:
+        return None
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    payload = {**meta, **tracer.to_dict()}
+    path.write_text(json.dumps(payload, indent=2, ensure_ascii=False, default=str), encoding="utf-8")
+    return path
+
+
+def format_trace(tracer: Optional[Tracer] = None, max_depth: int = 1) -> str:
+    """Tabela legível dos spans até `max_depth`, na ordem de abertura (pais antes dos filhos)"""
+    tracer = tracer or _TRACER
+    if tracer is None:
+        return ""
+    linhas = [f"{'Etapa':<40}{'Tempo (s)':>11}{'CPU (s)':>10}{'Pico RSS (MB)':>15}{'Linhas':>10}"]
+    for registro in sorted(tracer.spans, key=lambda s: s["id"]):
+        if registro["depth"] > max_depth:
+            continue
+        nome = "  " * registro["depth"] + registro["name"]
+        linhas.append(f"{nome:<40}{registro['wall_s']:>11.3f}{registro['cpu_s']:>10.3f}"
+                      f"{registro.get('peak_rss_mb', float('nan')):>15.1f}{registro.get('rows', ''):>10}")
+    return "\n".join(linhas)
+
+
+def _shape_of(obj: Any) -> Dict[str, int]:
+    if isinstance(obj, tuple) and obj:
+        obj = obj[0]
+    forma = getattr(obj, "shape", None)
+    if not isinstance(forma, tuple) or not forma:
+        return {}
+    return {"rows": int(forma[0]), "cols": int(forma[1]) if len(forma) > 1 else 1}
@@ -0,0 +1,147 @@
+"""
+Índice em memória da tabela de mercado.
+
+A tabela de mercado (dias × produtos × cidades) é pequena perto do histórico
+de transações; indexá-la uma vez pelas chaves do join permite juntar lotes de
+transações por busca de posições, sem um `pd.merge` completo por lote.
+
+Dois modos de junção:
+
+- exato (padrão): cotação do mesmo dia, produto e origem; o resultado é o
+  mesmo do `pd.merge` original de `merge_data` (colunas, ordem e dtypes);
+- as-of: última cotação conhecida até a data da transação para o mesmo
+  produto e origem (fins de semana, feriados, atrasos do feed), limitada
+  por `max_staleness`.
+
+O índice ordenado por (produto, cidade, estado, data) é montado uma vez no
+construtor; cada junção as-of custa O(n log m) para n transações e m cotações.
+"""
+
+from typing import Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from agrofuture.schema import JOIN_KEYS
+
+MARKET_KEYS = ("date",) + JOIN_KEYS
+
+Staleness = Optional[Union[str, pd.Timedelta]]
+
+
+class MarketIndex:
+    """
+    Mercado indexado por (date, product, origin_city, origin_state)
+
+    Args:
+        mercado: Tabela de mercado já preparada (`prepare_market`)
+    """
+
+    def __init__(self, mercado: pd.DataFrame):
+        self.mercado = mercado.reset_index(drop=True)
+        self.values = self.mercado.drop(columns=list(MARKET_KEYS))
+        # Dicionário de cada chave; o grupo (produto, cidade, estado) vira um
+        # único inteiro em base mista sobre os códigos
+        self._dicionarios = {k: _dictionary(self.mercado[k]) for k in JOIN_KEYS}
+        self._bases = [len(d) + 2 for d in self._dicionarios.values()]
+        if np.prod(np.array(self._bases, dtype=float)) >= 2 ** 62:
+            raise ValueError("Cardinalidade das chaves do mercado grande demais para o índice")
+        grupos = self._group_keys(self.mercado)
+        datas = _date_array(self.mercado["date"])
+
+        # Índice ordenado: grupo e posição da data
+        valido = ~np.isnat(datas)
+        self._grupos, grupo = np.unique(grupos[valido], return_inverse=True)
+        self._datas = np.unique(datas[valido])
+        self._passo = len(self._datas) + 1
+        chave = grupo.astype(np.int64) * self._passo + np.searchsorted(self._datas, datas[valido]) + 1
+        ordem = np.argsort(chave, kind="stable")
+        self._chaves_ordenadas = chave[ordem]
+        self._linhas_ordenadas = np.flatnonzero(valido)[ordem]
+        self._datas_ordenadas = datas[valido][ordem]
+        # Cotações duplicadas (ou sem data) multiplicam/casam linhas no merge
+        # exato; nesse caso o join exato usa o próprio merge
+        self.unique = bool(valido.all()) and not (np.diff(self._chaves_ordenadas) == 0).any()
+
+    def __len__(self) -> int:
+        return len(self.mercado)
+
+    def positions(self, transacoes: pd.DataFrame, asof: bool = False,
+                  max_staleness: Staleness = None) -> np.ndarray:
+        """
+        Linha do mercado de cada transação (-1 quando não há cotação)
+
+        No modo exato pressupõe chaves únicas (`unique`); `join` trata o caso geral.
+
+        Args:
+            asof: Usa a última cotação até a data da transação
+            max_staleness: Idade máxima da cotação no modo as-of (None: sem limite)
+        """
+        datas = _date_array(transacoes["date"])
+        if not asof:
+            # Exato = as-of com idade zero (as chaves são únicas; ver `unique`)
+            max_staleness = pd.Timedelta(0)
+
+        chaves = self._group_keys(transacoes)
+        grupo = np.searchsorted(self._grupos, chaves)
+        achado = grupo < len(self._grupos)
+        achado[achado] = self._grupos[grupo[achado]] == chaves[achado]
+        grupo = np.where(achado, grupo, -1).astype(np.int64)
+        # Quantas datas do mercado são <= data da transação (0: nenhuma ou NaT)
+        rank = np.where(np.isnat(datas), 0, np.searchsorted(self._datas, datas, side="right"))
+        base = grupo * self._passo
+        candidato = np.searchsorted(self._chaves_ordenadas, base + rank, side="right") - 1
+        candidato_seguro = np.maximum(candidato, 0)
+        valido = (grupo >= 0) & (rank > 0) & (candidato >= 0)
+        valido &= self._chaves_ordenadas[candidato_seguro] > base
+        if max_staleness is not None and len(valido):
+            idade = datas - self._datas_ordenadas[candidato_seguro]
+            valido &= idade <= pd.Timedelta(max_staleness).to_timedelta64()
+        return np.where(valido, self._linhas_ordenadas[candidato_seguro], -1)
+
+    def join(self, transacoes: pd.DataFrame, asof: bool = False, max_staleness: Staleness = None,
+             suffixes: Tuple[str, str] = ("_transacoes", "_mercado")) -> pd.DataFrame:
+        """Left join das transações com o mercado (exato: equivalente ao merge de `merge_data`)"""
+        if not asof and not self.unique:
+            return pd.merge(transacoes, self.mercado, on=list(MARKET_KEYS), how="left", suffixes=suffixes)
+
+        direita = self.values.reindex(self.positions(transacoes, asof, max_staleness)).reset_index(drop=True)
+        esquerda = transacoes.reset_index(drop=True)
+        comuns = [c for c in direita.columns if c in esquerda.columns]
+        esquerda = esquerda.rename(columns={c: c + suffixes[0] for c in comuns})
+        direita = direita.rename(columns={c: c + suffixes[1] for c in comuns})
+        return pd.concat([esquerda, direita], axis=1)
+
+    def _group_keys(self, df: pd.DataFrame) -> np.ndarray:
+        chave = np.zeros(len(df), dtype=np.int64)
+        for (coluna, dicionario), base in zip(self._dicionarios.items(), self._bases):
+            chave = chave * base + (_codes(df[coluna], dicionario) + 2)
+        return chave
+
+
+def _dictionary(serie: pd.Series) -> pd.Index:
+    if isinstance(serie.dtype, pd.CategoricalDtype):
+        return serie.cat.categories
+    return pd.Index(serie.dropna().unique())
+
+
+def _codes(serie: pd.Series, dicionario: pd.Index) -> np.ndarray:
+    """
+    Códigos de `serie` no dicionário do mercado: -1 para NaN (casa com NaN,
+    como no merge) e -2 para valores que o mercado não tem
+    """
+    if isinstance(serie.dtype, pd.CategoricalDtype):
+        codes = serie.cat.codes.to_numpy().astype(np.int64)
+        if serie.cat.categories.equals(dicionario):
+            return codes
+        mapa = dicionario.get_indexer(serie.cat.categories)
+        return np.append(np.where(mapa < 0, -2, mapa), -1)[codes]
+    codes = dicionario.get_indexer(serie).astype(np.int64)
+    codes[(codes < 0) & serie.notna().to_numpy()] = -2
+    return codes
+
+
+def _date_array(serie: pd.Series) -> np.ndarray:
+    if not pd.api.types.is_datetime64_any_dtype(serie.dtype):
+        serie = pd.to_datetime(serie)
+    return serie.to_numpy(dtype="datetime64[ns]")
@@ -1,45 +1,109 @@
 from sklearn.model_selection import TimeSeriesSplit
-from sklearn.metrics import precision_recall_curve, precision_score, recall_score, f1_score
+from sklearn.metrics import precision_score, recall_score, f1_score
 from sklearn.multioutput import MultiOutputClassifier
 import xgboost as xgb
 import pandas as pd
 import numpy as np
 import json
-from typing import List, Tuple, Dict, Any
+import time
+from typing import List, Optional, Tuple, Dict, Any
 from agrofuture.feature_engineer import create_features, prepare_target
+from agrofuture.instrumentation import span, traced
+from agrofuture.multilabel import NativeMultiLabelXGB
+from agrofuture.parallel import ThreadBudget, run_folds, split_thread_budget
 from tqdm import tqdm
 
-def calculate_dynamic_thresholds(model, X: pd.DataFrame, y: np.ndarray, company_classes: List[str]) -> Dict[str, float]:
+XGB_PARAMS: Dict[str, Any] = dict(
+    objective="binary:logistic",
+    n_estimators=200,         # Increased for more boosting rounds
+    max_depth=6,              # Slightly deeper trees
+    learning_rate=0.01,       # Lower learning rate for finer updates
+    subsample=0.9,            # More data per tree
+    colsample_bytree=0.9,     # More features per tree
+    reg_alpha=0.1,            # L1 regularization
+    reg_lambda=1.0,           # L2 regularization
+    random_state=242,
+    eval_metric='logloss',
+    tree_method="hist"
+)
+
+# "multioutput": um XGBClassifier por empresa (MultiOutputClassifier)
+# "native": um único modelo multi-label do XGBoost (folhas vetoriais)
+# "native_per_target": modelo único, uma árvore por empresa com quantis compartilhados
+BACKENDS = ("multioutput", "native", "native_per_target")
+# multi_strategy do XGBoost usado por cada backend nativo
+MULTI_STRATEGY = {"native": "multi_output_tree", "native_per_target": "one_output_per_tree"}
+
+def build_model(backend: str = "multioutput", company_jobs: int = -1, **overrides):
     """
-    Calcula thresholds ótimos para cada empresa usando a curva Precision-Recall
-    
+    Cria o classificador multi-label do backend escolhido
+
+    Todos os backends expõem `fit`, `predict` e `predict_proba` (lista de
+    arrays (n, 2), um por empresa).
+
     Args:
-        model: Modelo treinado
-        X: Features do conjunto de treino
-        y: Targets do conjunto de treino
-        company_classes: Lista de empresas
-    
+        company_jobs: Empresas treinadas em paralelo (apenas "multioutput")
+        **overrides: Parâmetros do XGBoost (ex.: n_jobs = threads por booster)
+    """
+    params = {**XGB_PARAMS, **overrides}
+    if backend == "multioutput":
+        return MultiOutputClassifier(xgb.XGBClassifier(**params), n_jobs=company_jobs)
+    if backend in MULTI_STRATEGY:
+        return NativeMultiLabelXGB(multi_strategy=MULTI_STRATEGY[backend], **params)
+    raise ValueError(f"Backend desconhecido: {backend} (use {BACKENDS})")
+
+def best_f1_thresholds(y_true: np.ndarray, y_score: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Threshold que maximiza o F1 de cada empresa, todas de uma vez
+
+    Equivale a percorrer `precision_recall_curve` empresa a empresa: as
+    probabilidades de cada coluna são ordenadas de forma decrescente e os
+    verdadeiros/falsos positivos acumulados dão precisão e recall para cada
+    threshold distinto. Empates no F1 ficam com o menor threshold; empresas
+    sem positivos recebem 0.5.
+
+    Args:
+        y_true: Rótulos (n_amostras, n_empresas)
+        y_score: Probabilidades positivas (n_amostras, n_empresas)
+
     Returns:
-        Dicionário com thresholds para cada empresa
+        (thresholds, melhor F1) por empresa
     """
-    thresholds = {}
-    y_proba = model.predict_proba(X)
-    
-    for i, company in enumerate(company_classes):
-        # Obter probabilidades para a classe positiva
-        pos_probs = y_proba[i][:, 1]
-        
-        # Calcular curva Precision-Recall
-        precision, recall, thresh_vals = precision_recall_curve(y[:, i], pos_probs)
-        
-        # Calcular F1-score para cada threshold
-        f1_scores = (2 * precision * recall) / (precision + recall + 1e-8)
-        
-        # Encontrar threshold que maximiza o F1-score
-        best_idx = np.argmax(f1_scores)
-        thresholds[company] = thresh_vals[best_idx] if best_idx < len(thresh_vals) else 0.5
-    
-    return thresholds
+    y_true = np.asarray(y_true, dtype=bool)
+    y_score = np.asarray(y_score, dtype=float)
+    n, n_empresas = y_score.shape
+    if n == 0:
+        return np.full(n_empresas, 0.5), np.zeros(n_empresas)
+
+    ordem = np.argsort(-y_score, axis=0, kind="stable")
+    scores = np.take_along_axis(y_score, ordem, axis=0)
+    tp = np.cumsum(np.take_along_axis(y_true, ordem, axis=0), axis=0)
+    fp = np.arange(1, n + 1)[:, None] - tp
+    positivos = tp[-1]
+
+    precision = tp / (tp + fp)
+    recall = tp / np.maximum(positivos, 1)
+    f1 = (2 * precision * recall) / (precision + recall + 1e-8)
+
+    # Só o último elemento de cada bloco de scores iguais é um threshold válido
+    fim_de_bloco = np.ones_like(scores, dtype=bool)
+    fim_de_bloco[:-1] = scores[:-1] != scores[1:]
+    f1 = np.where(fim_de_bloco, f1, -1.0)
+
+    # Último máximo na ordem decrescente = menor threshold entre os empates
+    best = n - 1 - np.argmax(f1[::-1], axis=0)
+    colunas = np.arange(n_empresas)
+    thresholds = scores[best, colunas]
+    best_f1 = f1[best, colunas]
+
+    sem_positivos = positivos == 0
+    thresholds[sem_positivos] = 0.5
+    best_f1[sem_positivos] = 0.0
+    return thresholds, best_f1
+
+def proba_matrix(y_proba: List[np.ndarray]) -> np.ndarray:
+    """Converte a saída de predict_proba (lista de (n, 2)) em uma matriz (n, n_empresas)"""
+    return np.column_stack([p[:, 1] for p in y_proba])
 
 def temporal_train_test_split(X: pd.DataFrame, y: np.ndarray, test_size: float = 0.2):
     """Divisão temporal mantendo integridade das datas"""
@@ -58,16 +122,68 @@ def temporal_train_test_split(X: pd.DataFrame, y: np.ndarray, test_size: float =
 
     return X_train, y_train, X_test, y_test
 
-def train_and_validate(df: pd.DataFrame, test_size: float = 0.2, n_splits: int = 5) -> Tuple[Any, Dict , Dict[str, float]]:
+def _run_fold(fold: int, X_train_fold: pd.DataFrame, y_train_fold: np.ndarray,
+              X_val_fold: pd.DataFrame, y_val_fold: np.ndarray, backend: str,
+              budget: ThreadBudget, company_classes: List[str],
+              params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Treina e avalia um fold (executado em um worker do pool de processos)"""
+    model = build_model(backend, company_jobs=budget.companies, n_jobs=budget.xgb_threads, **(params or {}))
+
+    inicio = time.perf_counter()
+    model.fit(X_train_fold, y_train_fold)
+    fit_s = time.perf_counter() - inicio
+
+    # Avaliar modelo
+    inicio = time.perf_counter()
+    y_pred = model.predict(X_val_fold)
+    y_proba = model.predict_proba(X_val_fold)
+    predict_s = time.perf_counter() - inicio
+
+    # Calcular métricas
+    results = {
+        "fold": fold,
+        "f1_score": f1_score(y_val_fold, y_pred, average='micro'),
+        "precision": precision_score(y_val_fold, y_pred, average='micro'),
+        "recall": recall_score(y_val_fold, y_pred, average='micro'),
+        "thresholds": {},
+        "timings": {"fit_s": round(fit_s, 3), "predict_s": round(predict_s, 3)}
+    }
+    
+    # Calcular thresholds para este fold
+    val_proba = proba_matrix(y_proba)
+    thresholds, best_f1 = best_f1_thresholds(y_val_fold, val_proba)
+    for company, value, f1 in zip(company_classes, thresholds, best_f1):
+        results["thresholds"][company] = {"value": float(value), "f1": float(f1)}
+
+    # Probabilidades out-of-fold (removidas do relatório pelo processo principal)
+    results["val_proba"] = val_proba.astype(np.float32)
+    
+    return results
+
+@traced(shape=False)
+def train_and_validate(df: pd.DataFrame, test_size: float = 0.2, n_splits: int = 5,
+                       df_features: Optional[pd.DataFrame] = None,
+                       backend: str = "multioutput", n_threads: Optional[int] = None,
+                       fold_workers: Optional[int] = None,
+                       params: Optional[Dict[str, Any]] = None) -> Tuple[Any, Dict , Dict[str, float]]:
     """
     Treina e valida modelo, retornando thresholds dinâmicos
+
+    Args:
+        df_features: Matriz de features já calculada (ex.: do feature store);
+            quando omitida, é criada a partir de `df`
+        backend: Backend de treino (ver BACKENDS)
+        n_threads: Orçamento total de threads (None = núcleos disponíveis)
+        fold_workers: Força o número de folds executados em paralelo
+        params: Parâmetros do XGBoost que substituem XGB_PARAMS (ex.: `load_tuned_params`)
     
     Retorna:
         tuple: (modelo, relatórios de validação, dicionário de thresholds)
     """
     # 1. Criação de features
-    print("Criando features...")
-    df_features = create_features(df)
+    if df_features is None:
+        print("Criando features...")
+        df_features = create_features(df)
     
     # 2. Preparar target multi-label
     print("Preparando target...")
@@ -78,93 +194,65 @@ def train_and_validate(df: pd.DataFrame, test_size: float = 0.2, n_splits: int =
     
     # 4. Divisão temporal
     print("Dividindo dados temporalmente...")
-    X_train, y_train, X_test, y_test = temporal_train_test_split(X, y, test_size)  # type: ignore
+    with span("temporal_split"):
+        X_train, y_train, X_test, y_test = temporal_train_test_split(X, y, test_size)  # type: ignore
   
     # 5. Preparar dados
     X_train_no_date = X_train.drop(columns=['date'])
     X_test_no_date = X_test.drop(columns=['date'])
     
-    # 6. Modelo Multi-label
-    model = MultiOutputClassifier(
-        xgb.XGBClassifier(
-            objective="binary:logistic",
-            n_estimators=200,         # Increased for more boosting rounds
-            max_depth=6,              # Slightly deeper trees
-            learning_rate=0.01,       # Lower learning rate for finer updates
-            subsample=0.9,            # More data per tree
-            colsample_bytree=0.9,     # More features per tree
-            reg_alpha=0.1,            # L1 regularization
-            reg_lambda=1.0,           # L2 regularization
-            random_state=242,
-            eval_metric='logloss',
-            tree_method="hist"
-        ),
-        n_jobs=-1
-    )
+    # 6. Orçamento de threads: folds simultâneos x empresas x threads do XGBoost
+    budget = split_thread_budget(n_threads, n_splits, len(company_classes),
+                                 per_company_models=(backend == "multioutput"),
+                                 fold_workers=fold_workers)
+    print(f"Threads: {budget.folds} fold(s) x {budget.companies} empresa(s) x {budget.xgb_threads} thread(s) XGBoost")
 
-    # 7. Validacao cruzada temporal
+    # 7. Validacao cruzada temporal (folds em paralelo)
     print("Iniciando validação cruzada temporal...")
     tscv = TimeSeriesSplit(n_splits=n_splits)
-    fold_reports = []
-
-    for fold, (train_idx, val_idx) in enumerate(
-        tqdm(tscv.split(X_train_no_date), total=n_splits, desc="\n--- Cross-validation ---"), 1):
-        
-
-        X_train_fold, X_val_fold = X_train_no_date.iloc[train_idx], X_train_no_date.iloc[val_idx]
-        y_train_fold, y_val_fold = y_train[train_idx], y_train[val_idx]
-
-        model.fit(X_train_fold, y_train_fold)
-
-        # Avaliar modelo
-        y_pred = model.predict(X_val_fold)
-        y_proba = model.predict_proba(X_val_fold)
-
-        # Calcular métricas
-        results = {
-            "fold": fold,
-            "f1_score": f1_score(y_val_fold, y_pred, average='micro'),
-            "precision": precision_score(y_val_fold, y_pred, average='micro'),
-            "recall": recall_score(y_val_fold, y_pred, average='micro'),
-            "thresholds": {}
-        }
-        
-        # Calcular thresholds para este fold
-        for i, company in enumerate(company_classes):
-            # Calcular curva Precision-Recall
-            precision, recall, thresh_vals = precision_recall_curve(
-                y_val_fold[:, i], 
-                y_proba[i][:, 1]
-            )
-            
-            # Calcular F1-score para cada threshold
-            f1_scores = (2 * precision * recall) / (precision + recall + 1e-8)
-            best_idx = np.argmax(f1_scores)
-            
-            # Armazenar melhor threshold para esta empresa
-            results["thresholds"][company] = {
-                "value": thresh_vals[best_idx] if best_idx < len(thresh_vals) else 0.5,
-                "f1": f1_scores[best_idx]
-            }
-        
-        fold_reports.append(results)
+    splits = list(tscv.split(X_train_no_date))
+    fold_args = (
+        (fold,
+         X_train_no_date.iloc[train_idx], y_train[train_idx],
+         X_train_no_date.iloc[val_idx], y_train[val_idx],
+         backend, budget, list(company_classes), params)
+        for fold, (train_idx, val_idx) in enumerate(splits, 1)
+    )
+    with span("cross_validation", rows=len(X_train_no_date), cols=X_train_no_date.shape[1],
+              n_folds=n_splits, fold_workers=budget.folds) as s:
+        fold_reports = run_folds(
+            _run_fold, fold_args, budget.folds,
+            progress=lambda it: tqdm(it, total=n_splits, desc="\n--- Cross-validation ---")
+        )
+        # Probabilidades out-of-fold: dias x empresas (NaN nos dias nunca validados)
+        oof_proba = np.full(y_train.shape, np.nan, dtype=np.float32)
+        for results, (_, val_idx) in zip(fold_reports, splits):
+            oof_proba[val_idx] = results.pop("val_proba")
+            timings = results["timings"]
+            print(f"Fold {results['fold']}: treino {timings['fit_s']:.2f}s | "
+                  f"validação {timings['predict_s']:.2f}s | total {timings['total_s']:.2f}s")
+        s.set(folds=[dict(fold=r["fold"], **r["timings"]) for r in fold_reports])
 
     # 8. Treinar modelo final com todos os dados de treino
     print("\nTreinando modelo final com todo o conjunto de treino...")
-    model.fit(X_train_no_date, y_train)
+    final_budget = split_thread_budget(n_threads, 1, len(company_classes),
+                                       per_company_models=(backend == "multioutput"))
+    model = build_model(backend, company_jobs=final_budget.companies, n_jobs=final_budget.xgb_threads,
+                        **(params or {}))
+    with span("final_fit", rows=len(X_train_no_date), cols=X_train_no_date.shape[1], backend=backend):
+        model.fit(X_train_no_date, y_train)
     
-    # 9. Calcular thresholds finais usando todo o conjunto de treino
-    print("Calculando thresholds dinâmicos finais...")
-    final_thresholds = calculate_dynamic_thresholds(
-        model, 
-        X_train_no_date, 
-        y_train, 
-        list(company_classes)
-    )
+    # 9. Thresholds finais a partir das previsões out-of-fold (sem reusar o treino)
+    print("Calculando thresholds dinâmicos finais (out-of-fold)...")
+    with span("thresholds"):
+        validados = ~np.isnan(oof_proba).any(axis=1)
+        oof_thresholds, oof_f1 = best_f1_thresholds(y_train[validados], oof_proba[validados])
+    final_thresholds = dict(zip(company_classes, oof_thresholds.tolist()))
     
     # 10. Avaliar no conjunto de teste
     print("\nAvaliando no conjunto de teste...")
-    y_test_pred = model.predict(X_test_no_date)
+    with span("test_evaluation", rows=len(X_test_no_date)):
+        y_test_pred = model.predict(X_test_no_date)
     test_report = {
         "f1_score": f1_score(y_test, y_test_pred, average='micro'),
         "precision": precision_score(y_test, y_test_pred, average='micro'),
@@ -174,40 +262,63 @@ def train_and_validate(df: pd.DataFrame, test_size: float = 0.2, n_splits: int =
     # Adicionar resultados de teste ao relatório final
     final_report = {
         "model": model.__class__.__name__,
+        "backend": backend,
         "target_names": company_classes,
         "feature_names": list(X_train_no_date.columns),
+        "xgb_params": {**XGB_PARAMS, **(params or {})},
         "cross_validation": fold_reports,
         "test_performance": test_report,
-        "thresholds": final_thresholds
+        "thresholds": final_thresholds,
+        "oof_f1": dict(zip(company_classes, oof_f1.tolist())),
+        "oof_days": int(validados.sum())
     }
     
     # Calcular importância de features
     print("Calculando importância de features...")
-    feature_importances = get_feature_importances(
-        model, 
-        company_classes, 
-        list(X_train_no_date.columns)
-    )
+    with span("feature_importances"):
+        feature_importances = get_feature_importances(
+            model, 
+            company_classes, 
+            list(X_train_no_date.columns)
+        )
     final_report["feature_importances"] = feature_importances.to_dict()
 
     return model, final_report, final_thresholds
 
 
 def get_feature_importances(model, company_classes, feature_names):
-    """Calcula importância média das features entre todos os classificadores"""
-    importance_df = pd.DataFrame(index=feature_names)
-    
-    for i, company in enumerate(company_classes):
-        booster = model.estimators_[i].get_booster()
-        imp = booster.get_score(importance_type='gain')
-        
-        # Preencher importâncias (features não usadas recebem 0)
-        for f in feature_names:
-            importance_df.loc[f, company] = imp.get(f, 0)
-    
-    # Calcular estatísticas
-    importance_df['mean_importance'] = importance_df.mean(axis=1)
-    importance_df['std_importance'] = importance_df.std(axis=1)
-    importance_df['max_importance'] = importance_df.max(axis=1)
-    
-    return importance_df.sort_values('mean_importance', ascending=False)
\ No newline at end of file
+    """
+    Calcula importância média das features entre todos os classificadores
+
+    O gain de cada empresa vira uma coluna de uma matriz features × empresas
+    e as estatísticas são reduções sobre essa matriz.
+    """
+    if hasattr(model, 'importances_by_target'):
+        # Modelo multi-label nativo: um único booster para todas as empresas
+        por_empresa = model.importances_by_target(feature_names).to_numpy(dtype=float)[:, :len(company_classes)]
+    else:
+        # Features não usadas recebem 0
+        por_empresa = np.column_stack([
+            pd.Series(model.estimators_[i].get_booster().get_score(importance_type='gain'), dtype=float)
+            .reindex(feature_names, fill_value=0.0).to_numpy()
+            for i in range(len(company_classes))
+        ])
+
+    # Estatísticas (como antes: o desvio inclui a coluna da média e o máximo inclui média e desvio)
+    media = por_empresa.mean(axis=1)
+    com_media = np.column_stack([por_empresa, media])
+    desvio = com_media.std(axis=1, ddof=1)
+    maximo = np.column_stack([com_media, desvio]).max(axis=1)
+
+    importance_df = pd.DataFrame(por_empresa, index=feature_names, columns=list(company_classes))
+    importance_df['mean_importance'] = media
+    importance_df['std_importance'] = desvio
+    importance_df['max_importance'] = maximo
+    return importance_df.sort_values('mean_importance', ascending=False)
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Entry point `agrofuture-train` (mesmos argumentos de `agrofuture train`)"""
+    import sys
+    from agrofuture.cli import main as cli_main
+
+    return cli_main(["train", *(sys.argv[1:] if argv is None else argv)])
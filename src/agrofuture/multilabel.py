@@ -0,0 +1,104 @@
+"""
+Classificador multi-label com suporte nativo do XGBoost.
+
+Em vez de um `XGBClassifier` independente por empresa (MultiOutputClassifier),
+treina um único modelo sobre o rótulo 2-D: os quantis do histograma são
+calculados uma vez para todo o X e, com `multi_strategy="multi_output_tree"`,
+cada árvore tem folhas vetoriais (uma saída por empresa).
+
+A interface imita a do MultiOutputClassifier usada no restante do projeto:
+`predict_proba` devolve uma lista com um array (n, 2) por empresa.
+"""
+
+from typing import List, Optional
+
+import numpy as np
+import pandas as pd
+import xgboost as xgb
+
+MULTI_STRATEGIES = ("multi_output_tree", "one_output_per_tree")
+
+
+class NativeMultiLabelXGB:
+    """
+    Adaptador de um único `XGBClassifier` multi-label com a interface do MultiOutputClassifier
+
+    Args:
+        multi_strategy: "multi_output_tree" (folhas vetoriais) ou
+            "one_output_per_tree" (uma árvore por empresa, mas com uma única
+            matriz de quantis compartilhada)
+        **params: Parâmetros repassados ao `xgb.XGBClassifier`
+    """
+
+    def __init__(self, multi_strategy: str = "multi_output_tree", **params):
+        if multi_strategy not in MULTI_STRATEGIES:
+            raise ValueError(f"multi_strategy inválida: {multi_strategy} (use {MULTI_STRATEGIES})")
+        self.multi_strategy = multi_strategy
+        self.params = params
+        self.estimator_: Optional[xgb.XGBClassifier] = None
+
+    def get_params(self, deep: bool = True) -> dict:
+        return {"multi_strategy": self.multi_strategy, **self.params}
+
+    def set_params(self, **params) -> "NativeMultiLabelXGB":
+        if "multi_strategy" in params:
+            self.multi_strategy = params.pop("multi_strategy")
+        self.params.update(params)
+        return self
+
+    def fit(self, X: pd.DataFrame, y: np.ndarray) -> "NativeMultiLabelXGB":
+        y = np.asarray(y)
+        if y.ndim != 2:
+            raise ValueError("y deve ser uma matriz (n_amostras, n_empresas)")
+        params = dict(self.params)
+        # Árvores multi-saída só existem no método hist
+        params["tree_method"] = "hist"
+        self.estimator_ = xgb.XGBClassifier(multi_strategy=self.multi_strategy, **params)
+        self.estimator_.fit(X, y)
+        self.n_outputs_ = y.shape[1]
+        if hasattr(self.estimator_, "feature_names_in_"):
+            self.feature_names_in_ = self.estimator_.feature_names_in_
+        return self
+
+    def predict_proba_matrix(self, X: pd.DataFrame) -> np.ndarray:
+        """Probabilidades positivas como matriz (n_amostras, n_empresas)"""
+        proba = self.estimator_.predict_proba(X)
+        return proba.reshape(len(proba), -1)
+
+    def predict_proba(self, X: pd.DataFrame) -> List[np.ndarray]:
+        """Lista (uma por empresa) de arrays (n_amostras, 2), como no MultiOutputClassifier"""
+        positivas = self.predict_proba_matrix(X)
+        return [np.column_stack([1 - positivas[:, i], positivas[:, i]]) for i in range(positivas.shape[1])]
+
+    def predict(self, X: pd.DataFrame) -> np.ndarray:
+        return (self.predict_proba_matrix(X) > 0.5).astype(int)
+
+    def get_booster(self) -> xgb.Booster:
+        return self.estimator_.get_booster()
+
+    def importances_by_target(self, feature_names: List[str]) -> pd.DataFrame:
+        """Importância (gain) das features por empresa (ver `booster_importances_by_target`)"""
+        return booster_importances_by_target(self.get_booster(), self.multi_strategy, self.n_outputs_, feature_names)
+
+
+def booster_importances_by_target(booster: xgb.Booster, multi_strategy: str, n_saidas: int,
+                                  feature_names: List[str]) -> pd.DataFrame:
+    """
+    Importância (gain) das features por empresa de um booster multi-label (features x empresas)
+
+    Com "one_output_per_tree" a árvore t pertence à empresa t % n_empresas,
+    então o gain médio é calculado por empresa. Árvores multi-saída não
+    expõem gain; nesse caso usa-se a contagem de splits ("weight"),
+    compartilhada por todas as empresas.
+    """
+    if multi_strategy == "multi_output_tree":
+        score = booster.get_score(importance_type="weight")
+        coluna = np.array([score.get(f, 0.0) for f in feature_names], dtype=float)
+        return pd.DataFrame(np.repeat(coluna[:, None], n_saidas, axis=1), index=feature_names)
+
+    arvores = booster.trees_to_dataframe()
+    splits = arvores[arvores["Feature"] != "Leaf"]
+    ganho = (splits.assign(alvo=splits["Tree"] % n_saidas)
+             .groupby(["Feature", "alvo"])["Gain"].mean()
+             .unstack(fill_value=0.0))
+    return ganho.reindex(index=feature_names, columns=range(n_saidas), fill_value=0.0)
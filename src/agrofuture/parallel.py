@@ -0,0 +1,98 @@
+"""
+Orçamento de threads e execução paralela dos folds da validação cruzada.
+
+Há três níveis de paralelismo no treino: folds simultâneos (processos),
+empresas treinadas em paralelo dentro de um fold (`n_jobs` do
+MultiOutputClassifier) e threads do próprio XGBoost (`n_jobs`/`nthread`).
+Sem coordenação cada nível usa todos os núcleos e a máquina fica
+sobrecarregada; aqui um orçamento total é dividido entre os três.
+"""
+
+import os
+import time
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Optional
+
+from joblib import Parallel, delayed
+
+
+class ThreadBudget(NamedTuple):
+    """Divisão do orçamento: folds simultâneos x empresas por fold x threads do XGBoost"""
+    folds: int
+    companies: int
+    xgb_threads: int
+
+    @property
+    def total(self) -> int:
+        return self.folds * self.companies * self.xgb_threads
+
+
+def available_threads() -> int:
+    """Núcleos disponíveis para este processo (respeita AGROFUTURE_THREADS e afinidade de CPU)"""
+    env = os.environ.get("AGROFUTURE_THREADS")
+    if env:
+        return max(1, int(env))
+    try:
+        return max(1, len(os.sched_getaffinity(0)))
+    except AttributeError:
+        return max(1, os.cpu_count() or 1)
+
+
+def split_thread_budget(total: Optional[int], n_folds: int, n_companies: int,
+                        per_company_models: bool = True, fold_workers: Optional[int] = None) -> ThreadBudget:
+    """
+    Divide `total` threads entre folds, empresas e XGBoost
+
+    Os folds ficam com a maior fatia (são independentes e não competem por
+    memória compartilhada); o restante vai para as empresas e, por fim, para
+    as threads de cada booster.
+
+    Args:
+        total: Orçamento total de threads (None = núcleos disponíveis)
+        n_folds: Número de folds a executar
+        n_companies: Número de empresas (modelos por fold no backend multioutput)
+        per_company_models: False para backends com um único booster por fold
+        fold_workers: Força o número de folds simultâneos
+    """
+    total = available_threads() if total is None else max(1, int(total))
+    folds = fold_workers if fold_workers else min(n_folds, total)
+    folds = max(1, min(folds, n_folds, total))
+    por_fold = max(1, total // folds)
+    companies = min(n_companies, por_fold) if per_company_models else 1
+    companies = max(1, companies)
+    xgb_threads = max(1, por_fold // companies)
+    return ThreadBudget(folds=folds, companies=companies, xgb_threads=xgb_threads)
+
+
+def run_folds(fold_fn: Callable[..., Dict[str, Any]], fold_args: Iterable[tuple], n_workers: int,
+              progress: Optional[Callable[[Iterable], Iterable]] = None) -> List[Dict[str, Any]]:
+    """
+    Executa `fold_fn(*args)` para cada fold, em um pool de processos quando n_workers > 1
+
+    Os resultados voltam na ordem dos folds, independentemente da ordem de
+    término, e cada um recebe o tempo de parede medido no worker.
+
+    Args:
+        fold_fn: Função de nível de módulo (precisa ser serializável)
+        fold_args: Argumentos de cada fold
+        n_workers: Folds simultâneos
+        progress: Envoltório opcional do iterador de resultados (ex.: tqdm)
+    """
+    fold_args = list(fold_args)
+    progress = progress or (lambda it: it)
+    if n_workers <= 1:
+        resultados = (_timed(fold_fn, args) for args in fold_args)
+        return list(progress(resultados))
+
+    # loky cria processos novos (sem fork do estado OpenMP do processo pai)
+    parallel = Parallel(n_jobs=n_workers, backend="loky", return_as="generator")
+    resultados = parallel(delayed(_timed)(fold_fn, args) for args in fold_args)
+    return list(progress(resultados))
+
+
+def _timed(fold_fn: Callable[..., Dict[str, Any]], args: tuple) -> Dict[str, Any]:
+    inicio = time.perf_counter()
+    resultado = fold_fn(*args)
+    resultado.setdefault("timings", {})
+    resultado["timings"]["total_s"] = round(time.perf_counter() - inicio, 3)
+    resultado["timings"]["worker_pid"] = os.getpid()
+    return resultado
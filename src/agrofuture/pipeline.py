@@ -0,0 +1,581 @@
+"""
+Fluxos completos de treino e de previsão.
+
+Usados pelos scripts (`scripts/run_pipeline.py`, `scripts/generate_predictions.py`)
+e pela linha de comando `agrofuture` (ver `agrofuture.cli`). Os caminhos de
+dados e saídas partem de um diretório base: o do repositório nos scripts e,
+na CLI, `--base-dir`, AGROFUTURE_HOME ou o diretório atual.
+"""
+
+import os
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from agrofuture.data_loader import load_data, market_join_from_env, merge_data
+from agrofuture.feature_store import FeatureStore, sync_feature_store
+from agrofuture.fx_rates import FX_DB_FILE, default_rate_source
+from agrofuture.instrumentation import enable_tracing, format_trace, peak_rss_mb, span, write_trace
+from agrofuture.schema import format_memory_report, memory_report
+
+TRANSACTIONS_FILE = "transações-desafio.xlsx"
+MARKET_FILE = "mercado-desafio.xlsx"
+
+
+class ProjectPaths(NamedTuple):
+    """Diretórios de dados e saídas a partir do diretório base do projeto"""
+    base_dir: Path
+
+    @property
+    def raw_data_dir(self) -> Path:
+        return self.base_dir / "data" / "raw"
+
+    @property
+    def processed_data_dir(self) -> Path:
+        return self.base_dir / "data" / "processed"
+
+    @property
+    def outputs_dir(self) -> Path:
+        return self.base_dir / "outputs"
+
+    @property
+    def models_dir(self) -> Path:
+        return self.outputs_dir / "models"
+
+    @property
+    def predictions_dir(self) -> Path:
+        return self.outputs_dir / "predictions"
+
+
+def project_paths(base_dir: Optional[Union[str, Path]] = None) -> ProjectPaths:
+    """Caminhos do projeto em `base_dir` (padrão: AGROFUTURE_HOME ou o diretório atual)"""
+    if base_dir is None:
+        base_dir = os.environ.get("AGROFUTURE_HOME") or Path.cwd()
+    return ProjectPaths(Path(base_dir).resolve())
+
+
+def tracing_from_env() -> bool:
+    """Trace de tempo/memória por etapa (desativado por padrão; AGROFUTURE_TRACE=1 ativa)"""
+    if os.environ.get("AGROFUTURE_TRACE", "0") == "1":
+        enable_tracing()
+        return True
+    return False
+
+
+def load_merged_data(paths: ProjectPaths) -> Tuple[pd.DataFrame, FeatureStore, pd.DataFrame]:
+    """
+    Carrega as planilhas, junta ao mercado e sincroniza o feature store
+
+    Returns:
+        (transações mescladas, feature store, matriz de features)
+    """
+    transacoes, mercado = load_data(paths.raw_data_dir / TRANSACTIONS_FILE, paths.raw_data_dir / MARKET_FILE,
+                                    cache_dir=paths.processed_data_dir / "cache")
+    merged_df = merge_data(transacoes, mercado, rate_source=default_rate_source(paths.processed_data_dir / FX_DB_FILE),
+                           **market_join_from_env())
+    merged_df["date"] = pd.to_datetime(merged_df["date"])
+    store, df_features = sync_feature_store(merged_df, paths.processed_data_dir / "feature_store")
+    return merged_df, store, df_features
+
+
+def train_pipeline(paths: ProjectPaths, backend: Optional[str] = None,
+                   external_memory: Optional[bool] = None) -> Path:
+    """
+    Treina, valida e salva modelo, relatório e thresholds
+
+    Args:
+        backend: Backend de treino (padrão: AGROFUTURE_BACKEND ou "multioutput")
+        external_memory: Treina a partir de shards no disco em memória externa
+            (padrão: AGROFUTURE_EXTERNAL_MEMORY=1; ver `agrofuture.external_memory`)
+
+    Returns:
+        Pacote do modelo salvo (diretório, ver `agrofuture.bundle`)
+    """
+    from agrofuture.bundle import save_bundle
+    from agrofuture.model_trainer import train_and_validate
+    from agrofuture.registry import ModelRegistry
+    from agrofuture.tuning import TUNED_PARAMS_FILE, load_tuned_params
+
+    tracing_from_env()
+
+    print(f"\n{'='*50}")
+    print(f" Agrofuture - Execução em {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+    print(f"{'='*50}\n")
+
+    # Carregar dados e atualizar features (incrementais: só as novas transações são processadas)
+    print("Carregando dados e atualizando feature store...")
+    merged_df, store, df_features = load_merged_data(paths)
+    print(f"💾 Memória das transações mescladas: {format_memory_report(memory_report(merged_df))}")
+    print(f"Feature store: {store.incremental_updates} atualização(ões) incremental(is), {store.rebuilds} reconstrução(ões)")
+    merged_df = merged_df.sort_values("date")
+
+    # Treinamento do modelo (AGROFUTURE_BACKEND: multioutput, native ou native_per_target;
+    # AGROFUTURE_THREADS limita o total de threads usado pelos folds paralelos)
+    backend = backend or os.environ.get("AGROFUTURE_BACKEND", "multioutput")
+    print(f"Treinando modelo (backend: {backend})...")
+    # Configuração de scripts/tune_hyperparameters.py, quando ajustada para este backend
+    params = load_tuned_params(paths.models_dir / TUNED_PARAMS_FILE, backend)
+    if params:
+        print(f"⚙️ Usando hiperparâmetros ajustados de {paths.models_dir / TUNED_PARAMS_FILE}")
+    if external_memory is None:
+        external_memory = os.environ.get("AGROFUTURE_EXTERNAL_MEMORY", "0") == "1"
+    if external_memory:
+        from agrofuture.external_memory import train_external_memory, write_feature_shards
+
+        with span("write_shards", rows=len(df_features)):
+            shards = write_feature_shards(df_features, paths.processed_data_dir / "shards")
+        # A matriz agora está no disco: o DataFrame não precisa ficar em memória durante o treino
+        del df_features
+        model, results, thresholds = train_external_memory(
+            shards, backend=backend, params=params, cache_dir=paths.processed_data_dir / "extmem_cache")
+    else:
+        model, results, thresholds = train_and_validate(merged_df, df_features=df_features, backend=backend, params=params)
+    print(f"📈 Pico de memória (RSS) do processo: {peak_rss_mb()} MB")
+
+    # salvar modelo treinado: boosters UBJSON + manifesto (features, empresas, thresholds, parâmetros)
+    paths.models_dir.mkdir(parents=True, exist_ok=True)
+    model_file = paths.models_dir / f"xgboost_model_{datetime.now().strftime('%Y%m%d%H%M%S')}"
+    with span("save_model"):
+        save_bundle(model, model_file, results["target_names"], results["feature_names"], thresholds,
+                    backend=backend, params=results["xgb_params"], fingerprint=store.fingerprint(),
+                    metrics=results["test_performance"])
+    print(f"💾 Modelo salvo em: {model_file}")
+    registry = ModelRegistry(paths.models_dir)
+    registry.register(model_file, metrics=results["test_performance"])
+    print(f"🗂️ Modelo registrado em: {registry.index_file}")
+
+    # salvar relatorio
+    report_file = save_model_report(results, paths.outputs_dir)
+
+    # salvar trace ao lado do relatório
+    trace_file = write_trace(report_file.with_name(report_file.name.replace("relatorio_", "trace_", 1)).with_suffix(".json"),
+                             script="run_pipeline", model=model_file.name, backend=backend)
+    if trace_file:
+        print("\n" + format_trace())
+        print(f"⏱️ Trace salvo em: {trace_file}")
+    return model_file
+
+
+def load_registered_model(paths: ProjectPaths, model_ref: Optional[str] = None) -> Tuple[Any, Path]:
+    """
+    Carrega o modelo apontado por `model_ref` no registro de `paths.models_dir`
+
+    Args:
+        model_ref: Id ou apelido do modelo (padrão: AGROFUTURE_MODEL ou "latest")
+
+    Raises:
+        FileNotFoundError: nenhum modelo registrado
+        KeyError: id ou apelido desconhecido
+    """
+    from agrofuture.registry import LATEST, open_registry
+
+    model_ref = model_ref or os.environ.get("AGROFUTURE_MODEL") or LATEST
+    return open_registry(paths.models_dir).load(model_ref)
+
+
+def _load_model_or_report(paths: ProjectPaths, model_ref: Optional[str]) -> Optional[Tuple[Any, Path]]:
+    try:
+        with span("load_model"):
+            model, model_file = load_registered_model(paths, model_ref)
+    except FileNotFoundError:
+        print("Nenhum modelo encontrado em:", paths.models_dir)
+        return None
+    except KeyError as e:
+        print(e.args[0])
+        return None
+    print(f"Usando modelo: {model_file.name}")
+    return model, model_file
+
+
+def store_predictions(paths: ProjectPaths, results: pd.DataFrame, model_file: Path) -> bool:
+    """
+    Anexa as previsões ao store Parquet particionado (ver `agrofuture.prediction_store`)
+
+    Returns:
+        False se o store não está disponível (pyarrow ausente)
+    """
+    from agrofuture.prediction_store import prediction_store
+    from agrofuture.registry import model_id
+
+    store = prediction_store(paths.predictions_dir)
+    try:
+        with span("store_predictions", rows=len(results)):
+            arquivos = store.append(results, model_id(model_file))
+    except ImportError:
+        print("⚠️ pyarrow não instalado: previsões não foram anexadas ao store Parquet")
+        return False
+    print(f"🗃️ {len(results)} previsão(ões) anexada(s) a {store.root} ({len(arquivos)} partição(ões))")
+    return True
+
+
+def save_predictions(paths: ProjectPaths, results: pd.DataFrame, model_file: Path, csv_path: Path,
+                     csv: Optional[bool] = None) -> None:
+    """
+    Grava as previsões no store Parquet e, só quando pedido, também em `csv_path`
+
+    Args:
+        csv: Grava também o CSV (padrão: AGROFUTURE_PREDICTIONS_CSV=1); sem
+            pyarrow o CSV é sempre gravado, já que o store não está disponível
+    """
+    if csv is None:
+        csv = os.environ.get("AGROFUTURE_PREDICTIONS_CSV", "0") == "1"
+    if store_predictions(paths, results, model_file) and not csv:
+        return
+    csv_path.parent.mkdir(parents=True, exist_ok=True)
+    results.to_csv(csv_path, index=False)
+    print(f"\nResultados salvos em: {csv_path}")
+
+
+def save_model_report(report: Dict[str, Any], OUTPUTS_DIR: Path) -> Path:
+    report_lines = []
+
+    # Cabeçalho
+    report_lines.append(f"📌 Modelo: {report.get('model', 'N/A')}\n")
+
+    target_names = report.get("target_names", [])
+    feature_names = report.get("feature_names", [])
+
+    report_lines.append("🎯 Targets:")
+    for t in target_names:
+        report_lines.append(f" - {t}")
+    report_lines.append("")
+
+    # Cross-validation
+    report_lines.append("📈 Cross-Validation Results:")
+    for fold_data in report.get("cross_validation", []):
+        fold = fold_data["fold"]
+        f1 = fold_data["f1_score"]
+        prec = fold_data["precision"]
+        rec = fold_data["recall"]
+        report_lines.append(f"\n🔁 Fold {fold}")
+        report_lines.append(f"   F1-score : {f1:.4f}")
+        report_lines.append(f"   Precision: {prec:.4f}")
+        report_lines.append(f"   Recall   : {rec:.4f}")
+        timings = fold_data.get("timings")
+        if timings:
+            report_lines.append(f"   Tempo    : treino {timings['fit_s']:.2f}s | total {timings['total_s']:.2f}s")
+        report_lines.append("   Thresholds por classe:")
+        for cls, thr in fold_data["thresholds"].items():
+            report_lines.append(f"     - {cls:<10}: threshold = {thr['value']:.4f} | f1 = {thr['f1']:.4f}")
+    report_lines.append("")
+
+    # Test performance
+    test = report.get("test_performance", {})
+    report_lines.append("🧪 Teste Final (Hold-out):")
+    report_lines.append(f"   F1-score : {test.get('f1_score', 0):.4f}")
+    report_lines.append(f"   Precision: {test.get('precision', 0):.4f}")
+    report_lines.append(f"   Recall   : {test.get('recall', 0):.4f}")
+    report_lines.append("")
+
+    # Thresholds finais
+    thresholds = report.get("thresholds", {})
+    report_lines.append("🎯 Thresholds Finais por Classe:")
+    for cls, val in thresholds.items():
+        report_lines.append(f"   - {cls:<10}: {float(val):.4f}")
+    report_lines.append("")
+
+    # Feature importance
+    feature_importance = report.get("feature_importances", {})
+    mean_importance = feature_importance.get("mean_importance", {})
+    std_importance = feature_importance.get("std_importance", {})
+
+    report_lines.append("📊 Importância Média das Features (por classe):")
+    if mean_importance:
+        report_lines.append(f"\n{'Feature':<25}{'Média':>10} {'Std':>10}")
+        report_lines.append("-" * 45)
+        for feat in feature_names:
+            mean = mean_importance.get(feat, 0)
+            std = std_importance.get(feat, 0)
+            report_lines.append(f"{feat:<25}{mean:>10.4f} {std:>10.4f}")
+    else:
+        report_lines.append("Nenhuma importância de feature disponível.")
+
+    report_lines.append("\n✅ Fim do relatório.\n")
+
+    # Caminho do arquivo
+    now = datetime.now()
+    report_file = OUTPUTS_DIR / "reports" / f"relatorio_{now.strftime('%Y%m%d')}_xgboost_model_{now.strftime('%Y%m%d%H%M%S')}.txt"
+    report_file.parent.mkdir(parents=True, exist_ok=True)
+
+    # Salvar em arquivo
+    with open(report_file, "w", encoding="utf-8") as f:
+        f.write("\n".join(report_lines))
+
+    print(f"📄 Relatório salvo em: {report_file}")
+    return report_file
+
+
+def read_dates_file(path: Union[str, Path]) -> List[str]:
+    """Lê uma data por linha (linhas vazias e iniciadas por # são ignoradas)"""
+    with open(path, encoding="utf-8") as f:
+        linhas = [linha.strip() for linha in f]
+    return [linha for linha in linhas if linha and not linha.startswith("#")]
+
+
+def resolve_target_dates(date: Optional[str] = None, start: Optional[str] = None, end: Optional[str] = None,
+                 dates_file: Optional[Union[str, Path]] = None) -> List[pd.Timestamp]:
+    """
+    Lista ordenada de datas a prever: uma data, um intervalo (inclusivo) ou um arquivo
+
+    Raises:
+        ValueError, OSError: datas inválidas ou arquivo ilegível
+    """
+    if date:
+        return [pd.to_datetime(date)]
+    if dates_file:
+        datas = pd.to_datetime(read_dates_file(dates_file))
+    else:
+        datas = pd.date_range(pd.to_datetime(start), pd.to_datetime(end), freq="D")
+    return sorted(set(datas.normalize()))
+
+
+def predict_pipeline(paths: ProjectPaths, target_dates: Sequence[pd.Timestamp], batch: bool = False,
+                     model_ref: Optional[str] = None, csv: Optional[bool] = None) -> int:
+    """
+    Gera e salva as previsões de `target_dates` com o modelo `model_ref` (ver `load_registered_model`)
+
+    As previsões vão para o store Parquet; o CSV da execução só com `csv` (ver `save_predictions`)
+
+    Returns:
+        Código de saída (0 = sucesso)
+    """
+    from agrofuture.predictor import build_features_for_dates, predict_dates
+
+    tracing_from_env()
+
+    if not target_dates:
+        print("Nenhuma data para prever")
+        return 1
+
+    if batch:
+        print(f"\nGerando previsões para {len(target_dates)} datas "
+              f"({target_dates[0].date()} a {target_dates[-1].date()})...")
+    else:
+        print(f"\nGerando previsões para {target_dates[0].date()}...")
+
+    # Carregar modelo (o mais recente, ou o id/apelido pedido)
+    carregado = _load_model_or_report(paths, model_ref)
+    if carregado is None:
+        return 1
+    model, model_file = carregado
+
+    # Carregar dados
+    merged_df, store, _ = load_merged_data(paths)
+
+    # Datas futuras recebem registros sintéticos baseados no último dia conhecido
+    with span("build_features", dates=len(target_dates)) as s:
+        df_features, future_dates = build_features_for_dates(store, merged_df, target_dates)
+        s.set(future_dates=len(future_dates))
+    if future_dates:
+        last_known_date = merged_df["date"].max()
+        print(f"AVISO: {len(future_dates)} data(s) futura(s) (após {last_known_date.date()})")
+        print("Gerando dados sintéticos baseados no último dia conhecido...")
+
+        # Mensagem sobre premissas
+        print("\nPremissas para previsão futura:")
+        print("- Valores de commodities mantidos constantes")
+        print("- Features calculadas com base no histórico recente")
+        print("- Tendências mantidas do último período conhecido")
+
+    # Verificar se as datas existem no índice
+    disponiveis = set(df_features["date"])
+    ausentes = [d for d in target_dates if d not in disponiveis]
+    if ausentes:
+        print(f"\nERRO: {len(ausentes)} data(s) não disponível(is) após processamento: "
+              + ", ".join(str(d.date()) for d in ausentes[:10]))
+        print(f"Datas disponíveis: {df_features['date'].min().date()} a {df_features['date'].max().date()}")
+        if not batch or len(ausentes) == len(target_dates):
+            return 1
+
+    # Uma única chamada ao modelo para todas as datas
+    with span("predict", dates=len(target_dates)) as s:
+        results = predict_dates(model, df_features, target_dates, future_dates)
+        s.record_shape(results)
+
+    # Formatando resultados
+    for data, grupo in results.groupby("Data", sort=True):
+        print(f"\nProbabilidades para {data}:")
+        vendas = grupo["Venda Prevista"] if "Venda Prevista" in grupo else [False] * len(grupo)
+        for company, prob, venda in zip(grupo["Empresa"], grupo["Probabilidade (%)"], vendas):
+            print(f"- {company}: {prob:.2f}%" + (" ✅ venda prevista (acima do threshold)" if venda else ""))
+
+    # Salvar resultados (store Parquet; CSV opcional)
+    if batch:
+        nome = f"predictions_{target_dates[0].date()}_{target_dates[-1].date()}.csv"
+    else:
+        nome = f"predictions_{target_dates[0].date()}.csv"
+    predictions_path = paths.predictions_dir / nome
+    save_predictions(paths, results, model_file, predictions_path, csv)
+
+    # Trace ao lado das previsões
+    trace_file = write_trace(predictions_path.with_name(f"trace_{predictions_path.stem}.json"),
+                             script="generate_predictions", model=model_file.name)
+    if trace_file:
+        print("\n" + format_trace())
+        print(f"⏱️ Trace salvo em: {trace_file}")
+    return 0
+
+
+def forecast_pipeline(paths: ProjectPaths, horizon: int, feedback: bool = False,
+                      model_ref: Optional[str] = None, csv: Optional[bool] = None) -> int:
+    """
+    Previsões para os `horizon` dias seguintes ao histórico (ver `forecast_horizon`)
+
+    As previsões vão para o store Parquet; o CSV da execução só com `csv` (ver `save_predictions`)
+
+    Returns:
+        Código de saída (0 = sucesso)
+    """
+    from agrofuture.predictor import forecast_horizon, probability_table
+
+    tracing_from_env()
+
+    if horizon < 1:
+        print("O horizonte deve ter pelo menos 1 dia")
+        return 1
+
+    carregado = _load_model_or_report(paths, model_ref)
+    if carregado is None:
+        return 1
+    model, model_file = carregado
+
+    merged_df, store, _ = load_merged_data(paths)
+    modo = "com feedback das vendas previstas" if feedback else "último registro conhecido repetido"
+    print(f"\nPrevendo {horizon} dia(s) após {merged_df['date'].max().date()} ({modo})...")
+
+    with span("forecast_horizon", horizon=horizon, feedback=feedback) as s:
+        matriz = forecast_horizon(model, store, merged_df, horizon, feedback=feedback)
+        results = probability_table(matriz.to_numpy(), matriz.index, list(matriz.columns), matriz.index,
+                                    thresholds=getattr(model, "thresholds", None))
+        s.record_shape(results)
+
+    print(f"\n{'Data':<12}" + "".join(f"{c:>12}" for c in matriz.columns))
+    for data, linha in matriz.iterrows():
+        print(f"{str(data.date()):<12}" + "".join(f"{p * 100:>11.2f}%" for p in linha))
+
+    sufixo = "_feedback" if feedback else ""
+    predictions_path = paths.predictions_dir / f"forecast_{matriz.index[0].date()}_{horizon}d{sufixo}.csv"
+    save_predictions(paths, results, model_file, predictions_path, csv)
+
+    trace_file = write_trace(predictions_path.with_name(f"trace_{predictions_path.stem}.json"),
+                             script="forecast", model=model_file.name)
+    if trace_file:
+        print("\n" + format_trace())
+        print(f"⏱️ Trace salvo em: {trace_file}")
+    return 0
+
+
+def explain_pipeline(paths: ProjectPaths, target_dates: Sequence[pd.Timestamp], top: int = 5,
+                     model_ref: Optional[str] = None) -> int:
+    """
+    Contribuições das features (TreeSHAP) para as previsões de `target_dates`
+
+    Returns:
+        Código de saída (0 = sucesso)
+    """
+    from agrofuture.explain import explain_dates, top_contributions
+    from agrofuture.predictor import build_features_for_dates
+
+    tracing_from_env()
+
+    if not target_dates:
+        print("Nenhuma data para explicar")
+        return 1
+    carregado = _load_model_or_report(paths, model_ref)
+    if carregado is None:
+        return 1
+    model, model_file = carregado
+
+    merged_df, store, _ = load_merged_data(paths)
+    df_features, _ = build_features_for_dates(store, merged_df, target_dates)
+    with span("explain", dates=len(target_dates)) as s:
+        try:
+            contribs = explain_dates(model, df_features, target_dates)
+        except ValueError as e:
+            print(e)
+            return 1
+        tabela = top_contributions(contribs, top)
+        s.record_shape(tabela)
+    if tabela.empty:
+        print("Nenhuma das datas pedidas está disponível")
+        return 1
+
+    for (data, empresa), grupo in tabela.groupby(["Data", "Empresa"], sort=True):
+        margem = grupo["Margem"].iloc[0]
+        print(f"\n{data} | {empresa}: {100 / (1 + np.exp(-margem)):.2f}%")
+        for feature, valor in zip(grupo["Feature"], grupo["Contribuição"]):
+            print(f"   {feature:<36} {valor:+.4f}")
+
+    paths.predictions_dir.mkdir(parents=True, exist_ok=True)
+    explain_path = paths.predictions_dir / f"explanations_{target_dates[0].date()}_{target_dates[-1].date()}.csv"
+    tabela.to_csv(explain_path, index=False)
+    print(f"\nExplicações salvas em: {explain_path}")
+    return 0
+
+
+def backtest_pipeline(paths: ProjectPaths, backend: Optional[str] = None, cadence_days: int = 7,
+                      window_days: Optional[int] = None, start: Optional[str] = None, lookback_days: int = 730,
+                      warm_start: bool = True, warm_rounds: Optional[int] = None, full_refit_every: int = 0) -> int:
+    """
+    Backtest walk-forward com retreino periódico (ver `agrofuture.backtest`)
+
+    Grava em outputs/reports as métricas por passo, os thresholds por passo,
+    a deriva dos thresholds e as probabilidades fora da amostra.
+
+    Returns:
+        Código de saída (0 = sucesso)
+    """
+    from agrofuture.backtest import walk_forward_backtest
+    from agrofuture.tuning import TUNED_PARAMS_FILE, load_tuned_params
+
+    tracing_from_env()
+    backend = backend or os.environ.get("AGROFUTURE_BACKEND", "multioutput")
+    _, _, df_features = load_merged_data(paths)
+    params = load_tuned_params(paths.models_dir / TUNED_PARAMS_FILE, backend)
+    if params:
+        print(f"⚙️ Usando hiperparâmetros ajustados de {paths.models_dir / TUNED_PARAMS_FILE}")
+
+    modo = "warm start" if warm_start else "treino do zero"
+    janela = f"janela de {window_days} dias" if window_days else "janela crescente"
+    print(f"\nBacktest walk-forward (backend: {backend}, retreino a cada {cadence_days} dia(s), {janela}, {modo})...")
+    try:
+        with span("backtest", backend=backend, cadence_days=cadence_days, warm_start=warm_start) as s:
+            result = walk_forward_backtest(
+                df_features, backend=backend, start=pd.to_datetime(start) if start else None,
+                cadence_days=cadence_days, window_days=window_days, lookback_days=lookback_days,
+                warm_start=warm_start, warm_rounds=warm_rounds, full_refit_every=full_refit_every, params=params,
+            )
+            s.set(steps=len(result.steps))
+    except ValueError as e:
+        print(e)
+        return 1
+
+    steps = result.steps
+    print(f"\n{'Corte':<12}{'Treino':>8}{'Teste':>7}{'Árvores':>9}{'F1':>8}{'Precision':>11}{'Recall':>8}{'Treino (s)':>12}")
+    for _, linha in steps.iterrows():
+        print(f"{str(linha['cutoff']):<12}{linha['train_days']:>8}{linha['test_days']:>7}{linha['trees']:>9}"
+              f"{linha['f1_score']:>8.4f}{linha['precision']:>11.4f}{linha['recall']:>8.4f}{linha['fit_s']:>12.2f}")
+    print(f"\n✅ {len(steps)} passo(s) em {steps['fit_s'].sum():.2f}s de treino | F1 médio {steps['f1_score'].mean():.4f}")
+
+    drift = result.threshold_drift()
+    print("\n🎯 Deriva dos thresholds (primeiro -> último, desvio):")
+    for empresa, linha in drift.iterrows():
+        print(f"   - {empresa:<10}: {linha['first']:.4f} -> {linha['last']:.4f} (std {linha['std']:.4f})")
+
+    reports_dir = paths.outputs_dir / "reports"
+    reports_dir.mkdir(parents=True, exist_ok=True)
+    prefixo = reports_dir / f"backtest_{datetime.now().strftime('%Y%m%d%H%M%S')}_{backend}"
+    steps.to_csv(f"{prefixo}_steps.csv", index=False)
+    result.thresholds.to_csv(f"{prefixo}_thresholds.csv")
+    drift.to_csv(f"{prefixo}_threshold_drift.csv", index_label="empresa")
+    result.predictions.to_csv(f"{prefixo}_predictions.csv")
+    print(f"\n📄 Backtest salvo em: {prefixo}_*.csv")
+
+    trace_file = write_trace(Path(f"{prefixo}_trace.json"), script="backtest", backend=backend)
+    if trace_file:
+        print("\n" + format_trace())
+        print(f"⏱️ Trace salvo em: {trace_file}")
+    return 0
@@ -0,0 +1,237 @@
+"""
+Armazenamento colunar das previsões, particionado por mês da data prevista.
+
+Cada execução de previsão anexa um arquivo Parquet por partição tocada:
+
+    outputs/predictions/store/
+        month=2024-05/part-20241105120000-3f2a9c1e.parquet
+        month=2024-06/...
+
+Colunas: date, company, probability (0-1), threshold, decision, future,
+model_id e created_at (momento da execução). O formato de diretórios
+`chave=valor` também é lido diretamente por pyarrow.dataset, DuckDB e Spark.
+
+`PredictionStore.query` lê só as partições do intervalo pedido e filtra
+empresas e datas no próprio Parquet; por padrão mantém a previsão mais
+recente de cada (data, empresa, modelo). `compact` junta os arquivos
+pequenos de cada partição em um único arquivo ordenado.
+
+Requer pyarrow (o mesmo do cache colunar e do streaming).
+"""
+
+import uuid
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+STORE_DIR = "store"
+PARTITION_KEY = "month"
+COLUMNS = ("date", "company", "probability", "threshold", "decision", "future", "model_id", "created_at")
+_KEY = ["date", "company", "model_id"]
+
+
+def _schema():
+    import pyarrow as pa
+
+    return pa.schema([
+        ("date", pa.date32()),
+        ("company", pa.string()),
+        ("probability", pa.float64()),
+        ("threshold", pa.float64()),
+        ("decision", pa.bool_()),
+        ("future", pa.bool_()),
+        ("model_id", pa.string()),
+        ("created_at", pa.timestamp("s")),
+    ])
+
+
+def to_store_frame(results: pd.DataFrame, model_id: str, created_at: Optional[datetime] = None) -> pd.DataFrame:
+    """
+    Converte a tabela longa de `predict_dates`/`probability_table` para as colunas do store
+
+    Args:
+        results: DataFrame com Empresa, Probabilidade (%), Data, Tipo
+            [, Threshold (%), Venda Prevista]
+        model_id: Id do modelo no registro (ver `agrofuture.registry`)
+        created_at: Momento da execução (padrão: agora)
+    """
+    created_at = pd.Timestamp(created_at or datetime.now()).floor("s")
+    n = len(results)
+    tem_threshold = "Threshold (%)" in results
+    return pd.DataFrame({
+        "date": pd.to_datetime(results["Data"]).dt.normalize(),
+        "company": results["Empresa"].astype(str).to_numpy(),
+        "probability": results["Probabilidade (%)"].to_numpy(dtype=float) / 100,
+        "threshold": results["Threshold (%)"].to_numpy(dtype=float) / 100 if tem_threshold else np.full(n, np.nan),
+        "decision": (results["Venda Prevista"].astype("boolean") if "Venda Prevista" in results
+                     else pd.array([pd.NA] * n, dtype="boolean")),
+        "future": (results["Tipo"] == "Futura").to_numpy(),
+        "model_id": np.full(n, model_id, dtype=object),
+        "created_at": np.full(n, created_at.to_datetime64()),
+    })
+
+
+class PredictionStore:
+    """
+    Previsões em Parquet particionado por mês (`month=YYYY-MM`)
+
+    Args:
+        root: Diretório do store (ex.: outputs/predictions/store)
+    """
+
+    def __init__(self, root: Union[str, Path]):
+        self.root = Path(root)
+
+    # ------------------------------------------------------------------
+    # Escrita
+    # ------------------------------------------------------------------
+
+    def append(self, results: pd.DataFrame, model_id: str, created_at: Optional[datetime] = None) -> List[Path]:
+        """
+        Anexa uma tabela de previsões (formato de `predict_dates`); um arquivo por mês tocado
+
+        Returns:
+            Arquivos gravados
+        """
+        frame = to_store_frame(results, model_id, created_at)
+        if frame.empty:
+            return []
+        sufixo = f"{frame['created_at'].iloc[0]:%Y%m%d%H%M%S}-{uuid.uuid4().hex[:8]}"
+        arquivos = []
+        for mes, parte in frame.groupby(frame["date"].dt.strftime("%Y-%m"), sort=True):
+            arquivos.append(self._write(self._partition_dir(mes), f"part-{sufixo}.parquet", parte))
+        return arquivos
+
+    def _partition_dir(self, mes: str) -> Path:
+        return self.root / f"{PARTITION_KEY}={mes}"
+
+    def _write(self, destino: Path, nome: str, frame: pd.DataFrame) -> Path:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        destino.mkdir(parents=True, exist_ok=True)
+        tabela = pa.Table.from_pandas(frame[list(COLUMNS)], schema=_schema(), preserve_index=False)
+        # Arquivo oculto + rename: leitores nunca veem um Parquet pela metade
+        tmp = destino / f".{nome}.tmp"
+        pq.write_table(tabela, tmp)
+        tmp.replace(destino / nome)
+        return destino / nome
+
+    # ------------------------------------------------------------------
+    # Consulta
+    # ------------------------------------------------------------------
+
+    def partitions(self) -> Dict[str, List[Path]]:
+        """Mês -> arquivos Parquet da partição"""
+        if not self.root.exists():
+            return {}
+        return {d.name.split("=", 1)[1]: sorted(d.glob("part-*.parquet"))
+                for d in sorted(self.root.glob(f"{PARTITION_KEY}=*")) if d.is_dir()}
+
+    def query(self, companies: Optional[Iterable[str]] = None, start=None, end=None,
+              model_id: Optional[str] = None, latest: bool = True) -> pd.DataFrame:
+        """
+        Previsões de `companies` entre `start` e `end` (inclusivos)
+
+        Args:
+            companies: Empresas (padrão: todas)
+            start, end: Limites do intervalo de datas (padrão: sem limite)
+            model_id: Só as previsões deste modelo
+            latest: Mantém apenas a previsão mais recente de cada (data, empresa, modelo)
+
+        Returns:
+            DataFrame com as colunas do store, ordenado por data e empresa
+        """
+        import pyarrow.dataset as ds
+
+        inicio = pd.Timestamp(start).normalize() if start is not None else None
+        fim = pd.Timestamp(end).normalize() if end is not None else None
+        arquivos = [arquivo for mes, lista in self.partitions().items()
+                    if (inicio is None or mes >= f"{inicio:%Y-%m}") and (fim is None or mes <= f"{fim:%Y-%m}")
+                    for arquivo in lista]
+        if not arquivos:
+            return pd.DataFrame({c: pd.Series(dtype=t) for c, t in _empty_dtypes().items()})
+
+        filtro = None
+        condicoes = []
+        if inicio is not None:
+            condicoes.append(ds.field("date") >= inicio.date())
+        if fim is not None:
+            condicoes.append(ds.field("date") <= fim.date())
+        if companies is not None:
+            condicoes.append(ds.field("company").isin(list(companies)))
+        if model_id is not None:
+            condicoes.append(ds.field("model_id") == model_id)
+        for condicao in condicoes:
+            filtro = condicao if filtro is None else filtro & condicao
+
+        tabela = ds.dataset([str(a) for a in arquivos], schema=_schema(), format="parquet").to_table(filter=filtro)
+        df = tabela.to_pandas()
+        df["date"] = pd.to_datetime(df["date"])
+        df["decision"] = df["decision"].astype("boolean")
+        if latest:
+            df = _latest(df)
+        return df.sort_values(["date", "company", "created_at"], kind="stable").reset_index(drop=True)
+
+    def company_history(self, company: str, start=None, end=None, model_id: Optional[str] = None) -> pd.Series:
+        """Probabilidade mais recente de uma empresa por data (índice = data)"""
+        df = self.query([company], start, end, model_id=model_id)
+        return df.drop_duplicates("date", keep="last").set_index("date")["probability"]
+
+    # ------------------------------------------------------------------
+    # Manutenção
+    # ------------------------------------------------------------------
+
+    def compact(self, min_files: int = 2, latest: bool = True) -> Dict[str, Any]:
+        """
+        Junta os arquivos de cada partição com pelo menos `min_files` arquivos
+
+        Args:
+            min_files: Partições com menos arquivos são mantidas como estão
+            latest: Descarta previsões substituídas por outras mais recentes
+                da mesma (data, empresa, modelo)
+
+        Returns:
+            {"partitions": partições compactadas, "files_before", "files_after",
+             "rows_before", "rows_after"}
+        """
+        import pyarrow.parquet as pq
+
+        stats = {"partitions": [], "files_before": 0, "files_after": 0, "rows_before": 0, "rows_after": 0}
+        for mes, arquivos in self.partitions().items():
+            stats["files_before"] += len(arquivos)
+            if len(arquivos) < min_files:
+                stats["files_after"] += len(arquivos)
+                continue
+            df = pd.concat([pq.read_table(a, schema=_schema()).to_pandas() for a in arquivos], ignore_index=True)
+            df["date"] = pd.to_datetime(df["date"])
+            stats["rows_before"] += len(df)
+            if latest:
+                df = _latest(df)
+            df = df.sort_values(["date", "company", "created_at"], kind="stable")
+            nome = f"part-{datetime.now():%Y%m%d%H%M%S}-{uuid.uuid4().hex[:8]}-compact.parquet"
+            self._write(self._partition_dir(mes), nome, df)
+            for arquivo in arquivos:
+                arquivo.unlink()
+            stats["partitions"].append(mes)
+            stats["files_after"] += 1
+            stats["rows_after"] += len(df)
+        return stats
+
+
+def _latest(df: pd.DataFrame) -> pd.DataFrame:
+    ordenado = df.sort_values("created_at", kind="stable")
+    return ordenado.drop_duplicates(_KEY, keep="last")
+
+
+def _empty_dtypes() -> Dict[str, Any]:
+    return {"date": "datetime64[ns]", "company": object, "probability": float, "threshold": float,
+            "decision": "boolean", "future": bool, "model_id": object, "created_at": "datetime64[s]"}
+
+
+def prediction_store(predictions_dir: Union[str, Path]) -> PredictionStore:
+    """Store padrão dentro do diretório de previsões"""
+    return PredictionStore(Path(predictions_dir) / STORE_DIR)
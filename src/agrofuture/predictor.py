@@ -0,0 +1,242 @@
+"""
+Previsão para uma ou várias datas com um único modelo carregado.
+
+Reúne o que o `generate_predictions.py` fazia para uma data por processo:
+montar as features (inclusive para datas futuras) e chamar `predict_proba`
+— agora para todas as datas de uma vez. O modelo vem do registro
+(`agrofuture.registry`), por id ou apelido.
+
+O modelo é um pacote (`agrofuture.bundle`: boosters UBJSON + manifesto com
+features, empresas e thresholds) ou, nos modelos antigos, um `.joblib`.
+Com o pacote, as empresas e os thresholds vêm do manifesto e o resultado
+inclui a decisão de venda de cada empresa.
+
+`forecast_horizon` prevê os N dias seguintes ao histórico avançando uma
+cópia do feature store dia a dia, de modo que janelas móveis e recência de
+cada empresa incluem os dias anteriores do horizonte (em vez de lacunas).
+"""
+
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from agrofuture.bundle import MANIFEST_FILE, ModelBundle
+from agrofuture.feature_engineer import prepare_target
+from agrofuture.feature_store import FeatureStore
+
+
+def load_model(model_file: Path):
+    """Carrega um pacote de modelo (diretório) ou um `.joblib` antigo"""
+    model_file = Path(model_file)
+    if model_file.is_dir():
+        return ModelBundle.load(model_file)
+    return joblib.load(model_file)
+
+
+def model_stamp_file(model_file: Path) -> Path:
+    """Arquivo cuja data de modificação identifica a versão do modelo (o manifesto, nos pacotes)"""
+    model_file = Path(model_file)
+    return model_file / MANIFEST_FILE if model_file.is_dir() else model_file
+
+
+def model_company_classes(model, df_features: pd.DataFrame) -> List[str]:
+    """Empresas na ordem das saídas do modelo (do manifesto ou recalculadas das features)"""
+    classes = getattr(model, "company_classes", None)
+    if classes is None:
+        _, classes = prepare_target(df_features)
+    return list(classes)
+
+
+def future_rows(df: pd.DataFrame, target_dates: Sequence[pd.Timestamp]) -> pd.DataFrame:
+    """Um registro sintético (cópia do último dia conhecido) para cada data futura"""
+    last_row = df.sort_values("date").iloc[[-1]]
+    rows = last_row.loc[last_row.index.repeat(len(target_dates))].reset_index(drop=True)
+    rows["date"] = pd.to_datetime(list(target_dates))
+    return rows
+
+
+def future_feature_rows(store: FeatureStore, merged_df: pd.DataFrame,
+                        future_dates: Sequence[pd.Timestamp]) -> pd.DataFrame:
+    """
+    Linhas de features para datas posteriores ao histórico
+
+    Cada data é estendida de forma independente (uma cópia em memória do
+    feature store com um único registro sintético), de modo que o resultado
+    em lote é idêntico ao de previsões avulsas.
+    """
+    linhas = []
+    for data in future_dates:
+        estendido = store.copy().update_features(future_rows(merged_df, [data]))
+        linhas.append(estendido[estendido["date"] == data])
+    return pd.concat(linhas, ignore_index=True)
+
+
+def build_features_for_dates(store: FeatureStore, merged_df: pd.DataFrame,
+                             target_dates: Sequence[pd.Timestamp]) -> Tuple[pd.DataFrame, List[pd.Timestamp]]:
+    """
+    Matriz de features cobrindo todas as datas pedidas
+
+    Returns:
+        (features, datas futuras)
+    """
+    last_known_date = pd.to_datetime(merged_df["date"]).max()
+    futuras = sorted(d for d in target_dates if d > last_known_date)
+    df_features = store.features()
+    if futuras:
+        linhas = future_feature_rows(store, merged_df, futuras)
+        df_features = pd.concat([df_features, linhas], ignore_index=True)
+    return df_features, futuras
+
+
+def align_features(model, X: pd.DataFrame) -> pd.DataFrame:
+    """Reordena as colunas para coincidir com as usadas no treino do modelo"""
+    if hasattr(model, 'feature_names_in_'):
+        return X[model.feature_names_in_]
+    if hasattr(model, 'estimators_') and hasattr(model.estimators_[0], 'feature_names_in_'):
+        return X[model.estimators_[0].feature_names_in_]
+    return X
+
+
+def predict_dates(model, df_features: pd.DataFrame, target_dates: Sequence[pd.Timestamp],
+                  future_dates: Iterable[pd.Timestamp] = (),
+                  company_classes: Optional[Sequence[str]] = None) -> pd.DataFrame:
+    """
+    Probabilidades de venda de cada empresa em cada data, com um único `predict_proba`
+
+    Args:
+        model: Modelo multi-label treinado
+        df_features: Matriz de features (saída de `create_features`/feature store)
+        target_dates: Datas a prever (as ausentes da matriz são ignoradas)
+        future_dates: Datas marcadas como "Futura" no resultado
+        company_classes: Empresas na ordem das saídas do modelo (do manifesto
+            do pacote ou calculadas a partir de `df_features` quando omitidas)
+
+    Returns:
+        DataFrame longo com colunas Empresa, Probabilidade (%), Data, Tipo e,
+        quando o modelo traz thresholds, Threshold (%) e Venda Prevista
+    """
+    if company_classes is None:
+        company_classes = model_company_classes(model, df_features)
+    thresholds = getattr(model, "thresholds", None)
+    selecionadas = df_features[df_features["date"].isin(list(target_dates))].sort_values("date")
+    if selecionadas.empty:
+        colunas = ['Empresa', 'Probabilidade (%)', 'Data', 'Tipo']
+        return pd.DataFrame(columns=colunas + (['Threshold (%)', 'Venda Prevista'] if thresholds else []))
+
+    X_target = selecionadas.drop(columns=['empresas_vendedoras', 'date'], errors='ignore')
+    prob_matrix = _positive_proba(model, X_target)
+    return probability_table(prob_matrix, selecionadas["date"], company_classes, future_dates, thresholds)
+
+
+def probability_table(prob_matrix: np.ndarray, dates: Sequence[pd.Timestamp], company_classes: Sequence[str],
+                      future_dates: Iterable[pd.Timestamp] = (),
+                      thresholds: Optional[Dict[str, float]] = None) -> pd.DataFrame:
+    """
+    Matriz datas x empresas de probabilidades (0-1) no formato longo dos CSVs de previsão
+
+    Args:
+        thresholds: Threshold por empresa; quando informado, acrescenta as
+            colunas Threshold (%) e Venda Prevista (probabilidade >= threshold)
+
+    Returns:
+        DataFrame com colunas Empresa, Probabilidade (%), Data, Tipo
+    """
+    datas = pd.to_datetime(pd.Series(dates)).dt.date.to_numpy()
+    futuras = {pd.Timestamp(d).date() for d in future_dates}
+    n_datas, n_empresas = prob_matrix.shape
+    tabela = pd.DataFrame({
+        'Empresa': np.tile(np.asarray(company_classes, dtype=object), n_datas),
+        'Probabilidade (%)': (np.asarray(prob_matrix) * 100).ravel(),
+        'Data': np.repeat(datas, n_empresas),
+        'Tipo': ['Futura' if d in futuras else 'Histórica' for d in np.repeat(datas, n_empresas)],
+    })
+    if thresholds:
+        limiares = np.array([thresholds.get(c, 0.5) for c in company_classes])
+        tabela['Threshold (%)'] = np.tile(limiares * 100, n_datas)
+        tabela['Venda Prevista'] = (np.asarray(prob_matrix) >= limiares).ravel()
+    return tabela
+
+
+def company_templates(merged_df: pd.DataFrame) -> pd.DataFrame:
+    """Última transação de cada empresa, base dos registros sintéticos de vendas previstas"""
+    ordenado = merged_df.sort_values("date", kind="stable")
+    ultimas = ordenado.groupby("company_transacoes", observed=True, sort=False).tail(1)
+    return ultimas.set_index(ultimas["company_transacoes"].astype(object), drop=False)
+
+
+def seller_rows(templates: pd.DataFrame, companies: Iterable, date: pd.Timestamp) -> pd.DataFrame:
+    """Um registro sintético por empresa vendedora em `date` (cópia da última transação dela)"""
+    rows = templates.loc[[c for c in companies if c in templates.index]].reset_index(drop=True)
+    rows["date"] = pd.Timestamp(date)
+    return rows
+
+
+def forecast_horizon(model, store: FeatureStore, merged_df: pd.DataFrame, horizon: int,
+                     feedback: bool = False, thresholds: Optional[Dict[str, float]] = None,
+                     company_classes: Optional[Sequence[str]] = None) -> pd.DataFrame:
+    """
+    Probabilidades de venda de cada empresa nos `horizon` dias seguintes ao histórico
+
+    O estado do store (janelas móveis, recência, matrizes dias x empresas) é
+    avançado um dia por vez sobre uma cópia em memória, a partir do estado já
+    calculado; nenhuma data do horizonte fica sem linha de features.
+
+    - sem feedback: cada dia recebe a cópia do último registro conhecido (a
+      mesma premissa de `future_rows`); todos os dias entram no store de uma
+      vez e o modelo é chamado uma única vez;
+    - com feedback: as vendas de cada dia são as empresas previstas para o
+      dia anterior (probabilidade >= threshold da empresa; o primeiro dia
+      repete as empresas do último dia conhecido), então o modelo é chamado
+      dia a dia. Um dia sem nenhuma empresa prevista usa o último registro
+      conhecido.
+
+    Args:
+        model: Modelo multi-label treinado
+        store: Feature store sincronizado com `merged_df` (não é alterado)
+        merged_df: Histórico de transações mescladas
+        horizon: Número de dias a prever
+        feedback: Realimenta as vendas previstas no estado do dia seguinte
+        thresholds: Threshold por empresa usado no feedback (padrão: os do
+            pacote do modelo, ou 0.5)
+        company_classes: Empresas na ordem das saídas do modelo
+
+    Returns:
+        DataFrame datas x empresas com probabilidades entre 0 e 1
+    """
+    if horizon < 1:
+        raise ValueError("horizon deve ser >= 1")
+    if company_classes is None:
+        company_classes = model_company_classes(model, store.features())
+    if thresholds is None:
+        thresholds = getattr(model, "thresholds", None)
+    ultima = pd.to_datetime(merged_df["date"]).max()
+    datas = pd.date_range(ultima + pd.Timedelta(days=1), periods=horizon, freq="D", name="date")
+    rolado = store.copy()
+
+    if not feedback:
+        linhas = rolado.extend(future_rows(merged_df, datas))
+        prob = _positive_proba(model, linhas)
+    else:
+        templates = company_templates(merged_df)
+        limiares = np.array([(thresholds or {}).get(c, 0.5) for c in company_classes])
+        vendedoras = list(merged_df.loc[pd.to_datetime(merged_df["date"]) == ultima, "company_transacoes"].unique())
+        prob = np.empty((horizon, len(company_classes)))
+        for i, data in enumerate(datas):
+            rows = seller_rows(templates, vendedoras, data)
+            if rows.empty:
+                rows = future_rows(merged_df, [data])
+            prob[i] = _positive_proba(model, rolado.extend(rows))[0]
+            vendedoras = [c for c, p, t in zip(company_classes, prob[i], limiares) if p >= t]
+
+    return pd.DataFrame(prob, index=datas, columns=list(company_classes))
+
+
+def _positive_proba(model, linhas: pd.DataFrame) -> np.ndarray:
+    X = align_features(model, linhas.drop(columns=['empresas_vendedoras', 'date'], errors='ignore'))
+    if hasattr(model, "predict_proba_matrix"):
+        return model.predict_proba_matrix(X)
+    # predict_proba do MultiOutputClassifier: lista (uma por empresa) de arrays (n_datas, 2)
+    return np.column_stack([p[:, 1] for p in model.predict_proba(X)])
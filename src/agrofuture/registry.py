@@ -0,0 +1,277 @@
+"""
+Registro dos modelos treinados em `outputs/models`.
+
+Um índice (`registry.json`) lista cada modelo pelo seu id (nome do pacote,
+ex.: `xgboost_model_20241105120000`) com data de criação, backend, métricas
+de teste (`final_report["test_performance"]`), hash do conjunto de features
+e a identificação dos dados de treino. Apelidos apontam para ids:
+
+    latest       sempre o modelo mais recente (implícito)
+    production   ou qualquer outro nome, definido com `set_alias`
+
+Fixar ou reverter um modelo é só mover um apelido (`agrofuture models alias
+production <id>`); previsões aceitam um id ou apelido (`--model`).
+
+`ModelRegistry.load` mantém um cache LRU limitado dos modelos já
+desserializados, por id, para processos de longa duração que alternam entre
+poucos modelos. Cada entrada guarda o mtime do manifesto (ou do `.joblib`):
+um modelo regravado com o mesmo id, por este ou outro processo, é relido em
+vez de servido do cache.
+"""
+
+import hashlib
+import json
+import os
+from collections import OrderedDict
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+
+from agrofuture.bundle import MANIFEST_FILE, is_bundle
+
+REGISTRY_FILE = "registry.json"
+REGISTRY_VERSION = 1
+LATEST = "latest"
+MODEL_GLOB = "xgboost_model_*"
+DEFAULT_CACHE_SIZE = 4
+
+
+def feature_set_hash(feature_names: Sequence[str]) -> str:
+    """Hash curto dos nomes e da ordem das features (modelos comparáveis têm o mesmo)"""
+    return hashlib.sha256("\n".join(feature_names).encode("utf-8")).hexdigest()[:16]
+
+
+def model_entry(model_file: Union[str, Path], metrics: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    Entrada do índice para um pacote de modelo (ou `.joblib` antigo)
+
+    Args:
+        model_file: Pacote (diretório) ou arquivo `.joblib`
+        metrics: Métricas de teste; padrão: as do manifesto do pacote
+    """
+    model_file = Path(model_file)
+    entry: Dict[str, Any] = {"file": model_file.name}
+    if is_bundle(model_file):
+        with open(model_file / MANIFEST_FILE, encoding="utf-8") as f:
+            manifest = json.load(f)
+        entry.update(
+            created_at=manifest.get("created_at"),
+            backend=manifest.get("backend"),
+            metrics=manifest.get("metrics", {}),
+            feature_hash=feature_set_hash(manifest.get("feature_names", [])),
+            n_features=len(manifest.get("feature_names", [])),
+            training_data=manifest.get("training_data", {}),
+        )
+    else:
+        # Modelos antigos não têm manifesto: só a data do arquivo é conhecida
+        criado = datetime.fromtimestamp(model_file.stat().st_mtime).isoformat(timespec="seconds")
+        entry.update(created_at=criado, backend=None, metrics={}, feature_hash=None,
+                     n_features=None, training_data={})
+    if metrics is not None:
+        entry["metrics"] = {k: float(v) for k, v in metrics.items()}
+    return entry
+
+
+def model_id(model_file: Union[str, Path]) -> str:
+    """Id de um modelo: nome do pacote (ou do `.joblib` sem a extensão)"""
+    model_file = Path(model_file)
+    return model_file.stem if model_file.suffix == ".joblib" else model_file.name
+
+
+class ModelRegistry:
+    """
+    Índice de modelos de um diretório, com apelidos e cache LRU de modelos carregados
+
+    Args:
+        models_dir: Diretório com os pacotes `xgboost_model_*` e o `registry.json`
+        cache_size: Máximo de modelos desserializados mantidos em memória
+    """
+
+    def __init__(self, models_dir: Union[str, Path], cache_size: int = DEFAULT_CACHE_SIZE):
+        self.models_dir = Path(models_dir)
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[str, Tuple[int, Any]]" = OrderedDict()
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.models: Dict[str, Dict[str, Any]] = {}
+        self.aliases: Dict[str, str] = {}
+        self.reload()
+
+    @property
+    def index_file(self) -> Path:
+        return self.models_dir / REGISTRY_FILE
+
+    # ------------------------------------------------------------------
+    # Índice
+    # ------------------------------------------------------------------
+
+    def reload(self) -> None:
+        """Relê o índice do disco (vazio se ainda não existir)"""
+        try:
+            with open(self.index_file, encoding="utf-8") as f:
+                index = json.load(f)
+        except FileNotFoundError:
+            index = {}
+        if index and index.get("version") != REGISTRY_VERSION:
+            raise ValueError(f"Versão de índice incompatível em {self.index_file}")
+        self.models = dict(index.get("models", {}))
+        self.aliases = dict(index.get("aliases", {}))
+
+    def save(self) -> Path:
+        """Grava o índice (arquivo temporário + rename, nunca pela metade)"""
+        self.models_dir.mkdir(parents=True, exist_ok=True)
+        index = {"version": REGISTRY_VERSION, "aliases": self.aliases,
+                 "models": dict(sorted(self.models.items()))}
+        tmp = self.index_file.with_name(f".{REGISTRY_FILE}.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(index, f, indent=2, ensure_ascii=False)
+        os.replace(tmp, self.index_file)
+        return self.index_file
+
+    def register(self, model_file: Union[str, Path], metrics: Optional[Dict[str, Any]] = None,
+                 aliases: Sequence[str] = ()) -> str:
+        """
+        Adiciona (ou atualiza) um modelo no índice e grava o índice
+
+        Args:
+            model_file: Pacote salvo em `models_dir`
+            metrics: Métricas de teste (padrão: as do manifesto)
+            aliases: Apelidos que passam a apontar para este modelo
+
+        Returns:
+            Id do modelo
+        """
+        self.reload()
+        mid = model_id(model_file)
+        self.models[mid] = model_entry(model_file, metrics)
+        self.evict(mid)
+        for alias in aliases:
+            self._check_alias(alias)
+            self.aliases[alias] = mid
+        self.save()
+        return mid
+
+    def sync(self) -> Tuple[List[str], List[str]]:
+        """
+        Alinha o índice ao conteúdo de `models_dir`
+
+        Registra os pacotes (e `.joblib` antigos) ausentes do índice e remove
+        entradas e apelidos cujos arquivos não existem mais.
+
+        Returns:
+            (ids adicionados, ids removidos)
+        """
+        self.reload()
+        arquivos = {model_id(p): p for p in self.models_dir.glob(MODEL_GLOB)
+                    if p.suffix == ".joblib" or is_bundle(p)}
+        adicionados = sorted(set(arquivos) - set(self.models))
+        removidos = sorted(set(self.models) - set(arquivos))
+        for mid in adicionados:
+            self.models[mid] = model_entry(arquivos[mid])
+        for mid in removidos:
+            del self.models[mid]
+            self.evict(mid)
+        self.aliases = {a: mid for a, mid in self.aliases.items() if mid in self.models}
+        if adicionados or removidos:
+            self.save()
+        return adicionados, removidos
+
+    def _check_alias(self, alias: str) -> None:
+        if alias == LATEST:
+            raise ValueError(f"'{LATEST}' é reservado (sempre o modelo mais recente)")
+        if alias in self.models:
+            raise ValueError(f"'{alias}' é o id de um modelo, não pode ser apelido")
+
+    def set_alias(self, alias: str, ref: str) -> str:
+        """Aponta `alias` para o modelo `ref` (id ou outro apelido); retorna o id"""
+        self.reload()
+        self._check_alias(alias)
+        mid = self.resolve(ref)
+        self.aliases[alias] = mid
+        self.save()
+        return mid
+
+    def remove_alias(self, alias: str) -> None:
+        self.reload()
+        if self.aliases.pop(alias, None) is None:
+            raise KeyError(f"Apelido desconhecido: {alias}")
+        self.save()
+
+    # ------------------------------------------------------------------
+    # Consulta
+    # ------------------------------------------------------------------
+
+    def list_models(self) -> List[Tuple[str, Dict[str, Any]]]:
+        """Modelos do mais recente para o mais antigo"""
+        return sorted(self.models.items(), key=lambda item: (item[1].get("created_at") or "", item[0]), reverse=True)
+
+    def aliases_of(self, mid: str) -> List[str]:
+        nomes = [a for a, alvo in sorted(self.aliases.items()) if alvo == mid]
+        if self.models and mid == self.list_models()[0][0]:
+            nomes.insert(0, LATEST)
+        return nomes
+
+    def resolve(self, ref: str = LATEST) -> str:
+        """
+        Id do modelo apontado por `ref` (id, apelido ou "latest")
+
+        Raises:
+            FileNotFoundError: "latest" sem nenhum modelo registrado
+            KeyError: id ou apelido desconhecido
+        """
+        if ref == LATEST:
+            if not self.models:
+                raise FileNotFoundError(f"Nenhum modelo registrado em: {self.models_dir}")
+            return self.list_models()[0][0]
+        if ref in self.aliases:
+            return self.aliases[ref]
+        if ref in self.models:
+            return ref
+        raise KeyError(f"Modelo ou apelido desconhecido: {ref}")
+
+    def path(self, ref: str = LATEST) -> Path:
+        """Caminho do pacote (ou `.joblib`) apontado por `ref`"""
+        return self.models_dir / self.models[self.resolve(ref)]["file"]
+
+    def load(self, ref: str = LATEST) -> Tuple[Any, Path]:
+        """
+        Modelo apontado por `ref`, reaproveitando o cache LRU quando possível
+
+        Returns:
+            (modelo, caminho do pacote)
+        """
+        from agrofuture.predictor import load_model, model_stamp_file
+
+        mid = self.resolve(ref)
+        caminho = self.models_dir / self.models[mid]["file"]
+        carimbo = model_stamp_file(caminho).stat().st_mtime_ns
+        if mid in self._cache and self._cache[mid][0] == carimbo:
+            self._cache.move_to_end(mid)
+            self.cache_hits += 1
+            return self._cache[mid][1], caminho
+        self.cache_misses += 1
+        model = load_model(caminho)
+        if self.cache_size > 0:
+            self._cache[mid] = (carimbo, model)
+            self._cache.move_to_end(mid)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return model, caminho
+
+    def evict(self, mid: Optional[str] = None) -> None:
+        """Remove `mid` do cache (ou esvazia o cache)"""
+        if mid is None:
+            self._cache.clear()
+        else:
+            self._cache.pop(mid, None)
+
+    def cached(self) -> List[str]:
+        """Ids em cache, do menos para o mais recentemente usado"""
+        return list(self._cache)
+
+
+def open_registry(models_dir: Union[str, Path], cache_size: int = DEFAULT_CACHE_SIZE) -> ModelRegistry:
+    """Registro de `models_dir` já sincronizado com os arquivos presentes"""
+    registry = ModelRegistry(models_dir, cache_size=cache_size)
+    registry.sync()
+    return registry
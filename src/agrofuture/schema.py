@@ -0,0 +1,246 @@
+"""
+Schema compacto das planilhas de transações e de mercado.
+
+Aplicado na carga (`load_data`) e garantido novamente em `merge_data`:
+
+- colunas de texto de baixa cardinalidade viram `category`; as chaves do
+  join (produto, cidade e estado de origem) usam o mesmo dicionário nas duas
+  tabelas, então o merge e os agrupamentos trabalham sobre os códigos;
+- ids inteiros são reduzidos ao menor inteiro que os comporta (ids em texto
+  viram categorias, isto é, códigos inteiros);
+- preços, quantidades e CBOT passam a float32 só quando todos os valores
+  voltam idênticos ao arredondar para `FLOAT32_DECIMALS` casas (centavos);
+  valores grandes, em que o passo do float32 passa de meio centavo, mantêm a
+  coluna em float64 (as features continuam calculadas em float64).
+
+As categorias são ordenadas, de modo que ordenar por uma coluna categórica
+dá a mesma ordem que ordenar pelo texto. Aplicar o schema duas vezes não muda
+nada.
+"""
+
+import sys
+from typing import Dict, Iterable, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+# Nomes em minúsculas; a correspondência ignora maiúsculas/minúsculas
+JOIN_KEYS = ("product", "origin_city", "origin_state")
+CATEGORY_COLUMNS = ("time", "company", "destination_city", "destination_state") + JOIN_KEYS
+ID_COLUMNS = ("seller id", "buyer id")
+FLOAT32_COLUMNS = ("price", "amount", "cbot", "dolar")
+
+# Casas decimais que precisam sobreviver à conversão float64 -> float32
+FLOAT32_DECIMALS = 2
+
+_MB = 2 ** 20
+
+
+def apply_schema(transacoes: pd.DataFrame, mercado: pd.DataFrame) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Converte as duas tabelas para o schema compacto (altera os DataFrames recebidos)
+
+    Returns:
+        (transacoes, mercado)
+    """
+    for coluna in JOIN_KEYS:
+        a, b = _find(transacoes, coluna), _find(mercado, coluna)
+        if a is not None and b is not None:
+            dtype = shared_categories(transacoes[a], mercado[b])
+            transacoes[a] = _as_category(transacoes[a], dtype)
+            mercado[b] = _as_category(mercado[b], dtype)
+
+    return compact_table(transacoes), compact_table(mercado)
+
+
+def compact_table(df: pd.DataFrame) -> pd.DataFrame:
+    """Aplica as regras do schema a uma tabela isolada (altera e devolve `df`)"""
+    for coluna in CATEGORY_COLUMNS:
+        nome = _find(df, coluna)
+        if nome is not None and not isinstance(df[nome].dtype, pd.CategoricalDtype):
+            df[nome] = _as_category(df[nome], shared_categories(df[nome]))
+    for coluna in ID_COLUMNS:
+        nome = _find(df, coluna)
+        if nome is not None:
+            df[nome] = compact_ids(df[nome])
+    for coluna in FLOAT32_COLUMNS:
+        nome = _find(df, coluna)
+        if nome is not None:
+            df[nome] = compact_float(df[nome])
+    return df
+
+
+class SchemaAccumulator:
+    """
+    Decide o schema compacto de uma tabela lida em partes
+
+    Categorias, faixa dos ids e a viabilidade de float32 são acumuladas com
+    `observe` sobre todas as partes; `apply` dá a cada parte os mesmos dtypes
+    que `compact_table` daria à tabela inteira.
+
+    Args:
+        shared: Valores extras por coluna categórica (ex.: as chaves do mercado,
+            para que o dicionário das chaves seja o mesmo nas duas tabelas)
+    """
+
+    def __init__(self, shared: Optional[Dict[str, Iterable]] = None):
+        self._categorias: Dict[str, set] = {}
+        self._ids: Dict[str, Optional[Tuple[int, int]]] = {}
+        self._float32: Dict[str, bool] = {}
+        self._shared = {coluna: set(valores) for coluna, valores in (shared or {}).items()}
+
+    def observe(self, df: pd.DataFrame) -> None:
+        for coluna in CATEGORY_COLUMNS:
+            nome = _find(df, coluna)
+            if nome is not None:
+                self._categorias.setdefault(nome, set()).update(_distinct(df[nome]))
+        for coluna in ID_COLUMNS:
+            nome = _find(df, coluna)
+            if nome is None:
+                continue
+            serie = df[nome]
+            if serie.dtype == object or isinstance(serie.dtype, pd.CategoricalDtype):
+                self._categorias.setdefault(nome, set()).update(_distinct(serie))
+            elif pd.api.types.is_integer_dtype(serie.dtype) and self._ids.get(nome, ()) is not None:
+                if len(serie):
+                    faixa = (int(serie.min()), int(serie.max()))
+                    anterior = self._ids.get(nome) or faixa
+                    self._ids[nome] = (min(anterior[0], faixa[0]), max(anterior[1], faixa[1]))
+            else:
+                # Ids com NaN ou não inteiros ficam como vieram
+                self._ids[nome] = None
+        for coluna in FLOAT32_COLUMNS:
+            nome = _find(df, coluna)
+            if nome is not None and self._float32.get(nome, True):
+                serie = pd.to_numeric(df[nome], errors="coerce").astype(np.float64)
+                self._float32[nome] = compact_float(serie) is not serie
+
+    def dtypes(self) -> Dict[str, object]:
+        tipos: Dict[str, object] = {}
+        for nome, valores in self._categorias.items():
+            valores = valores | self._shared.get(nome.lower(), set())
+            tipos[nome] = pd.CategoricalDtype(pd.Index(sorted(valores)))
+        for nome, faixa in self._ids.items():
+            if faixa is not None:
+                tipos[nome] = pd.to_numeric(pd.Series(faixa), downcast="integer").dtype
+        for nome, ok in self._float32.items():
+            if ok:
+                tipos[nome] = np.dtype(np.float32)
+        return tipos
+
+    def apply(self, df: pd.DataFrame, dtypes: Optional[Dict[str, object]] = None) -> pd.DataFrame:
+        tipos = self.dtypes() if dtypes is None else dtypes
+        return df.astype({nome: tipo for nome, tipo in tipos.items() if nome in df.columns})
+
+
+def shared_categories(*series: pd.Series) -> pd.CategoricalDtype:
+    """Dicionário único (ordenado) com os valores de todas as séries"""
+    valores = [
+        s.cat.categories if isinstance(s.dtype, pd.CategoricalDtype) else pd.Index(s.dropna().unique())
+        for s in series
+    ]
+    categorias = valores[0]
+    for outro in valores[1:]:
+        categorias = categorias.union(outro)
+    return pd.CategoricalDtype(categorias.sort_values())
+
+
+def compact_float(serie: pd.Series, decimals: int = FLOAT32_DECIMALS) -> pd.Series:
+    """
+    float32 se o erro de todos os valores fica abaixo de meia unidade da casa
+    `decimals` (valores com até `decimals` casas são recuperados exatamente
+    ao arredondar); senão inalterada
+    """
+    if serie.dtype != np.float64:
+        return serie
+    valores = serie.to_numpy()
+    reduzido = valores.astype(np.float32)
+    if not np.allclose(reduzido, valores, rtol=0, atol=0.5 * 10.0 ** -decimals, equal_nan=True):
+        return serie
+    return pd.Series(reduzido, index=serie.index, name=serie.name)
+
+
+def compact_ids(serie: pd.Series) -> pd.Series:
+    """Ids inteiros no menor tipo inteiro; ids em texto como categorias"""
+    if pd.api.types.is_integer_dtype(serie.dtype):
+        return pd.to_numeric(serie, downcast="integer")
+    if serie.dtype == object:
+        return _as_category(serie, shared_categories(serie))
+    return serie
+
+
+def align_categories(left: pd.DataFrame, right: pd.DataFrame, columns: Iterable[str]) -> None:
+    """
+    Garante o mesmo dicionário nas colunas de junção das duas tabelas
+
+    Sem isso o merge de categorias diferentes cai para comparação de texto.
+    Colunas que não são categóricas em nenhum dos lados ficam como estão.
+    """
+    for coluna in columns:
+        a, b = left[coluna], right[coluna]
+        if not (isinstance(a.dtype, pd.CategoricalDtype) or isinstance(b.dtype, pd.CategoricalDtype)):
+            continue
+        if a.dtype == b.dtype:
+            continue
+        dtype = shared_categories(a, b)
+        left[coluna] = _as_category(a, dtype)
+        right[coluna] = _as_category(b, dtype)
+
+
+def memory_report(df: pd.DataFrame) -> Dict[str, float]:
+    """
+    Memória de `df` no schema atual e estimativa da mesma tabela sem o schema
+
+    A estimativa (texto como objetos Python, floats em float64 e inteiros em
+    int64) é calculada a partir dos códigos, sem materializar as strings.
+
+    Returns:
+        {"compact_mb", "legacy_mb", "saved_mb", "saved_pct"}
+    """
+    atual = int(df.memory_usage(index=False, deep=True).sum())
+    legado = sum(_legacy_nbytes(df[coluna]) for coluna in df.columns)
+    return {
+        "compact_mb": round(atual / _MB, 2),
+        "legacy_mb": round(legado / _MB, 2),
+        "saved_mb": round((legado - atual) / _MB, 2),
+        "saved_pct": round(100 * (1 - atual / legado), 1) if legado else 0.0,
+    }
+
+
+def format_memory_report(relatorio: Dict[str, float]) -> str:
+    return (f"{relatorio['legacy_mb']:.2f} MB -> {relatorio['compact_mb']:.2f} MB "
+            f"(-{relatorio['saved_mb']:.2f} MB, {relatorio['saved_pct']:.1f}%)")
+
+
+def _find(df: pd.DataFrame, coluna: str) -> Optional[str]:
+    for nome in df.columns:
+        if isinstance(nome, str) and nome.lower() == coluna:
+            return nome
+    return None
+
+
+def _distinct(serie: pd.Series) -> Iterable:
+    if isinstance(serie.dtype, pd.CategoricalDtype):
+        return serie.cat.remove_unused_categories().cat.categories
+    return serie.dropna().unique()
+
+
+def _as_category(serie: pd.Series, dtype: pd.CategoricalDtype) -> pd.Series:
+    if serie.dtype == dtype:
+        return serie
+    if isinstance(serie.dtype, pd.CategoricalDtype):
+        return serie.cat.set_categories(dtype.categories)
+    return serie.astype(dtype)
+
+
+def _legacy_nbytes(serie: pd.Series) -> int:
+    n = len(serie)
+    dtype = serie.dtype
+    if isinstance(dtype, pd.CategoricalDtype):
+        tamanhos = np.array([sys.getsizeof(c) for c in dtype.categories] + [sys.getsizeof(np.nan)], dtype=np.int64)
+        return 8 * n + int(tamanhos[serie.cat.codes.to_numpy()].sum())
+    if dtype == object:
+        return int(serie.memory_usage(index=False, deep=True))
+    if pd.api.types.is_float_dtype(dtype) or pd.api.types.is_integer_dtype(dtype):
+        return 8 * n
+    return int(serie.memory_usage(index=False, deep=True))
@@ -0,0 +1,385 @@
+"""
+Servidor HTTP de previsões (asyncio, somente biblioteca padrão).
+
+Mantém modelo e matriz de features carregados em memória e responde:
+
+    GET  /health                       estado do serviço e contadores
+    GET  /predict?date=YYYY-MM-DD      uma data
+    GET  /predict?start=...&end=...    intervalo de datas
+    POST /predict                      {"dates": [...]} ou {"start": ..., "end": ...}
+
+Requisições concorrentes são agrupadas em micro-lotes: as datas de todas as
+requisições que chegam dentro de `max_wait` segundos viram uma única chamada
+a `predict_proba`. Um vigia verifica periodicamente o registro de modelos
+(`agrofuture.registry`) e troca o modelo quando o id ou apelido servido
+(padrão: "latest") passa a apontar para outro pacote; os modelos já
+carregados ficam no cache LRU do registro, então voltar a um modelo
+anterior (rollback) não o desserializa de novo.
+"""
+
+import asyncio
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+import pandas as pd
+
+from agrofuture.feature_store import FeatureStore
+from agrofuture.predictor import future_feature_rows, model_company_classes, model_stamp_file, predict_dates
+from agrofuture.registry import LATEST, ModelRegistry
+
+MAX_BODY_BYTES = 1 << 20
+MAX_DATES_PER_REQUEST = 3660
+
+
+class PredictionService:
+    """
+    Estado residente do servidor: modelo atual, features e linhas futuras já calculadas.
+
+    Todos os métodos são síncronos e devem ser chamados de uma única thread
+    (o servidor usa um executor com um worker), o que dispensa travas.
+
+    Args:
+        models_dir: Diretório com os pacotes `xgboost_model_*`
+        merged_df: Dados históricos (saída de `merge_data`)
+        store: Feature store sincronizado com `merged_df`
+        model_ref: Id ou apelido do modelo servido (ex.: "production")
+        cache_size: Modelos mantidos carregados no cache LRU do registro
+    """
+
+    def __init__(self, models_dir: Path, merged_df: pd.DataFrame, store: FeatureStore,
+                 model_ref: str = LATEST, cache_size: int = 2):
+        self.models_dir = Path(models_dir)
+        self.model_ref = model_ref
+        self.registry = ModelRegistry(self.models_dir, cache_size=cache_size)
+        self.merged_df = merged_df
+        self.store = store
+        self.df_features = store.features()
+        self.company_classes: List[str] = []
+        self.first_date = self.df_features["date"].min()
+        self.last_known_date = pd.to_datetime(merged_df["date"]).max()
+        self.available = set(self.df_features["date"])
+        self.future_dates = set()
+        self.model = None
+        self.model_file: Optional[Path] = None
+        self._model_mtime = None
+        self.reloads = 0
+        if not self.reload_model():
+            raise FileNotFoundError(f"Nenhum modelo '{self.model_ref}' encontrado em: {self.models_dir}")
+
+    def reload_model(self) -> bool:
+        """Carrega o modelo apontado por `model_ref` se ele mudou; retorna True quando troca"""
+        try:
+            self.registry.sync()
+            mid = self.registry.resolve(self.model_ref)
+            model_file = self.registry.path(mid)
+            mtime = model_stamp_file(model_file).stat().st_mtime_ns
+        except (OSError, KeyError, ValueError) as e:
+            if self.model is None:
+                print(f"⚠️ {e}")
+            return False
+        if model_file == self.model_file and mtime == self._model_mtime:
+            return False
+
+        try:
+            model, _ = self.registry.load(mid)
+            if hasattr(model, "boosters"):
+                model.boosters  # lê os boosters do pacote já na troca, não na primeira requisição
+        except Exception as e:
+            # Arquivo ainda sendo gravado ou corrompido: mantém o modelo atual
+            print(f"⚠️ Falha ao carregar {model_file.name}: {e}")
+            return False
+        self.company_classes = model_company_classes(model, self.df_features)
+        self.model, self.model_file, self._model_mtime = model, model_file, mtime
+        self.reloads += 1
+        print(f"🔄 Modelo carregado: {model_file.name}")
+        return True
+
+    def _ensure_future(self, dates: Iterable[pd.Timestamp]) -> None:
+        novas = sorted(d for d in dates if d > self.last_known_date and d not in self.future_dates)
+        if not novas:
+            return
+        linhas = future_feature_rows(self.store, self.merged_df, novas)
+        self.df_features = pd.concat([self.df_features, linhas], ignore_index=True)
+        self.future_dates.update(novas)
+        self.available.update(novas)
+
+    def predict(self, dates: Iterable[pd.Timestamp]) -> Tuple[Dict[pd.Timestamp, dict], str]:
+        """
+        Previsões para um conjunto de datas com uma única chamada ao modelo
+
+        Returns:
+            (data -> {"tipo", "probabilidades"[, "vendas_previstas"]}, nome do modelo usado);
+            "vendas_previstas" lista as empresas acima do threshold salvo no pacote
+            do modelo
+        """
+        dates = set(dates)
+        self._ensure_future(dates)
+        validas = sorted(d for d in dates if d in self.available)
+        model, model_file, company_classes = self.model, self.model_file, self.company_classes
+        if not validas:
+            return {}, model_file.name
+
+        results = predict_dates(model, self.df_features, validas, self.future_dates,
+                                company_classes=company_classes)
+        n_empresas = len(company_classes)
+        empresas = results["Empresa"].to_numpy()
+        probs = results["Probabilidade (%)"].to_numpy(dtype=float)
+        tipos = results["Tipo"].to_numpy()
+        vendas = results["Venda Prevista"].to_numpy(dtype=bool) if "Venda Prevista" in results else None
+        saida = {}
+        for i, data in enumerate(validas):
+            bloco = slice(i * n_empresas, (i + 1) * n_empresas)
+            saida[data] = {
+                "tipo": tipos[bloco.start],
+                "probabilidades": dict(zip(empresas[bloco], probs[bloco].round(4).tolist())),
+            }
+            if vendas is not None:
+                saida[data]["vendas_previstas"] = empresas[bloco][vendas[bloco]].tolist()
+        return saida, model_file.name
+
+
+class MicroBatcher:
+    """
+    Agrupa requisições concorrentes em uma única chamada ao serviço.
+
+    Args:
+        service: Serviço de previsão
+        executor: Executor (um worker) onde o serviço é executado
+        max_batch: Número máximo de datas por micro-lote
+        max_wait: Tempo máximo (s) aguardando mais requisições para o lote
+    """
+
+    def __init__(self, service: PredictionService, executor: ThreadPoolExecutor,
+                 max_batch: int = 512, max_wait: float = 0.005):
+        self.service = service
+        self.executor = executor
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self.batches = 0
+        self.requests = 0
+
+    async def submit(self, dates: List[pd.Timestamp]) -> Tuple[Dict[pd.Timestamp, dict], str]:
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((dates, future))
+        return await future
+
+    async def run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            lote = [await self.queue.get()]
+            n_datas = len(lote[0][0])
+            prazo = loop.time() + self.max_wait
+            while n_datas < self.max_batch:
+                restante = prazo - loop.time()
+                if restante <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self.queue.get(), restante)
+                except asyncio.TimeoutError:
+                    break
+                lote.append(item)
+                n_datas += len(item[0])
+
+            datas = set()
+            for dates, _ in lote:
+                datas.update(dates)
+            try:
+                resultado, modelo = await loop.run_in_executor(self.executor, self.service.predict, datas)
+            except Exception as e:
+                for _, future in lote:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            self.batches += 1
+            self.requests += len(lote)
+            for dates, future in lote:
+                if not future.done():
+                    future.set_result(({d: resultado[d] for d in dates if d in resultado}, modelo))
+
+
+class PredictionServer:
+    """
+    Servidor HTTP/1.1 mínimo (keep-alive, JSON) sobre `asyncio.start_server`.
+
+    Args:
+        service: Serviço de previsão já carregado
+        host, port: Endereço de escuta (porta 0 escolhe uma porta livre)
+        poll_interval: Intervalo (s) entre verificações de novos modelos
+        max_batch, max_wait: Parâmetros do micro-lote
+    """
+
+    def __init__(self, service: PredictionService, host: str = "0.0.0.0", port: int = 8000,
+                 poll_interval: float = 5.0, max_batch: int = 512, max_wait: float = 0.005):
+        self.service = service
+        self.host = host
+        self.port = port
+        self.poll_interval = poll_interval
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="agrofuture-predict")
+        self.batcher = MicroBatcher(service, self.executor, max_batch=max_batch, max_wait=max_wait)
+        self.started = time.time()
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._tasks: List[asyncio.Task] = []
+
+    async def start(self) -> None:
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        self._tasks = [asyncio.create_task(self.batcher.run()),
+                       asyncio.create_task(self._watch_models())]
+
+    async def serve_forever(self) -> None:
+        await self.start()
+        print(f"🚀 Servidor de previsões em http://{self.host}:{self.port}")
+        try:
+            await self._server.serve_forever()
+        finally:
+            await self.stop()
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        self.executor.shutdown(wait=False)
+
+    async def _watch_models(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            await loop.run_in_executor(self.executor, self.service.reload_model)
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                request = await _read_request(reader)
+                if request is None:
+                    break
+                method, target, headers, body = request
+                status, payload = await self._dispatch(method, target, body)
+                keep_alive = headers.get("connection", "").lower() != "close"
+                _write_response(writer, status, payload, keep_alive)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        except ValueError:
+            _write_response(writer, HTTPStatus.BAD_REQUEST, {"erro": "requisição malformada"}, False)
+        finally:
+            writer.close()
+
+    async def _dispatch(self, method: str, target: str, body: bytes) -> Tuple[HTTPStatus, dict]:
+        url = urlsplit(target)
+        if url.path == "/health" and method == "GET":
+            return HTTPStatus.OK, self._health()
+        if url.path != "/predict":
+            return HTTPStatus.NOT_FOUND, {"erro": f"rota desconhecida: {url.path}"}
+
+        try:
+            if method == "GET":
+                query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+                dates = _parse_dates(query)
+            elif method == "POST":
+                dates = _parse_dates(json.loads(body or b"{}"))
+            else:
+                return HTTPStatus.METHOD_NOT_ALLOWED, {"erro": f"método não suportado: {method}"}
+        except (ValueError, TypeError) as e:
+            return HTTPStatus.BAD_REQUEST, {"erro": str(e)}
+
+        try:
+            resultado, modelo = await self.batcher.submit(dates)
+        except Exception as e:
+            return HTTPStatus.INTERNAL_SERVER_ERROR, {"erro": f"falha na previsão: {e}"}
+        previsoes = [{"data": str(d.date()), **resultado[d]} for d in dates if d in resultado]
+        ausentes = [str(d.date()) for d in dates if d not in resultado]
+        payload = {"modelo": modelo, "previsoes": previsoes}
+        if ausentes:
+            payload["ausentes"] = ausentes
+            payload["datas_disponiveis"] = [str(self.service.first_date.date()), "futuro"]
+            if not previsoes:
+                return HTTPStatus.NOT_FOUND, payload
+        return HTTPStatus.OK, payload
+
+    def _health(self) -> dict:
+        service = self.service
+        return {
+            "status": "ok",
+            "modelo": service.model_file.name if service.model_file else None,
+            "modelo_ref": service.model_ref,
+            "modelos_em_cache": service.registry.cached(),
+            "recargas_modelo": service.reloads,
+            "ultima_data_conhecida": str(service.last_known_date.date()),
+            "datas_futuras_em_cache": len(service.future_dates),
+            "requisicoes": self.batcher.requests,
+            "micro_lotes": self.batcher.batches,
+            "uptime_s": round(time.time() - self.started, 1),
+        }
+
+
+def _parse_dates(params: dict) -> List[pd.Timestamp]:
+    """Datas pedidas em `date`, `dates` ou `start`/`end` (ordenadas, sem repetição)"""
+    if "dates" in params:
+        valores = params["dates"]
+        if isinstance(valores, str):
+            valores = valores.split(",")
+        dates = pd.to_datetime(list(valores))
+    elif "date" in params:
+        dates = pd.to_datetime([params["date"]])
+    elif "start" in params and "end" in params:
+        dates = pd.date_range(pd.to_datetime(params["start"]), pd.to_datetime(params["end"]), freq="D")
+    else:
+        raise ValueError("informe 'date', 'dates' ou 'start' e 'end'")
+    if len(dates) > MAX_DATES_PER_REQUEST:
+        raise ValueError(f"no máximo {MAX_DATES_PER_REQUEST} datas por requisição")
+    return sorted(set(dates.normalize()))
+
+
+async def _read_request(reader: asyncio.StreamReader) -> Optional[Tuple[str, str, Dict[str, str], bytes]]:
+    request_line = await reader.readline()
+    if not request_line:
+        return None
+    parts = request_line.decode("latin-1").split()
+    if len(parts) != 3:
+        raise ValueError("linha de requisição inválida")
+    method, target, _ = parts
+
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+
+    length = int(headers.get("content-length", 0) or 0)
+    if length > MAX_BODY_BYTES:
+        raise ValueError("corpo da requisição muito grande")
+    body = await reader.readexactly(length) if length else b""
+    return method.upper(), target, headers, body
+
+
+def _write_response(writer: asyncio.StreamWriter, status: HTTPStatus, payload: dict, keep_alive: bool) -> None:
+    body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+    head = (
+        f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+        "Content-Type: application/json; charset=utf-8\r\n"
+        f"Content-Length: {len(body)}\r\n"
+        f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+    )
+    writer.write(head.encode("latin-1") + body)
+
+
+def run_server(service: PredictionService, host: str = "0.0.0.0", port: int = 8000, **kwargs) -> None:
+    """Inicia o servidor e bloqueia até Ctrl+C"""
+    server = PredictionServer(service, host=host, port=port, **kwargs)
+    try:
+        asyncio.run(server.serve_forever())
+    except KeyboardInterrupt:
+        print("\n🛑 Servidor encerrado")
@@ -0,0 +1,238 @@
+"""
+Ingestão em streaming de históricos de transações maiores que a memória.
+
+O arquivo de transações (CSV, Parquet ou xlsx via openpyxl em modo
+read-only) é lido em lotes e processado em duas passadas:
+
+1. cada lote tem as colunas padronizadas e é gravado em partições Parquet
+   temporárias por período (mês, por padrão), enquanto o schema compacto e
+   a contagem de produtos são acumulados;
+2. as partições são lidas em ordem cronológica, recebem os dtypes finais,
+   são juntadas ao mercado indexado em memória (`MarketIndex`) e entram no
+   feature store com `update_features`, que reduz as transações direto às
+   agregações diárias e guarda só o estado das janelas móveis.
+
+O histórico do store vai para o disco após cada partição, então o pico de
+memória é dado pela maior partição e pelas matrizes dias × empresas do store,
+não pelo total de transações. Os produtos das colunas `pct_produto_*` são
+fixados a partir da contagem completa da primeira passada, o que evita
+reconstruções no meio da ingestão.
+"""
+
+import shutil
+import tempfile
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional, Tuple, Union
+
+import pandas as pd
+
+from agrofuture.data_loader import prepare_market
+from agrofuture.feature_store import FeatureStore
+from agrofuture.fx_rates import RateSource
+from agrofuture.instrumentation import span, traced
+from agrofuture.market_index import MarketIndex, Staleness
+from agrofuture.schema import JOIN_KEYS, SchemaAccumulator, compact_table
+
+SUPPORTED_FORMATS = (".csv", ".parquet", ".xlsx")
+DEFAULT_CHUNK_ROWS = 100_000
+
+
+def iter_chunks(path: Union[str, Path], chunk_rows: int = DEFAULT_CHUNK_ROWS) -> Iterator[pd.DataFrame]:
+    """
+    Lê um arquivo de transações em lotes de até `chunk_rows` linhas
+
+    Args:
+        path: Arquivo .csv, .parquet ou .xlsx (primeira planilha, cabeçalho na primeira linha)
+        chunk_rows: Linhas por lote
+    """
+    path = Path(path)
+    sufixo = path.suffix.lower()
+    if sufixo == ".csv":
+        yield from pd.read_csv(path, chunksize=chunk_rows)
+    elif sufixo == ".parquet":
+        import pyarrow.parquet as pq
+
+        for lote in pq.ParquetFile(path).iter_batches(batch_size=chunk_rows):
+            yield lote.to_pandas()
+    elif sufixo == ".xlsx":
+        yield from _iter_xlsx(path, chunk_rows)
+    else:
+        raise ValueError(f"Formato não suportado: {path.name} (use {', '.join(SUPPORTED_FORMATS)})")
+
+
+def _iter_xlsx(path: Path, chunk_rows: int) -> Iterator[pd.DataFrame]:
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        linhas = workbook.worksheets[0].iter_rows(values_only=True)
+        cabecalho = next(linhas, None)
+        if cabecalho is None:
+            return
+        lote = []
+        for linha in linhas:
+            lote.append(linha)
+            if len(lote) >= chunk_rows:
+                yield _parse_rows(cabecalho, lote)
+                lote = []
+        if lote:
+            yield _parse_rows(cabecalho, lote)
+    finally:
+        workbook.close()
+
+
+def _parse_rows(cabecalho, linhas) -> pd.DataFrame:
+    """Mesma inferência de tipos de `pd.read_excel` (ex.: ids gravados como texto viram inteiros)"""
+    from pandas.io.parsers import TextParser
+
+    return TextParser([list(cabecalho)] + linhas, header=0).read()
+
+
+@traced(shape=False)
+def stream_to_feature_store(transacoes_path: Union[str, Path], mercado: pd.DataFrame,
+                            store_path: Union[str, Path], chunk_rows: int = DEFAULT_CHUNK_ROWS,
+                            partition_freq: str = "M", spill_dir: Optional[Union[str, Path]] = None,
+                            rate_source: Optional[RateSource] = None, append: bool = False,
+                            asof: bool = False, max_staleness: Staleness = None) -> Tuple[FeatureStore, Dict[str, Any]]:
+    """
+    Constrói (ou estende) o feature store em `store_path` lendo as transações em lotes
+
+    Args:
+        transacoes_path: Arquivo de transações (.csv, .parquet ou .xlsx)
+        mercado: Tabela de mercado como lida da planilha (cabe em memória)
+        store_path: Diretório do feature store
+        chunk_rows: Linhas lidas por lote
+        partition_freq: Período das partições temporárias ("M", "W", "D"...);
+            menor período, menor pico de memória
+        spill_dir: Onde criar as partições temporárias (padrão: diretório temporário do sistema)
+        rate_source: Fonte das cotações USD-BRL por data
+        append: Acrescenta a um store existente em vez de reconstruí-lo
+        asof, max_staleness: Modo do join com o mercado (ver `merge_data`)
+
+    Returns:
+        (store, relatório da ingestão)
+    """
+    relatorio: Dict[str, Any] = {"source": Path(transacoes_path).name, "chunk_rows": chunk_rows,
+                                 "partition_freq": partition_freq, "chunks": 0, "rows": 0,
+                                 "rows_without_date": 0, "partitions": 0, "max_partition_rows": 0}
+    mercado = prepare_market(compact_table(mercado), rate_source)
+    schema = SchemaAccumulator(shared={k: _distinct(mercado[k]) for k in JOIN_KEYS})
+    contagem_produtos = pd.Series(dtype="int64")
+
+    temporario = Path(tempfile.mkdtemp(prefix="agrofuture-spill-", dir=spill_dir))
+    particoes = _PartitionWriter(temporario)
+    try:
+        # 1ª passada: lotes -> partições por período
+        with span("spill_chunks") as s:
+            for i, lote in enumerate(iter_chunks(transacoes_path, chunk_rows)):
+                lote.columns = [str(col).lower() for col in lote.columns]
+                lote["date"] = pd.to_datetime(lote["date"])
+                sem_data = lote["date"].isna()
+                relatorio["rows_without_date"] += int(sem_data.sum())
+                lote = lote[~sem_data]
+                relatorio["chunks"] += 1
+                relatorio["rows"] += len(lote)
+                schema.observe(lote)
+                contagem_produtos = contagem_produtos.add(lote["product"].value_counts(), fill_value=0)
+                periodos = lote["date"].dt.to_period(partition_freq).dt.start_time.dt.strftime("%Y%m%d")
+                for periodo, parte in lote.groupby(periodos.to_numpy(), sort=False):
+                    particoes.write(periodo, parte)
+            particoes.close()
+            s.set(chunks=relatorio["chunks"], rows=relatorio["rows"])
+
+        # Dicionários finais: chaves com o mesmo dicionário nas duas tabelas
+        dtypes = schema.dtypes()
+        for chave in JOIN_KEYS:
+            if chave in dtypes:
+                mercado[chave] = mercado[chave].astype(object).astype(dtypes[chave])
+        indice = MarketIndex(mercado)
+
+        store = _open_store(store_path, append, contagem_produtos)
+
+        # 2ª passada: partições em ordem -> join -> feature store
+        with span("ingest_partitions") as s:
+            for particao in sorted(p for p in temporario.iterdir() if p.is_dir()):
+                transacoes = schema.apply(pd.read_parquet(particao), dtypes)
+                merged = indice.join(transacoes, asof=asof, max_staleness=max_staleness)
+                store.update_features(merged)
+                store.save()
+                relatorio["partitions"] += 1
+                relatorio["max_partition_rows"] = max(relatorio["max_partition_rows"], len(merged))
+                del transacoes, merged
+            s.set(partitions=relatorio["partitions"])
+    finally:
+        particoes.close()
+        shutil.rmtree(temporario, ignore_errors=True)
+
+    relatorio.update({"days": len(store.daily) if store.daily is not None else 0,
+                      "companies": len(store.companies), "rebuilds": store.rebuilds,
+                      "incremental_updates": store.incremental_updates})
+    return store, relatorio
+
+
+class _PartitionWriter:
+    """
+    Grava as partes de cada período em um diretório por período
+
+    Cada período mantém um arquivo Parquet aberto e recebe as partes como
+    novos row groups (poucos arquivos mesmo com entrada fora de ordem). Uma
+    parte com tipos incompatíveis com o arquivo aberto, ou um período cujo
+    arquivo foi fechado por excesso de arquivos abertos, começa um arquivo novo.
+    """
+
+    def __init__(self, root: Path, max_open: int = 128):
+        self.root = root
+        self.max_open = max_open
+        self._abertos: "OrderedDict[str, Any]" = OrderedDict()
+        self._arquivos: Dict[str, int] = {}
+
+    def write(self, periodo: str, parte: pd.DataFrame) -> None:
+        import pyarrow as pa
+
+        tabela = pa.Table.from_pandas(parte, preserve_index=False)
+        writer = self._abertos.get(periodo)
+        if writer is not None:
+            self._abertos.move_to_end(periodo)
+            try:
+                writer.write_table(tabela.cast(writer.schema))
+                return
+            except (pa.ArrowInvalid, pa.ArrowNotImplementedError, ValueError):
+                writer.close()
+                del self._abertos[periodo]
+        self._open(periodo, tabela.schema).write_table(tabela)
+
+    def _open(self, periodo: str, schema):
+        import pyarrow.parquet as pq
+
+        if len(self._abertos) >= self.max_open:
+            _, antigo = self._abertos.popitem(last=False)
+            antigo.close()
+        destino = self.root / periodo
+        destino.mkdir(exist_ok=True)
+        n = self._arquivos.get(periodo, 0)
+        self._arquivos[periodo] = n + 1
+        writer = pq.ParquetWriter(destino / f"part-{n:06d}.parquet", schema)
+        self._abertos[periodo] = writer
+        return writer
+
+    def close(self) -> None:
+        while self._abertos:
+            self._abertos.popitem()[1].close()
+
+
+def _open_store(store_path: Union[str, Path], append: bool, contagem_produtos: pd.Series) -> FeatureStore:
+    """Store existente (append) ou novo, com o top de produtos fixado pela contagem completa"""
+    if append:
+        try:
+            return FeatureStore.load(store_path)
+        except (FileNotFoundError, ValueError, EOFError):
+            pass
+    top = contagem_produtos.nlargest(5).index.tolist()
+    return FeatureStore(store_path, pinned_products=top)
+
+
+def _distinct(serie: pd.Series):
+    if isinstance(serie.dtype, pd.CategoricalDtype):
+        return serie.cat.categories
+    return serie.dropna().unique()
@@ -0,0 +1,260 @@
+"""
+Busca de hiperparâmetros do XGBoost com matrizes quantizadas reutilizadas.
+
+Treinar com `XGBClassifier.fit` recalcula os quantis do histograma das
+features a cada empresa, fold e configuração testada. Aqui cada fold da
+validação cruzada temporal vira um par de `xgb.QuantileDMatrix` (treino e
+validação, esta com os cortes do treino) montado uma única vez; as
+configurações e as empresas só trocam o rótulo (`set_label`) e chamam
+`xgb.train` sobre os mesmos bins.
+
+- cada treino usa early stopping na logloss do fold de validação, então o
+  número de árvores também é ajustado;
+- as configurações são avaliadas fold a fold (do menor treino para o maior)
+  em successive halving: após cada fold só a melhor fração, pela logloss
+  média até ali, segue para o fold seguinte;
+- a configuração vencedora é gravada em JSON (`save_tuning_result`) e lida
+  pelo pipeline (`load_tuned_params`), que a repassa a `train_and_validate`.
+
+O número de bins (`max_bin`) define a quantização e, por isso, fica fixo
+durante a busca.
+"""
+
+import json
+import math
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+import xgboost as xgb
+from sklearn.model_selection import TimeSeriesSplit
+
+from agrofuture.feature_engineer import prepare_target
+from agrofuture.instrumentation import span, traced
+from agrofuture.model_trainer import BACKENDS, MULTI_STRATEGY, XGB_PARAMS, temporal_train_test_split
+from agrofuture.parallel import available_threads
+
+TUNED_PARAMS_FILE = "tuned_params.json"
+METRIC = "logloss"
+
+# Espaço de busca: ("choice", valores), ("uniform", min, max) ou ("loguniform", min, max)
+SEARCH_SPACE: Dict[str, tuple] = {
+    "max_depth": ("choice", [3, 4, 5, 6, 8]),
+    "learning_rate": ("loguniform", 0.005, 0.3),
+    "subsample": ("uniform", 0.6, 1.0),
+    "colsample_bytree": ("uniform", 0.5, 1.0),
+    "min_child_weight": ("choice", [1, 2, 5, 10]),
+    "reg_alpha": ("loguniform", 1e-3, 1.0),
+    "reg_lambda": ("loguniform", 0.1, 10.0),
+}
+
+# Nomes do XGBClassifier -> nomes do xgb.train
+_NATIVE_NAMES = {"random_state": "seed", "n_jobs": "nthread", "reg_alpha": "alpha", "reg_lambda": "lambda"}
+
+
+def sample_params(space: Dict[str, tuple], rng: np.random.Generator) -> Dict[str, Any]:
+    """Sorteia uma configuração do espaço de busca"""
+    params: Dict[str, Any] = {}
+    for nome, regra in space.items():
+        tipo = regra[0]
+        if tipo == "choice":
+            valor = regra[1][rng.integers(len(regra[1]))]
+            params[nome] = valor.item() if isinstance(valor, np.generic) else valor
+        elif tipo == "uniform":
+            params[nome] = float(rng.uniform(regra[1], regra[2]))
+        elif tipo == "loguniform":
+            params[nome] = float(math.exp(rng.uniform(math.log(regra[1]), math.log(regra[2]))))
+        else:
+            raise ValueError(f"Regra desconhecida para {nome}: {tipo} (use choice, uniform ou loguniform)")
+    return params
+
+
+class FoldMatrices:
+    """
+    Matrizes quantizadas de um fold, montadas uma vez e compartilhadas por todas as configurações
+
+    Args:
+        X_train, X_val: Features do fold (sem a coluna de data)
+        y_train, y_val: Rótulos multi-label (n_dias, n_empresas)
+        max_bin: Bins do histograma
+    """
+
+    def __init__(self, X_train: pd.DataFrame, y_train: np.ndarray, X_val: pd.DataFrame,
+                 y_val: np.ndarray, max_bin: int = 256):
+        self.y_train = np.asarray(y_train, dtype=np.float32)
+        self.y_val = np.asarray(y_val, dtype=np.float32)
+        self.max_bin = max_bin
+        self.dtrain = xgb.QuantileDMatrix(X_train, max_bin=max_bin)
+        self.dval = xgb.QuantileDMatrix(X_val, ref=self.dtrain)
+
+    def target(self, coluna: Optional[int]) -> None:
+        """Rótulo de uma empresa (`coluna`) ou de todas (None), sem requantizar"""
+        if coluna is None:
+            self.dtrain.set_label(self.y_train)
+            self.dval.set_label(self.y_val)
+        else:
+            self.dtrain.set_label(self.y_train[:, coluna])
+            self.dval.set_label(self.y_val[:, coluna])
+
+
+def native_params(params: Dict[str, Any], n_threads: int) -> Tuple[Dict[str, Any], int]:
+    """
+    Converte parâmetros no formato do XGBClassifier para `xgb.train`
+
+    Returns:
+        (parâmetros do booster, máximo de rodadas)
+    """
+    nativos = {_NATIVE_NAMES.get(k, k): v for k, v in params.items() if k != "n_estimators"}
+    nativos["nthread"] = n_threads
+    nativos["eval_metric"] = METRIC
+    return nativos, int(params.get("n_estimators", XGB_PARAMS["n_estimators"]))
+
+
+def evaluate_fold(matrices: FoldMatrices, params: Dict[str, Any], backend: str,
+                  early_stopping_rounds: int, n_threads: int) -> Tuple[float, int]:
+    """
+    Treina uma configuração em um fold com early stopping
+
+    Returns:
+        (logloss média de validação na melhor rodada, melhor número de árvores)
+    """
+    nativos, rodadas = native_params(params, n_threads)
+    nativos["max_bin"] = matrices.max_bin
+    if backend == "multioutput":
+        alvos: Sequence[Optional[int]] = range(matrices.y_train.shape[1])
+    else:
+        nativos.update(multi_strategy=MULTI_STRATEGY[backend], tree_method="hist")
+        alvos = [None]
+
+    perdas, arvores = [], []
+    for alvo in alvos:
+        matrices.target(alvo)
+        booster = xgb.train(nativos, matrices.dtrain, num_boost_round=rodadas,
+                            evals=[(matrices.dval, "val")], early_stopping_rounds=early_stopping_rounds,
+                            verbose_eval=False)
+        perdas.append(float(booster.best_score))
+        arvores.append(booster.best_iteration + 1)
+    return float(np.mean(perdas)), int(round(np.mean(arvores)))
+
+
+@traced(shape=False)
+def tune_hyperparameters(df_features: pd.DataFrame, n_trials: int = 20, n_splits: int = 5,
+                         test_size: float = 0.2, backend: str = "multioutput",
+                         search_space: Optional[Dict[str, tuple]] = None, max_rounds: int = 1000,
+                         early_stopping_rounds: int = 50, reduction: int = 2, max_bin: int = 256,
+                         seed: int = 242, n_threads: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Busca a melhor configuração do XGBoost na validação cruzada temporal
+
+    Usa os mesmos dados de treino de `train_and_validate` (o conjunto de teste
+    fica de fora). A primeira configuração é sempre a atual (`XGB_PARAMS`).
+
+    Args:
+        df_features: Matriz de features (saída de `create_features`/feature store)
+        n_trials: Configurações avaliadas
+        backend: Backend de treino (ver BACKENDS)
+        search_space: Espaço de busca (padrão: SEARCH_SPACE)
+        max_rounds: Limite de árvores; o early stopping escolhe quantas usar
+        early_stopping_rounds: Rodadas sem melhora na validação antes de parar
+        reduction: Fator do successive halving (mantém 1/reduction após cada fold)
+        max_bin: Bins do histograma (fixo durante a busca)
+        seed: Semente do sorteio das configurações
+        n_threads: Threads do XGBoost (None = núcleos disponíveis)
+
+    Returns:
+        Resultado com "best_params", "best_score", "trials" e tempos
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Backend desconhecido: {backend} (use {BACKENDS})")
+    rng = np.random.default_rng(seed)
+    n_threads = available_threads() if n_threads is None else max(1, int(n_threads))
+
+    y, company_classes = prepare_target(df_features)
+    X = df_features.drop(columns=["empresas_vendedoras"])
+    X_train, y_train, _, _ = temporal_train_test_split(X, y, test_size)  # type: ignore
+    X_train = X_train.drop(columns=["date"])
+
+    inicio = time.perf_counter()
+    with span("tuning_matrices", rows=len(X_train), cols=X_train.shape[1], n_folds=n_splits):
+        folds = [FoldMatrices(X_train.iloc[treino], y_train[treino], X_train.iloc[val], y_train[val], max_bin)
+                 for treino, val in TimeSeriesSplit(n_splits=n_splits).split(X_train)]
+    matrices_s = time.perf_counter() - inicio
+
+    base = {k: v for k, v in XGB_PARAMS.items() if k != "n_estimators"}
+    configuracoes = [dict(base)] + [{**base, **sample_params(search_space or SEARCH_SPACE, rng)}
+                                    for _ in range(max(0, n_trials - 1))]
+    trials: List[Dict[str, Any]] = [
+        {"trial": i, "params": {**params, "n_estimators": max_rounds}, "scores": [], "rounds": [], "pruned_after": None}
+        for i, params in enumerate(configuracoes)
+    ]
+
+    # Successive halving: todas as configurações no fold 1, a melhor fração no fold 2...
+    inicio = time.perf_counter()
+    vivos = list(range(len(trials)))
+    with span("tuning_search", trials=len(trials), backend=backend) as s:
+        for numero, matrices in enumerate(folds, 1):
+            for i in vivos:
+                perda, arvores = evaluate_fold(matrices, trials[i]["params"], backend,
+                                               early_stopping_rounds, n_threads)
+                trials[i]["scores"].append(perda)
+                trials[i]["rounds"].append(arvores)
+            for i in vivos:
+                trials[i]["mean_score"] = float(np.mean(trials[i]["scores"]))
+            if numero < len(folds):
+                vivos.sort(key=lambda i: trials[i]["mean_score"])
+                manter = max(1, math.ceil(len(vivos) / reduction))
+                for i in vivos[manter:]:
+                    trials[i]["pruned_after"] = numero
+                vivos = vivos[:manter]
+        s.set(trained_folds=sum(len(t["scores"]) for t in trials))
+    search_s = time.perf_counter() - inicio
+
+    melhor = min(vivos, key=lambda i: trials[i]["mean_score"])
+    best_params = {**trials[melhor]["params"], "max_bin": max_bin,
+                   "n_estimators": int(round(np.mean(trials[melhor]["rounds"])))}
+    return {
+        "backend": backend,
+        "metric": METRIC,
+        "best_trial": melhor,
+        "best_score": trials[melhor]["mean_score"],
+        "best_params": best_params,
+        # XGB_PARAMS x vencedora nos folds que as duas percorreram
+        "baseline": {"folds": len(trials[0]["scores"]), "score": trials[0]["mean_score"],
+                     "best_score": float(np.mean(trials[melhor]["scores"][:len(trials[0]["scores"])]))},
+        "n_splits": n_splits,
+        "max_bin": max_bin,
+        "reduction": reduction,
+        "early_stopping_rounds": early_stopping_rounds,
+        "target_names": list(company_classes),
+        "trials": trials,
+        "timings": {"matrices_s": round(matrices_s, 3), "search_s": round(search_s, 3)},
+    }
+
+
+def save_tuning_result(result: Dict[str, Any], path: Union[str, Path]) -> Path:
+    """Grava o resultado da busca em JSON"""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(result, f, indent=2, ensure_ascii=False)
+    return path
+
+
+def load_tuned_params(path: Union[str, Path], backend: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """
+    Melhor configuração gravada por `save_tuning_result`
+
+    Returns:
+        Parâmetros do XGBoost, ou None se o arquivo não existir ou tiver sido
+        ajustado para outro backend
+    """
+    try:
+        with open(path, encoding="utf-8") as f:
+            result = json.load(f)
+    except FileNotFoundError:
+        return None
+    if backend is not None and result.get("backend") != backend:
+        return None
+    return result["best_params"]
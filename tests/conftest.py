@@ -0,0 +1,25 @@
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+SRC = Path(__file__).resolve().parents[1] / "src"
+sys.path.insert(0, str(SRC))
+
+# Testes nunca acessam a AwesomeAPI real nem gravam traces
+os.environ.setdefault("AGROFUTURE_FX_OFFLINE", "1")
+os.environ.setdefault("AGROFUTURE_TRACE", "0")
+
+
+@pytest.fixture(scope="session")
+def synthetic_features():
+    """Matriz de features de um histórico sintético pequeno (dias úteis)"""
+    from agrofuture.benchmarks.synthetic import DatasetSize, generate_dataset
+    from agrofuture.data_loader import merge_data
+    from agrofuture.feature_engineer import create_features
+    from agrofuture.fx_rates import ConstantRateSource
+    from agrofuture.schema import apply_schema
+
+    transacoes, mercado = apply_schema(*generate_dataset(DatasetSize(days=240), seed=7))
+    return create_features(merge_data(transacoes, mercado, rate_source=ConstantRateSource()))
@@ -0,0 +1,52 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from agrofuture.backtest import walk_forward_backtest
+
+PARAMS = {"n_estimators": 10, "max_depth": 3}
+
+
+@pytest.mark.parametrize("backend", ["multioutput", "native"])
+def test_warm_start_adds_warm_rounds_per_refit(synthetic_features, backend):
+    resultado = walk_forward_backtest(synthetic_features.copy(), backend=backend, cadence_days=30,
+                                      lookback_days=120, warm_rounds=3, full_refit_every=3,
+                                      params=PARAMS, n_threads=1)
+    steps = resultado.steps
+    assert len(steps) >= 4
+    assert steps["refit"].tolist() == [passo % 3 == 0 for passo in steps["step"]]
+    # Treino do zero volta a n_estimators; cada passo aquecido acrescenta warm_rounds árvores
+    esperado = []
+    for refit in steps["refit"]:
+        esperado.append(PARAMS["n_estimators"] if refit else esperado[-1] + 3)
+    assert steps["trees"].tolist() == esperado
+
+    empresas = list(resultado.thresholds.columns)
+    drift = resultado.threshold_drift()
+    assert list(drift.index) == empresas
+    assert len(resultado.thresholds) == len(steps)
+    assert not resultado.predictions.isna().any().any()
+
+
+def test_no_warm_start_always_refits(synthetic_features):
+    resultado = walk_forward_backtest(synthetic_features.copy(), cadence_days=60, lookback_days=120,
+                                      warm_start=False, params=PARAMS, n_threads=1)
+    assert resultado.steps["refit"].all()
+    assert (resultado.steps["trees"] == PARAMS["n_estimators"]).all()
+
+
+def test_raises_when_no_window_has_train_and_test_days(synthetic_features):
+    # Um dia a cada 30: janelas de treino de 10 dias e teste de 5 nunca têm os dois lados
+    esparso = synthetic_features[synthetic_features["date"].dt.dayofyear % 30 == 0]
+    assert len(esparso) > 3
+    with pytest.raises(ValueError, match="Histórico curto demais"):
+        walk_forward_backtest(esparso.copy(), cadence_days=5, window_days=10, min_train_days=10,
+                              lookback_days=365, params=PARAMS, n_threads=1)
+
+
+def test_thresholds_use_only_earlier_out_of_fold_predictions(synthetic_features):
+    resultado = walk_forward_backtest(synthetic_features.copy(), cadence_days=30, lookback_days=90,
+                                      params=PARAMS, n_threads=1)
+    # Primeiro passo ainda não tem previsões fora da amostra: thresholds padrão
+    np.testing.assert_allclose(resultado.thresholds.iloc[0].to_numpy(), 0.5)
+    assert resultado.predictions.index.min() >= pd.Timestamp(resultado.steps["cutoff"].iloc[0])
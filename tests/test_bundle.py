@@ -0,0 +1,75 @@
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+import xgboost as xgb
+
+from agrofuture.bundle import MANIFEST_FILE, ModelBundle, is_bundle, save_bundle
+from agrofuture.model_trainer import BACKENDS, MULTI_STRATEGY, build_model, proba_matrix
+
+EMPRESAS = ["Empresa00", "Empresa01", "Empresa02"]
+
+
+@pytest.fixture(scope="module")
+def training_data():
+    rng = np.random.default_rng(3)
+    X = pd.DataFrame(rng.normal(size=(300, 5)), columns=[f"f{i}" for i in range(5)])
+    y = np.column_stack([(X["f0"] + rng.normal(scale=0.5, size=300) > 0),
+                         (X["f1"] - X["f2"] > 0.3),
+                         (X["f3"] * X["f4"] > 0)]).astype(int)
+    return X, y
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_roundtrip_keeps_probabilities_and_thresholds(tmp_path, training_data, backend):
+    X, y = training_data
+    modelo = build_model(backend, company_jobs=1, n_estimators=15, max_depth=3, n_jobs=1).fit(X, y)
+    esperado = proba_matrix(modelo.predict_proba(X))
+    # Threshold de Empresa02 ausente: deve valer 0.5
+    thresholds = {"Empresa00": 0.2, "Empresa01": 0.8}
+
+    caminho = save_bundle(modelo, tmp_path / "modelo", EMPRESAS, list(X.columns), thresholds, backend,
+                          params={"n_estimators": np.int64(15)}, metrics={"f1": np.float64(0.5)})
+    assert is_bundle(caminho)
+    assert not any(p.name.endswith(".tmp") for p in tmp_path.iterdir())
+
+    bundle = ModelBundle.load(caminho)
+    assert not bundle.loaded
+    assert bundle.backend == backend and bundle.multi_strategy == MULTI_STRATEGY.get(backend)
+    assert list(bundle.feature_names_in_) == list(X.columns)
+    assert not bundle.loaded
+
+    # Colunas fora de ordem: o pacote reordena pelas features do treino
+    probabilidades = bundle.predict_proba_matrix(X[X.columns[::-1]])
+    assert bundle.loaded
+    np.testing.assert_allclose(probabilidades, esperado, rtol=1e-6)
+    np.testing.assert_allclose(proba_matrix(bundle.predict_proba(X)), esperado, rtol=1e-6)
+
+    limites = np.array([0.2, 0.8, 0.5])
+    np.testing.assert_array_equal(bundle.predict(X), (esperado >= limites).astype(int))
+    assert (bundle.predict(X) != (esperado >= 0.5)).any()
+
+
+def test_from_boosters_roundtrip(tmp_path, training_data):
+    X, y = training_data
+    boosters = [xgb.train({"objective": "binary:logistic", "max_depth": 3, "nthread": 1},
+                          xgb.DMatrix(X, label=y[:, i]), num_boost_round=10) for i in range(y.shape[1])]
+    em_memoria = ModelBundle.from_boosters(boosters, "multioutput", None, list(X.columns), EMPRESAS,
+                                           {"Empresa01": 0.7})
+    assert em_memoria.loaded
+    caminho = save_bundle(em_memoria, tmp_path / "modelo", EMPRESAS, list(X.columns),
+                          em_memoria.thresholds, "multioutput")
+
+    bundle = ModelBundle.load(caminho)
+    assert bundle.manifest["boosters"] == ["booster_000.ubj", "booster_001.ubj", "booster_002.ubj"]
+    np.testing.assert_allclose(bundle.predict_proba_matrix(X), em_memoria.predict_proba_matrix(X), rtol=1e-6)
+    assert bundle.threshold_array().tolist() == [0.5, 0.7, 0.5]
+
+
+def test_load_rejects_missing_or_incompatible_manifest(tmp_path):
+    with pytest.raises(ValueError, match="ausente"):
+        ModelBundle.load(tmp_path)
+    (tmp_path / MANIFEST_FILE).write_text(json.dumps({"format": "outro", "version": 1}))
+    with pytest.raises(ValueError, match="incompatível"):
+        ModelBundle.load(tmp_path)
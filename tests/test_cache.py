@@ -0,0 +1,104 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from agrofuture.cache import ColumnarCache
+
+pytest.importorskip("pyarrow")
+
+
+class CountingReader:
+    """Lê o CSV de origem contando as leituras (cache miss)"""
+
+    def __init__(self, frame: pd.DataFrame):
+        self.frame = frame
+        self.calls = 0
+
+    def __call__(self, path):
+        self.calls += 1
+        return self.frame.copy()
+
+
+def sample_frame(n: int = 50) -> pd.DataFrame:
+    rng = np.random.default_rng(0)
+    return pd.DataFrame({
+        "date": pd.date_range("2024-01-01", periods=n, freq="D"),
+        "company": pd.Categorical(rng.choice(["A", "B", "C"], n)),
+        "amount": rng.random(n).astype("float32"),
+        "price": rng.random(n),
+        "qtd": rng.integers(0, 100, n).astype("int16"),
+        "flag": rng.random(n) > 0.5,
+        "city": rng.choice(["x", "y"], n).astype(object),
+    })
+
+
+def write_source(path, conteudo: str = "a,b\n1,2\n"):
+    path.write_text(conteudo, encoding="utf-8")
+    return path
+
+
+def test_counts_hits_and_misses(tmp_path):
+    origem = write_source(tmp_path / "transacoes.csv")
+    reader = CountingReader(sample_frame())
+    cache = ColumnarCache(tmp_path / "cache")
+
+    cache.load(origem, reader)
+    cache.load(origem, reader)
+    cache.load(origem, reader)
+
+    assert cache.stats() == {"hits": 2, "misses": 1}
+    assert reader.calls == 1
+
+
+def test_restores_original_dtypes(tmp_path):
+    origem = write_source(tmp_path / "transacoes.csv")
+    frame = sample_frame()
+    ColumnarCache(tmp_path / "cache").load(origem, CountingReader(frame))
+
+    # Novo cache (novo processo): leitura só do Parquet
+    cache = ColumnarCache(tmp_path / "cache")
+    lido = cache.load(origem, CountingReader(frame))
+    assert cache.hits == 1
+    pd.testing.assert_frame_equal(lido, frame)
+
+
+def test_invalidates_on_size_change(tmp_path):
+    origem = write_source(tmp_path / "transacoes.csv")
+    reader = CountingReader(sample_frame())
+    cache = ColumnarCache(tmp_path / "cache")
+    cache.load(origem, reader)
+
+    write_source(origem, "a,b\n1,2\n3,4\n")
+    cache.load(origem, reader)
+    assert cache.stats() == {"hits": 0, "misses": 2}
+    # A versão antiga da mesma origem é removida
+    assert len(list((tmp_path / "cache").glob("transacoes-*.parquet"))) == 1
+
+
+def test_invalidates_on_mtime_change(tmp_path):
+    origem = write_source(tmp_path / "transacoes.csv")
+    reader = CountingReader(sample_frame())
+    cache = ColumnarCache(tmp_path / "cache")
+    cache.load(origem, reader)
+
+    stat = origem.stat()
+    os.utime(origem, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    cache.load(origem, reader)
+    assert cache.stats() == {"hits": 0, "misses": 2}
+
+
+def test_cleanup_keeps_sources_sharing_a_prefix(tmp_path):
+    mercado = write_source(tmp_path / "mercado.csv")
+    desafio = write_source(tmp_path / "mercado-desafio.csv")
+    cache = ColumnarCache(tmp_path / "cache")
+    cache.load(desafio, CountingReader(sample_frame()))
+    cache.load(mercado, CountingReader(sample_frame()))
+
+    # Regravar "mercado" não pode apagar o cache de "mercado-desafio"
+    write_source(mercado, "a,b\n5,6\n7,8\n")
+    cache.load(mercado, CountingReader(sample_frame()))
+    cache.load(desafio, CountingReader(sample_frame()))
+    assert cache.stats() == {"hits": 1, "misses": 3}
+    assert len(list((tmp_path / "cache").glob("*.parquet"))) == 2
@@ -0,0 +1,47 @@
+import json
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+SRC = Path(__file__).resolve().parents[1] / "src"
+
+PESADOS = ("pandas", "xgboost", "sklearn")
+# Início de um processo Python novo fica na casa das dezenas de ms; o limite
+# só pega regressões grosseiras (ex.: pandas/XGBoost importados no início)
+HELP_MAX_S = 0.5
+
+
+def run_python(*argv: str) -> subprocess.CompletedProcess:
+    env = {**os.environ, "PYTHONPATH": os.pathsep.join(filter(None, [str(SRC), os.environ.get("PYTHONPATH")]))}
+    return subprocess.run([sys.executable, *argv], capture_output=True, text=True, env=env, timeout=60)
+
+
+@pytest.mark.parametrize("modulo", ["agrofuture", "agrofuture.cli"])
+def test_import_does_not_load_heavy_dependencies(modulo):
+    codigo = (f"import json, sys, {modulo}; "
+              f"print(json.dumps([m for m in {PESADOS!r} if m in sys.modules]))")
+    resultado = run_python("-c", codigo)
+    assert resultado.returncode == 0, resultado.stderr
+    assert json.loads(resultado.stdout) == []
+
+
+def test_lazy_attribute_loads_on_demand():
+    resultado = run_python("-c", "import sys, agrofuture; agrofuture.prepare_target; print('pandas' in sys.modules)")
+    assert resultado.returncode == 0, resultado.stderr
+    assert resultado.stdout.strip() == "True"
+
+
+def test_cli_help_starts_fast():
+    run_python("-m", "agrofuture.cli", "--help")  # aquece o cache de bytecode
+    melhor = float("inf")
+    for _ in range(3):
+        inicio = time.perf_counter()
+        resultado = run_python("-m", "agrofuture.cli", "--help")
+        melhor = min(melhor, time.perf_counter() - inicio)
+        assert resultado.returncode == 0, resultado.stderr
+    assert "train" in resultado.stdout and "predict" in resultado.stdout
+    assert melhor < HELP_MAX_S, f"agrofuture --help levou {melhor:.3f}s"
@@ -0,0 +1,72 @@
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.model_selection import TimeSeriesSplit
+
+from agrofuture.external_memory import FeatureShards, fold_ranges, write_feature_shards
+from agrofuture.feature_engineer import prepare_target
+
+ROWS_PER_SHARD = 50
+
+
+@pytest.fixture(scope="module")
+def shuffled_features(synthetic_features):
+    # Fora de ordem de data: os shards devem sair ordenados
+    return synthetic_features.sample(frac=1.0, random_state=0)
+
+
+@pytest.fixture(scope="module")
+def shards(shuffled_features, tmp_path_factory):
+    return write_feature_shards(shuffled_features, tmp_path_factory.mktemp("shards"), rows_per_shard=ROWS_PER_SHARD)
+
+
+def expected_matrix(df: pd.DataFrame) -> np.ndarray:
+    ordenado = df.sort_values("date", kind="stable")
+    return ordenado.drop(columns=["date", "empresas_vendedoras"]).to_numpy(dtype=np.float32)
+
+
+def test_shards_reproduce_the_feature_matrix(shuffled_features, shards):
+    n = len(shuffled_features)
+    assert shards.n_rows == n
+    assert shards.n_shards == -(-n // ROWS_PER_SHARD)
+    assert shards.offsets.tolist() == list(range(0, n, ROWS_PER_SHARD)) + [n]
+
+    matriz = np.concatenate([shards.shard(i) for i in range(shards.n_shards)])
+    np.testing.assert_array_equal(matriz, expected_matrix(shuffled_features))
+
+    ordenado = shuffled_features.sort_values("date", kind="stable")
+    y, empresas = prepare_target(ordenado)
+    np.testing.assert_array_equal(shards.labels, np.asarray(y, dtype=np.float32))
+    assert shards.company_classes == [str(c) for c in empresas]
+    assert shards.dates.equals(pd.DatetimeIndex(ordenado["date"]))
+    assert shards.feature_names == [c for c in shuffled_features.columns if c not in ("date", "empresas_vendedoras")]
+
+    relido = FeatureShards(shards.path)
+    assert relido.n_rows == n and relido.offsets.tolist() == shards.offsets.tolist()
+
+
+@pytest.mark.parametrize("start,stop", [(0, 240), (0, 50), (49, 51), (50, 100), (10, 190), (120, 121),
+                                        (200, 240), (230, 240), (60, 60)])
+def test_batches_cover_the_row_range(shuffled_features, shards, start, stop):
+    completa = expected_matrix(shuffled_features)
+    lotes = list(shards.batches(start, stop))
+    assert all(len(lote) > 0 for lote in lotes)
+    # Um lote por shard tocado, sem cópia dos shards mapeados
+    assert len(lotes) == len({linha // ROWS_PER_SHARD for linha in range(start, stop)})
+    juntos = np.concatenate(lotes) if lotes else np.empty((0, completa.shape[1]), dtype=np.float32)
+    np.testing.assert_array_equal(juntos, completa[start:stop])
+
+
+def test_matrix_has_the_requested_rows(shards, tmp_path):
+    matriz = shards.matrix(40, 160, tmp_path, n_threads=1)
+    assert (matriz.num_row(), matriz.num_col()) == (120, len(shards.feature_names))
+
+
+@pytest.mark.parametrize("n_rows,n_splits", [(240, 5), (100, 3), (37, 4)])
+def test_fold_ranges_match_time_series_split(n_rows, n_splits):
+    intervalos = fold_ranges(n_rows, n_splits)
+    folds = list(TimeSeriesSplit(n_splits=n_splits).split(np.empty((n_rows, 1))))
+    assert len(intervalos) == len(folds)
+    for (inicio, meio, fim), (treino, val) in zip(intervalos, folds):
+        np.testing.assert_array_equal(np.arange(inicio, meio), treino)
+        np.testing.assert_array_equal(np.arange(meio, fim), val)
@@ -0,0 +1,289 @@
+import warnings
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from agrofuture.benchmarks.synthetic import DatasetSize, generate_dataset
+from agrofuture.data_loader import merge_data
+from agrofuture.feature_engineer import create_features
+from agrofuture.feature_store import FeatureStore
+from agrofuture.fx_rates import ConstantRateSource
+from agrofuture.schema import apply_schema
+
+
+# ----------------------------------------------------------------------
+# Cópia congelada do create_features original (antes da agregação única,
+# da matriz dias x empresas e do motor de janelas móveis)
+# ----------------------------------------------------------------------
+
+def baseline_create_features(df: pd.DataFrame) -> pd.DataFrame:
+    df['date'] = pd.to_datetime(df['date'])
+    df = df.sort_values(['company_transacoes', 'date'])
+
+    # ===============================
+    # 1. Features globais por dia
+    # ===============================
+    vendas_por_dia = (
+        df[df['amount'] > 0]
+        .groupby('date')['company_transacoes']
+        .apply(list)
+        .reset_index(name='empresas_vendedoras')
+    )
+
+    df_diario = (
+        df.groupby('date').agg(
+            total_vendas=('amount', 'sum'),
+            avg_preco=('price_transacoes', 'mean'),
+            produtos_negociados=('product', 'nunique'),
+            qtd_transacoes=('amount', 'count')
+        )
+        .reset_index()
+    )
+
+    df_diario['dia_semana'] = df_diario['date'].dt.dayofweek
+    df_diario['mes'] = df_diario['date'].dt.month
+    df_diario['trimestre'] = df_diario['date'].dt.quarter
+
+    produto_pct_df = _baseline_add_produto_pct_features(df, top_n=5)
+    num_estados_origem = df.groupby('date')['origin_state'].nunique().reset_index(name='num_estados_origem')
+    preco_cb_spread = df.assign(spread=df['price_transacoes'] - df['cbot']).groupby('date')['spread'].mean().reset_index(name='preco_cb_spread')
+    num_rotas_unicas = (
+        df.groupby('date')[['origin_city', 'destination_city']]
+        .apply(lambda x: x.drop_duplicates().shape[0])
+        .reset_index(name='num_rotas_unicas')
+    )
+    peso_medio_transacao = df.groupby('date')['amount'].mean().reset_index(name='peso_medio_transacao')
+
+    df_diario = (
+        df_diario
+        .merge(vendas_por_dia, on='date', how='left')
+        .merge(produto_pct_df, on='date', how='left')
+        .merge(num_estados_origem, on='date', how='left')
+        .merge(preco_cb_spread, on='date', how='left')
+        .merge(num_rotas_unicas, on='date', how='left')
+        .merge(peso_medio_transacao, on='date', how='left')
+    )
+
+    # ===============================
+    # 2. Features por empresa (rolling e agregadas)
+    # ===============================
+    df['vendeu'] = df['amount'] > 0
+
+    rolling_window = 30
+    df['vendas_30d'] = df.groupby('company_transacoes')['amount'].transform(lambda x: x.rolling(rolling_window, min_periods=1).sum())
+    df['media_30d'] = df.groupby('company_transacoes')['amount'].transform(lambda x: x.rolling(rolling_window, min_periods=1).mean())
+    df['desvio_30d'] = df.groupby('company_transacoes')['amount'].transform(lambda x: x.rolling(rolling_window, min_periods=1).std().fillna(0))
+    df['media_7d'] = df.groupby('company_transacoes')['amount'].transform(lambda x: x.rolling(7, min_periods=1).mean())
+    df['tendencia'] = df['media_7d'] - df['media_30d']
+    df['dias_desde_ultima_venda'] = df.groupby('company_transacoes')['date'].transform(lambda x: (x.max() - x).dt.days)
+
+    df_empresa_agg = df.groupby('date').agg(
+        media_vendas_30d=('media_30d', 'mean'),
+        desvio_vendas_30d=('desvio_30d', 'mean'),
+        tendencia_media=('tendencia', 'mean'),
+        dias_ult_venda_media=('dias_desde_ultima_venda', 'mean'),
+    ).reset_index()
+
+    # ===============================
+    # 3. Features específicas por empresa
+    # ===============================
+    empresas = df['company_transacoes'].unique()
+    for empresa in empresas:
+        nome = empresa.lower()
+        vendas_valor = df[df['company_transacoes'] == empresa].groupby('date')['amount'].sum().reset_index(name=f'total_vendas_{nome}')
+        df_diario = df_diario.merge(vendas_valor, on='date', how='left')
+        df_diario[f'{nome}_vendeu_ontem'] = _baseline_add_empresa_vendeu_ontem(df_diario, empresa)
+        df_diario[f'dias_desde_ultima_venda_{nome}'] = _baseline_add_dias_desde_ultima_venda_empresa(df_diario, empresa)
+        df_diario[f'{nome}_freq_ultimos_7d'] = _baseline_add_freq_ultimos_7d(df_diario, empresa)
+        df_diario[f'{nome}_media_vendas_7d'] = df_diario[f'total_vendas_{nome}'].rolling(window=7, min_periods=1).mean().fillna(0)
+        df_diario[f'{nome}_domina_vendas'] = (df_diario[f'total_vendas_{nome}'] / df_diario['total_vendas']).fillna(0).apply(lambda x: int(x > 0.5))
+
+    df_final = (
+        df_diario
+        .merge(df_empresa_agg, on='date', how='left')
+        .sort_values('date')
+        .reset_index(drop=True)
+    )
+
+    # Garante que todas as datas entre min e max estejam presentes, inclusive datas futuras
+    full_range = pd.date_range(df_final['date'].min(), df_final['date'].max(), freq='D')
+    df_final = df_final.set_index('date').reindex(full_range).reset_index().rename(columns={'index': 'date'})
+
+    return df_final
+
+
+def _baseline_add_produto_pct_features(df: pd.DataFrame, top_n: int = 5) -> pd.DataFrame:
+    top_produtos = df['product'].value_counts().nlargest(top_n).index.tolist()
+    produto_pct = (
+        df.groupby(['date', 'product'])['amount'].count()
+        .unstack(fill_value=0)
+        .apply(lambda x: x / x.sum(), axis=1)
+        .reset_index()
+    )
+    produto_pct = produto_pct.rename(columns={p: f'pct_produto_{p}' for p in top_produtos if p in produto_pct.columns})
+    cols = ['date'] + [f'pct_produto_{p}' for p in top_produtos if f'pct_produto_{p}' in produto_pct.columns]
+    return produto_pct[cols]
+
+
+def _baseline_add_empresa_vendeu_ontem(df: pd.DataFrame, empresa: str) -> pd.Series:
+    df_sorted = df.sort_values('date').copy()
+    flag = df_sorted['empresas_vendedoras'].apply(lambda x: empresa in x)
+    return flag.shift(1).fillna(False).astype(bool).astype(int)
+
+
+def _baseline_add_dias_desde_ultima_venda_empresa(df: pd.DataFrame, empresa: str) -> pd.Series:
+    df_sorted = df.sort_values('date').copy()
+    last_seen = -1
+    counter = []
+    for vendeu in df_sorted['empresas_vendedoras'].apply(lambda x: empresa in x):
+        if vendeu:
+            last_seen = 0
+        elif last_seen >= 0:
+            last_seen += 1
+        else:
+            last_seen = -1
+        counter.append(last_seen if last_seen >= 0 else np.nan)
+    return pd.Series(counter, index=df_sorted.index).ffill().fillna(-1)
+
+
+def _baseline_add_freq_ultimos_7d(df: pd.DataFrame, empresa: str) -> pd.Series:
+    df_sorted = df.sort_values('date').copy()
+    flags = df_sorted['empresas_vendedoras'].apply(lambda x: empresa in x).astype(int)
+    return flags.rolling(window=7, min_periods=1).sum()
+
+
+# ----------------------------------------------------------------------
+# Dados
+# ----------------------------------------------------------------------
+
+def merged_dataset(days: int = 90, seed: int = 0, compact: bool = False, weekdays_only: bool = True) -> pd.DataFrame:
+    """Transações sintéticas mescladas; sem `compact`, nos tipos das planilhas originais (object/float64)"""
+    transacoes, mercado = apply_schema(*generate_dataset(DatasetSize(days=days), seed=seed, weekdays_only=weekdays_only))
+    merged = merge_data(transacoes, mercado, rate_source=ConstantRateSource())
+    merged['date'] = pd.to_datetime(merged['date'])
+    if compact:
+        return merged
+    return merged.astype({c: object if isinstance(d, pd.CategoricalDtype) else 'float64'
+                          for c, d in merged.dtypes.items()
+                          if isinstance(d, pd.CategoricalDtype) or d == 'float32'})
+
+
+def assert_features_equal(atual: pd.DataFrame, esperado: pd.DataFrame) -> None:
+    assert list(atual.columns) == list(esperado.columns)
+    pd.testing.assert_frame_equal(atual, esperado, check_exact=False, rtol=1e-9, atol=1e-9)
+
+
+# ----------------------------------------------------------------------
+# create_features x implementação original
+# ----------------------------------------------------------------------
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_create_features_matches_baseline(seed):
+    merged = merged_dataset(seed=seed)
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        esperado = baseline_create_features(merged.copy())
+    assert_features_equal(create_features(merged.copy()), esperado)
+
+
+def test_create_features_matches_baseline_with_weekends():
+    merged = merged_dataset(days=45, seed=3, weekdays_only=False)
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        esperado = baseline_create_features(merged.copy())
+    assert_features_equal(create_features(merged.copy()), esperado)
+
+
+def test_create_features_same_values_with_compact_schema():
+    compacto = create_features(merged_dataset(compact=True))
+    original = create_features(merged_dataset())
+    assert list(compacto.columns) == list(original.columns)
+    # Tabela compacta guarda float32; as features são calculadas em float64
+    pd.testing.assert_frame_equal(compacto, original, check_dtype=False, rtol=1e-5)
+
+
+# ----------------------------------------------------------------------
+# FeatureStore incremental x reconstrução completa
+# ----------------------------------------------------------------------
+
+@pytest.mark.parametrize("compact", [False, True])
+def test_update_features_matches_full_rebuild(compact):
+    merged = merged_dataset(days=120, compact=compact)
+    datas = np.sort(merged['date'].unique())
+    cortes = [datas[len(datas) // 2], datas[-10], datas[-1]]
+
+    store = FeatureStore.build(merged[merged['date'] < cortes[0]])
+    for inicio, fim in zip(cortes, cortes[1:] + [datas[-1] + np.timedelta64(1, 'D')]):
+        incremental = store.update_features(merged[(merged['date'] >= inicio) & (merged['date'] < fim)])
+
+    assert store.incremental_updates == 3
+    assert store.rebuilds == 1
+    assert_features_equal(incremental, create_features(merged.copy()))
+
+
+def test_update_features_rebuilds_on_past_dates():
+    merged = merged_dataset(days=60)
+    datas = np.sort(merged['date'].unique())
+    store = FeatureStore.build(merged[merged['date'] < datas[-5]])
+    # Transações de uma data já ingerida exigem reconstrução
+    atrasadas = merged[merged['date'] >= datas[-6]]
+    atualizado = store.update_features(atrasadas)
+    esperado = create_features(pd.concat([merged[merged['date'] < datas[-5]], atrasadas], ignore_index=True))
+    assert store.rebuilds == 2
+    assert_features_equal(atualizado, esperado)
+
+
+def test_daily_updates_only_fill_the_new_dates(monkeypatch):
+    import agrofuture.feature_store as feature_store
+
+    merged = merged_dataset(days=80, seed=4, weekdays_only=False)
+    # Empresa que só aparece no meio do histórico (colunas novas)
+    nova = merged['company_transacoes'].astype(str).iloc[0]
+    datas = np.sort(merged['date'].unique())
+    merged = merged[(merged['company_transacoes'].astype(str) != nova) | (merged['date'] >= datas[50])]
+    # Dias sem transação no fim do período (lacunas no calendário)
+    merged = merged[~merged['date'].isin(datas[[60, 61, 70]])].reset_index(drop=True)
+
+    preenchidas = []
+    original = feature_store.fill_calendar
+    monkeypatch.setattr(feature_store, "fill_calendar", lambda df: preenchidas.append(len(df)) or original(df))
+
+    store = FeatureStore.build(merged[merged['date'] < datas[40]])
+    store.features()
+    for dia in datas[40:]:
+        novas = merged[merged['date'] == dia]
+        if len(novas):
+            atual = store.update_features(novas)
+    assert store.rebuilds == 1
+    assert_features_equal(atual, create_features(merged.copy()))
+    # Calendário completo montado no build, de novo quando a empresa nova aparece e, no resto, só sobre os dias novos
+    assert sum(n > 5 for n in preenchidas) == 2
+
+
+def test_sync_appends_new_rows_and_rebuilds_on_changed_history():
+    merged = merged_dataset(days=60, seed=5)
+    datas = np.sort(merged['date'].unique())
+    inicio = merged[merged['date'] < datas[-5]].reset_index(drop=True)
+    store = FeatureStore.build(inicio)
+
+    completo = pd.concat([inicio, merged[merged['date'] >= datas[-5]]], ignore_index=True)
+    assert_features_equal(store.sync(completo), create_features(completo.copy()))
+    assert (store.rebuilds, store.incremental_updates) == (1, 1)
+
+    # Última linha já ingerida alterada: o histórico não é mais um prefixo
+    alterado = completo.copy()
+    alterado.loc[len(completo) - 1, 'amount'] += 1
+    assert_features_equal(store.sync(alterado), create_features(alterado.copy()))
+    assert store.rebuilds == 2
+
+
+def test_saved_store_continues_incrementally(tmp_path):
+    merged = merged_dataset(days=60, seed=6)
+    datas = np.sort(merged['date'].unique())
+    FeatureStore.build(merged[merged['date'] < datas[-3]], path=tmp_path / "store").save()
+
+    store = FeatureStore.load(tmp_path / "store")
+    atual = store.update_features(merged[merged['date'] >= datas[-3]])
+    assert store.incremental_updates == 1
+    assert_features_equal(atual, create_features(merged.copy()))
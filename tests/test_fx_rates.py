@@ -0,0 +1,177 @@
+import json
+import threading
+import time
+import warnings
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional, Union
+from urllib.parse import parse_qs, urlparse
+
+import pandas as pd
+import pytest
+import requests
+
+from agrofuture.fx_rates import (AwesomeAPIRateSource, ChainedRateSource, ConstantRateSource, SQLiteRateSource,
+                                 default_rate_source, rates_for_dates)
+
+
+class LocalHTTPRateServer:
+    """
+    Servidor HTTP local que imita o endpoint diário da AwesomeAPI
+
+    `fail = True` faz o servidor responder 500 a todas as requisições.
+    """
+
+    def __init__(self, rates: Union[pd.Series, Dict[str, float]], host: str = "127.0.0.1", port: int = 0):
+        rates = pd.Series(rates, dtype=float)
+        rates.index = pd.to_datetime(rates.index).normalize()
+        self.rates = rates.sort_index()
+        self.requests_served = 0
+        self.fail = False
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def _handler(self):
+        outer = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                outer.requests_served += 1
+                parsed = urlparse(self.path)
+                if outer.fail:
+                    self.send_error(500)
+                    return
+                if not parsed.path.startswith("/json/daily/USD-BRL"):
+                    self.send_error(404)
+                    return
+                query = parse_qs(parsed.query)
+                start = pd.to_datetime(query.get("start_date", ["19000101"])[0], format="%Y%m%d")
+                end = pd.to_datetime(query.get("end_date", ["21000101"])[0], format="%Y%m%d")
+                selected = outer.rates.loc[start:end].iloc[::-1]
+                body = json.dumps([
+                    {"code": "USD", "codein": "BRL", "bid": f"{rate:.4f}",
+                     "timestamp": str(int((date + pd.Timedelta(hours=12)).timestamp()))}
+                    for date, rate in selected.items()
+                ]).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def __enter__(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+RATES = {"2024-01-02": 4.90, "2024-01-03": 4.95, "2024-01-04": 5.01}
+
+
+@pytest.fixture
+def server():
+    with LocalHTTPRateServer(RATES) as srv:
+        yield srv
+
+
+def test_awesomeapi_parses_daily_rates(server):
+    source = AwesomeAPIRateSource(base_url=server.url, timeout=1)
+    rates = source.get_rates("2024-01-01", "2024-01-05")
+    assert list(rates.index) == list(pd.to_datetime(list(RATES)))
+    assert rates.tolist() == pytest.approx(list(RATES.values()))
+
+
+def test_awesomeapi_cache_respects_ttl(server):
+    source = AwesomeAPIRateSource(base_url=server.url, timeout=1, ttl=0.2)
+    source.get_rates("2024-01-01", "2024-01-05")
+    source.get_rates("2024-01-01", "2024-01-05")
+    assert server.requests_served == 1
+
+    time.sleep(0.3)
+    source.get_rates("2024-01-01", "2024-01-05")
+    assert server.requests_served == 2
+
+
+def test_awesomeapi_waits_retry_after_a_failure(server):
+    source = AwesomeAPIRateSource(base_url=server.url, timeout=1)
+    source.retry_after = 0.2
+    server.fail = True
+    with pytest.raises(requests.RequestException):
+        source.get_rates("2024-01-01", "2024-01-05")
+    assert server.requests_served == 1
+
+    # Dentro de retry_after a API nem é chamada
+    server.fail = False
+    with pytest.raises(requests.ConnectionError):
+        source.get_rates("2024-01-01", "2024-01-05")
+    assert server.requests_served == 1
+
+    time.sleep(0.3)
+    assert not source.get_rates("2024-01-01", "2024-01-05").empty
+    assert server.requests_served == 2
+
+
+def test_chain_falls_back_to_constant_when_api_fails(server):
+    server.fail = True
+    api = AwesomeAPIRateSource(base_url=server.url, timeout=1)
+    chain = ChainedRateSource([api, ConstantRateSource(5.5)])
+    dates = pd.Series(pd.to_datetime(["2024-01-02", "2024-01-10"]))
+    with warnings.catch_warnings(record=True) as avisos:
+        warnings.simplefilter("always")
+        rates = rates_for_dates(dates, chain)
+    assert rates.tolist() == [5.5, 5.5]
+    mensagens = [str(a.message) for a in avisos]
+    assert any("AwesomeAPIRateSource indisponível" in m for m in mensagens)
+    assert any("valor constante 5.5" in m for m in mensagens)
+
+
+def test_chain_uses_api_and_constant_only_for_uncovered_ends(server):
+    api = AwesomeAPIRateSource(base_url=server.url, timeout=1)
+    chain = ChainedRateSource([api, ConstantRateSource(5.5)], slack=pd.Timedelta(days=1))
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        rates = rates_for_dates(pd.Series(pd.to_datetime(["2024-01-03", "2024-01-04", "2024-01-10"])), chain)
+    assert rates.tolist() == pytest.approx([4.95, 5.01, 5.5])
+
+
+def test_sqlite_read_does_not_create_the_database(tmp_path):
+    db = tmp_path / "processed" / "fx_rates.sqlite"
+    rates = SQLiteRateSource(db).get_rates("2024-01-01", "2024-01-05")
+    assert rates.empty
+    assert not db.parent.exists()
+
+
+def test_sqlite_store_creates_schema_and_roundtrips(tmp_path):
+    db = tmp_path / "processed" / "fx_rates.sqlite"
+    fonte = SQLiteRateSource(db)
+    fonte.store(pd.Series(RATES))
+    fonte.store(pd.Series({"2024-01-05": 5.1}))
+    rates = SQLiteRateSource(db).get_rates("2024-01-01", "2024-01-05")
+    assert rates.tolist() == pytest.approx([4.90, 4.95, 5.01, 5.1])
+
+
+def test_default_source_uses_the_given_database(tmp_path, monkeypatch):
+    monkeypatch.delenv("AGROFUTURE_FX_DB", raising=False)
+    monkeypatch.chdir(tmp_path)
+    SQLiteRateSource(tmp_path / "fx.sqlite").store(pd.Series(RATES))
+
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        rates = rates_for_dates(pd.Series(pd.to_datetime(["2024-01-03"])), default_rate_source(tmp_path / "fx.sqlite"))
+        rates_for_dates(pd.Series(pd.to_datetime(["2024-01-03"])))
+    assert rates.tolist() == pytest.approx([4.95])
+    # Sem caminho a fonte padrão não grava nada no diretório atual
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["fx.sqlite"]
@@ -0,0 +1,115 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from agrofuture.market_index import MARKET_KEYS, MarketIndex
+from agrofuture.schema import JOIN_KEYS
+
+SUFIXOS = ("_transacoes", "_mercado")
+PRODUTOS = ["milho", "soja", "trigo"]
+CIDADES = [("Sorriso", "MT"), ("Cascavel", "PR")]
+
+
+def market_table(seed: int = 0, duplicadas: int = 0) -> pd.DataFrame:
+    """Cotações em dias úteis, com alguns grupos (produto, origem) sem cotação em certos dias"""
+    rng = np.random.default_rng(seed)
+    linhas = []
+    for data in pd.bdate_range("2024-01-01", "2024-02-29"):
+        for produto in PRODUTOS:
+            for cidade, estado in CIDADES:
+                if produto == "trigo" and cidade == "Cascavel":
+                    continue  # grupo que o mercado não tem
+                if rng.random() < 0.2:
+                    continue
+                linhas.append({"date": data, "company": "Mkt", "price": rng.uniform(50, 150), "product": produto,
+                               "origin_city": cidade, "origin_state": estado, "cbot": rng.uniform(5, 15)})
+    mercado = pd.DataFrame(linhas)
+    if duplicadas:
+        repetidas = mercado.sample(duplicadas, random_state=seed).assign(price=lambda d: d["price"] + 1)
+        mercado = pd.concat([mercado, repetidas], ignore_index=True)
+    mercado["dolar"] = mercado["cbot"] * 5.0
+    return mercado
+
+
+def transactions_table(n: int = 400, seed: int = 1) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    cidades = [CIDADES[i] for i in rng.integers(0, len(CIDADES), n)]
+    transacoes = pd.DataFrame({
+        "date": pd.Timestamp("2023-12-28") + pd.to_timedelta(rng.integers(0, 68, n), unit="D"),
+        "company": rng.choice(["Empresa00", "Empresa01"], n),
+        "price": rng.uniform(50, 150, n),
+        "amount": rng.uniform(1, 500, n),
+        "product": rng.choice(PRODUTOS + ["cafe"], n).astype(object),
+        "origin_city": [c for c, _ in cidades],
+        "origin_state": [e for _, e in cidades],
+    })
+    transacoes.loc[::37, "product"] = np.nan
+    return transacoes
+
+
+def as_categories(transacoes: pd.DataFrame, mercado: pd.DataFrame):
+    """Mesmas tabelas com as chaves em categorias de dicionário comum (schema compacto)"""
+    transacoes, mercado = transacoes.copy(), mercado.copy()
+    for coluna in JOIN_KEYS:
+        dtype = pd.CategoricalDtype(sorted(set(transacoes[coluna].dropna()) | set(mercado[coluna].dropna())))
+        transacoes[coluna] = transacoes[coluna].astype(dtype)
+        mercado[coluna] = mercado[coluna].astype(dtype)
+    return transacoes, mercado
+
+
+def reference_asof(transacoes: pd.DataFrame, mercado: pd.DataFrame, tolerancia) -> pd.DataFrame:
+    """`pd.merge_asof` sobre as transações em ordem de data (ordem em que ele devolve o resultado)"""
+    return pd.merge_asof(transacoes, mercado.sort_values("date", kind="stable"), on="date", by=list(JOIN_KEYS),
+                         tolerance=tolerancia, direction="backward", suffixes=SUFIXOS)
+
+
+@pytest.mark.parametrize("categorias", [False, True])
+def test_exact_join_matches_merge_with_unique_keys(categorias):
+    transacoes, mercado = transactions_table(), market_table()
+    if categorias:
+        transacoes, mercado = as_categories(transacoes, mercado)
+    indice = MarketIndex(mercado)
+    assert indice.unique
+
+    esperado = pd.merge(transacoes, mercado, on=list(MARKET_KEYS), how="left", suffixes=SUFIXOS)
+    assert esperado["cbot"].isna().any() and esperado["cbot"].notna().any()
+    pd.testing.assert_frame_equal(indice.join(transacoes), esperado)
+
+
+def test_exact_join_matches_merge_with_duplicate_keys():
+    transacoes, mercado = transactions_table(), market_table(duplicadas=15)
+    indice = MarketIndex(mercado)
+    assert not indice.unique
+
+    esperado = pd.merge(transacoes, mercado, on=list(MARKET_KEYS), how="left", suffixes=SUFIXOS)
+    assert len(esperado) > len(transacoes)
+    pd.testing.assert_frame_equal(indice.join(transacoes), esperado)
+
+
+@pytest.mark.parametrize("categorias", [False, True])
+@pytest.mark.parametrize("staleness", [None, "3D", "0D"])
+@pytest.mark.parametrize("duplicadas", [0, 15])
+def test_asof_join_matches_merge_asof(categorias, staleness, duplicadas):
+    transacoes = transactions_table().sort_values("date", kind="stable").reset_index(drop=True)
+    mercado = market_table(duplicadas=duplicadas)
+    tolerancia = pd.Timedelta(staleness) if staleness is not None else None
+    esperado = reference_asof(transacoes, mercado, tolerancia)
+
+    if categorias:
+        transacoes, mercado = as_categories(transacoes, mercado)
+    atual = MarketIndex(mercado).join(transacoes, asof=True, max_staleness=staleness)
+    if categorias:
+        atual = atual.astype({c: object for c in JOIN_KEYS})
+    pd.testing.assert_frame_equal(atual, esperado)
+
+
+def test_staleness_cutoff():
+    mercado = pd.DataFrame({"date": pd.to_datetime(["2024-01-05"]), "product": ["milho"], "origin_city": ["Sorriso"],
+                            "origin_state": ["MT"], "cbot": [10.0]})
+    datas = pd.to_datetime(["2024-01-04", "2024-01-05", "2024-01-08", "2024-01-09"])
+    transacoes = pd.DataFrame({"date": datas, "product": "milho", "origin_city": "Sorriso", "origin_state": "MT"})
+    indice = MarketIndex(mercado)
+
+    assert indice.positions(transacoes).tolist() == [-1, 0, -1, -1]
+    assert indice.positions(transacoes, asof=True, max_staleness="3D").tolist() == [-1, 0, 0, -1]
+    assert indice.positions(transacoes, asof=True).tolist() == [-1, 0, 0, 0]
@@ -0,0 +1,65 @@
+import warnings
+
+import numpy as np
+import pytest
+from sklearn.metrics import precision_recall_curve
+
+from agrofuture.model_trainer import best_f1_thresholds
+
+
+def reference_thresholds(y_true: np.ndarray, y_score: np.ndarray):
+    """Busca original: `precision_recall_curve` empresa a empresa"""
+    thresholds, melhores = [], []
+    for i in range(y_true.shape[1]):
+        precision, recall, thresh_vals = precision_recall_curve(y_true[:, i], y_score[:, i])
+        f1_scores = (2 * precision * recall) / (precision + recall + 1e-8)
+        best_idx = np.argmax(f1_scores)
+        thresholds.append(thresh_vals[best_idx] if best_idx < len(thresh_vals) else 0.5)
+        melhores.append(f1_scores[best_idx])
+    return np.array(thresholds), np.array(melhores)
+
+
+@pytest.mark.parametrize("seed", range(5))
+@pytest.mark.parametrize("casas", [None, 2])
+def test_matches_precision_recall_curve(seed, casas):
+    rng = np.random.default_rng(seed)
+    n, n_empresas = 300, 6
+    y_true = rng.random((n, n_empresas)) < rng.uniform(0.05, 0.9, n_empresas)
+    y_score = np.clip(0.4 * y_true + rng.random((n, n_empresas)) * 0.8, 0, 1)
+    if casas is not None:
+        # Scores arredondados: muitos empates
+        y_score = y_score.round(casas)
+    # Coluna só com positivos
+    y_true[:, -1] = True
+
+    thresholds, f1 = best_f1_thresholds(y_true, y_score)
+    esperado_thr, esperado_f1 = reference_thresholds(y_true.astype(int), y_score)
+    np.testing.assert_array_equal(thresholds, esperado_thr)
+    np.testing.assert_allclose(f1, esperado_f1, rtol=1e-12)
+
+
+def test_all_positive_column_uses_the_lowest_score():
+    y_score = np.array([[0.9], [0.2], [0.6]])
+    thresholds, f1 = best_f1_thresholds(np.ones((3, 1), dtype=bool), y_score)
+    assert thresholds.tolist() == [0.2]
+    assert f1[0] == pytest.approx(1.0)
+
+
+def test_columns_without_positives_get_default_threshold():
+    rng = np.random.default_rng(0)
+    y_true = np.zeros((50, 2), dtype=bool)
+    y_true[::3, 1] = True
+    y_score = rng.random((50, 2))
+    thresholds, f1 = best_f1_thresholds(y_true, y_score)
+    # precision_recall_curve não define a curva sem positivos (avisa e usa recall = 1)
+    assert thresholds[0] == 0.5 and f1[0] == 0.0
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        esperado_thr, esperado_f1 = reference_thresholds(y_true[:, 1:].astype(int), y_score[:, 1:])
+    assert thresholds[1] == esperado_thr[0]
+    assert f1[1] == pytest.approx(esperado_f1[0], rel=1e-12)
+
+
+def test_empty_input():
+    thresholds, f1 = best_f1_thresholds(np.zeros((0, 3)), np.zeros((0, 3)))
+    assert thresholds.tolist() == [0.5] * 3 and f1.tolist() == [0.0] * 3
@@ -0,0 +1,89 @@
+from datetime import datetime
+
+import pandas as pd
+import pytest
+
+from agrofuture.pipeline import ProjectPaths, save_predictions
+from agrofuture.prediction_store import PredictionStore
+
+pytest.importorskip("pyarrow")
+
+EMPRESAS = ["Empresa00", "Empresa01", "Empresa02"]
+
+
+def results_table(datas, probabilidade: float = 50.0) -> pd.DataFrame:
+    """Tabela longa no formato de `predict_dates` (uma linha por data e empresa)"""
+    linhas = [{"Empresa": empresa, "Probabilidade (%)": probabilidade + i, "Data": str(pd.Timestamp(data).date()),
+               "Tipo": "Histórica", "Threshold (%)": 50.0, "Venda Prevista": probabilidade + i >= 50.0}
+              for data in datas for i, empresa in enumerate(EMPRESAS)]
+    return pd.DataFrame(linhas)
+
+
+def test_append_writes_one_file_per_month(tmp_path):
+    store = PredictionStore(tmp_path / "store")
+    arquivos = store.append(results_table(["2024-01-30", "2024-01-31", "2024-02-01"]), "m1")
+    assert sorted(p.parent.name for p in arquivos) == ["month=2024-01", "month=2024-02"]
+    assert {mes: len(lista) for mes, lista in store.partitions().items()} == {"2024-01": 1, "2024-02": 1}
+
+
+def test_query_filters_companies_and_dates(tmp_path):
+    store = PredictionStore(tmp_path / "store")
+    store.append(results_table(pd.date_range("2024-01-25", "2024-02-05")), "m1")
+    df = store.query(["Empresa01"], start="2024-01-30", end="2024-02-02")
+    assert df["company"].unique().tolist() == ["Empresa01"]
+    assert df["date"].tolist() == list(pd.date_range("2024-01-30", "2024-02-02"))
+    assert df["probability"].tolist() == pytest.approx([0.51] * 4)
+
+
+def test_query_prunes_partitions_outside_the_range(tmp_path):
+    store = PredictionStore(tmp_path / "store")
+    store.append(results_table(["2024-01-10", "2024-03-10"]), "m1")
+    # Um arquivo corrompido em março só quebraria a consulta se a partição fosse lida
+    for arquivo in store.partitions()["2024-03"]:
+        arquivo.write_bytes(b"corrompido")
+    df = store.query(start="2024-01-01", end="2024-01-31")
+    assert len(df) == len(EMPRESAS)
+
+
+def test_query_latest_keeps_the_newest_prediction(tmp_path):
+    store = PredictionStore(tmp_path / "store")
+    store.append(results_table(["2024-01-10"], 20.0), "m1", created_at=datetime(2024, 1, 1, 10))
+    store.append(results_table(["2024-01-10"], 80.0), "m1", created_at=datetime(2024, 1, 2, 10))
+    store.append(results_table(["2024-01-10"], 40.0), "m2", created_at=datetime(2024, 1, 1, 12))
+
+    recentes = store.query(["Empresa00"])
+    assert recentes.set_index("model_id")["probability"].to_dict() == pytest.approx({"m1": 0.8, "m2": 0.4})
+    assert len(store.query(["Empresa00"], latest=False)) == 3
+    assert store.query(["Empresa00"], model_id="m2")["probability"].tolist() == pytest.approx([0.4])
+    assert store.company_history("Empresa00", model_id="m1").tolist() == pytest.approx([0.8])
+
+
+def test_compact_merges_files_and_drops_superseded_rows(tmp_path):
+    store = PredictionStore(tmp_path / "store")
+    for hora, probabilidade in enumerate([20.0, 60.0, 80.0]):
+        store.append(results_table(["2024-01-10", "2024-01-11"], probabilidade), "m1",
+                     created_at=datetime(2024, 1, 1, hora))
+    store.append(results_table(["2024-02-01"]), "m1")
+    antes = store.query(latest=True)
+
+    stats = store.compact()
+    assert stats["partitions"] == ["2024-01"]
+    assert (stats["files_before"], stats["files_after"]) == (4, 2)
+    assert (stats["rows_before"], stats["rows_after"]) == (18, 6)
+    assert {mes: len(lista) for mes, lista in store.partitions().items()} == {"2024-01": 1, "2024-02": 1}
+    pd.testing.assert_frame_equal(store.query(latest=False), antes)
+
+
+def test_predictions_csv_only_on_request(tmp_path, monkeypatch):
+    monkeypatch.delenv("AGROFUTURE_PREDICTIONS_CSV", raising=False)
+    paths = ProjectPaths(tmp_path)
+    csv_path = paths.predictions_dir / "predictions_2024-01-10.csv"
+    modelo = paths.models_dir / "xgboost_model_20240101000000"
+
+    save_predictions(paths, results_table(["2024-01-10"]), modelo, csv_path)
+    assert not csv_path.exists()
+    assert len(PredictionStore(paths.predictions_dir / "store").query()) == len(EMPRESAS)
+
+    monkeypatch.setenv("AGROFUTURE_PREDICTIONS_CSV", "1")
+    save_predictions(paths, results_table(["2024-01-10"]), modelo, csv_path)
+    assert len(pd.read_csv(csv_path)) == len(EMPRESAS)
@@ -0,0 +1,122 @@
+import json
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+import pytest
+import xgboost as xgb
+
+from agrofuture.bundle import MANIFEST_FILE, ModelBundle, save_bundle
+from agrofuture.registry import LATEST, ModelRegistry, open_registry
+
+FEATURES = ["f0", "f1"]
+
+
+@pytest.fixture(scope="module")
+def booster():
+    rng = np.random.default_rng(0)
+    X = pd.DataFrame(rng.normal(size=(50, 2)), columns=FEATURES)
+    return xgb.train({"objective": "binary:logistic", "nthread": 1}, xgb.DMatrix(X, label=X["f0"] > 0),
+                     num_boost_round=2)
+
+
+def make_model(models_dir, booster, stamp: str, threshold: float = 0.5):
+    """Pacote `xgboost_model_<stamp>` com created_at derivado do carimbo"""
+    bundle = ModelBundle.from_boosters([booster], "multioutput", None, FEATURES, ["Empresa00"],
+                                       {"Empresa00": threshold})
+    caminho = save_bundle(bundle, models_dir / f"xgboost_model_{stamp}", ["Empresa00"], FEATURES,
+                          bundle.thresholds, "multioutput")
+    manifesto = json.loads((caminho / MANIFEST_FILE).read_text())
+    manifesto["created_at"] = pd.Timestamp(stamp).isoformat()
+    (caminho / MANIFEST_FILE).write_text(json.dumps(manifesto))
+    return caminho
+
+
+def test_resolve_latest_and_aliases(tmp_path, booster):
+    antigo = make_model(tmp_path, booster, "20240101000000")
+    novo = make_model(tmp_path, booster, "20240201000000")
+    registry = open_registry(tmp_path)
+    assert registry.resolve() == registry.resolve(LATEST) == novo.name
+
+    registry.set_alias("production", antigo.name)
+    registry.set_alias("fallback", "production")
+    assert registry.resolve("production") == registry.resolve("fallback") == antigo.name
+    assert registry.aliases_of(novo.name) == [LATEST]
+    assert registry.aliases_of(antigo.name) == ["fallback", "production"]
+    assert ModelRegistry(tmp_path).resolve("production") == antigo.name
+
+    with pytest.raises(ValueError, match="reservado"):
+        registry.set_alias(LATEST, antigo.name)
+    with pytest.raises(ValueError, match="id de um modelo"):
+        registry.set_alias(novo.name, antigo.name)
+    with pytest.raises(KeyError):
+        registry.resolve("staging")
+
+
+def test_alias_registered_before_model_with_same_name_wins(tmp_path, booster):
+    # Apelido criado quando o id ainda não existia: resolve continua seguindo o apelido
+    antigo = make_model(tmp_path, booster, "20240101000000")
+    registry = open_registry(tmp_path)
+    registry.set_alias("xgboost_model_20240301000000", antigo.name)
+    sombreado = make_model(tmp_path, booster, "20240301000000")
+    registry.sync()
+    assert registry.resolve(sombreado.name) == antigo.name
+    assert registry.resolve() == sombreado.name
+
+
+def test_latest_without_models(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        open_registry(tmp_path).resolve()
+
+
+def test_sync_adds_new_and_prunes_deleted_models(tmp_path, booster):
+    primeiro = make_model(tmp_path, booster, "20240101000000")
+    segundo = make_model(tmp_path, booster, "20240201000000")
+    (tmp_path / "xgboost_model_incompleto").mkdir()  # sem manifesto: ignorado
+    registry = open_registry(tmp_path)
+    assert sorted(registry.models) == [primeiro.name, segundo.name]
+    registry.set_alias("production", segundo.name)
+    registry.load("production")
+
+    shutil.rmtree(segundo)
+    terceiro = make_model(tmp_path, booster, "20240301000000")
+    assert registry.sync() == ([terceiro.name], [segundo.name])
+    assert "production" not in registry.aliases
+    assert registry.cached() == []
+    assert sorted(ModelRegistry(tmp_path).models) == [primeiro.name, terceiro.name]
+    assert registry.sync() == ([], [])
+
+
+def test_lru_evicts_least_recently_used(tmp_path, booster):
+    ids = [make_model(tmp_path, booster, f"2024010{i}000000").name for i in range(1, 4)]
+    registry = open_registry(tmp_path, cache_size=2)
+    registry.load(ids[0])
+    registry.load(ids[1])
+    registry.load(ids[0])  # ids[0] passa a ser o mais recente
+    registry.load(ids[2])  # sai ids[1]
+    assert registry.cached() == [ids[0], ids[2]]
+    assert (registry.cache_hits, registry.cache_misses) == (1, 3)
+
+    modelo, _ = registry.load(ids[0])
+    assert registry.load(ids[0])[0] is modelo
+    assert registry.cached() == [ids[2], ids[0]]
+
+
+def test_cache_reloads_model_rewritten_under_same_id(tmp_path, booster):
+    caminho = make_model(tmp_path, booster, "20240101000000", threshold=0.3)
+    registry = open_registry(tmp_path)
+    antes, _ = registry.load()
+
+    # Outro processo regrava o pacote com o mesmo id
+    make_model(tmp_path, booster, "20240101000000", threshold=0.7)
+    manifesto = caminho / MANIFEST_FILE
+    mtime = manifesto.stat().st_mtime_ns + 1_000_000_000
+    os.utime(manifesto, ns=(mtime, mtime))
+    depois, _ = registry.load()
+    assert depois is not antes and depois.thresholds == {"Empresa00": 0.7}
+    assert registry.cache_misses == 2
+
+    # register() descarta a versão em cache mesmo sem mudança de mtime
+    registry.register(caminho)
+    assert registry.cached() == []
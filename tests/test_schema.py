@@ -0,0 +1,28 @@
+import numpy as np
+import pandas as pd
+
+from agrofuture.schema import SchemaAccumulator, compact_float, compact_table
+
+
+def test_compact_float_keeps_cents():
+    serie = pd.Series([0.01, 12.34, 151.75, 99999.99, np.nan])
+    reduzido = compact_float(serie)
+    assert reduzido.dtype == np.float32
+    np.testing.assert_array_equal(reduzido.to_numpy(np.float64).round(2), serie.to_numpy())
+
+
+def test_compact_float_keeps_float64_when_cents_would_be_lost():
+    # Perto de 1e7 o passo do float32 é 1: os centavos se perderiam
+    serie = pd.Series([12.5, 12345678.91])
+    assert compact_float(serie) is serie
+
+
+def test_accumulator_matches_compact_table_across_parts():
+    partes = [pd.DataFrame({"amount": [1.25, 2.5]}), pd.DataFrame({"amount": [12345678.91, 3.0]})]
+    acumulador = SchemaAccumulator()
+    for parte in partes:
+        acumulador.observe(parte)
+    assert compact_table(partes[0].copy())["amount"].dtype == np.float32
+    inteira = compact_table(pd.concat(partes, ignore_index=True))
+    assert inteira["amount"].dtype == np.float64
+    assert all(acumulador.apply(parte.copy())["amount"].dtype == np.float64 for parte in partes)